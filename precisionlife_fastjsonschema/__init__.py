@@ -76,14 +76,29 @@ API
 ***
 """
 
+import os
+
+from .closures import ClosureBuilderDraft04, ClosureBuilderDraft06, ClosureBuilderDraft07
 from .draft04 import CodeGeneratorDraft04
 from .draft06 import CodeGeneratorDraft06
 from .draft07 import CodeGeneratorDraft07
-from .exceptions import JsonSchemaException, JsonSchemaValidationException, JsonSchemaDefinitionException
+from .exceptions import (
+    JsonSchemaException, JsonSchemaValidationException, JsonSchemaDefinitionException, JsonSchemaLimitException,
+)
+from .optimizer import optimize_schema
+from .parsing import FULL, IncrementalValidator, JsonValidator, Unparsed, end_definition, lazy_plan, member_refs
+from .pool import ValidatorPool
+from .profiling import AdaptiveValidator, Profile
 from .ref_resolver import RefResolver
+from .stream import CHUNKS_IN_FLIGHT, merge_reports, validate_chunks, validate_file, validate_file_shard
 from .version import VERSION
 
-__all__ = ('VERSION', 'JsonSchemaException', 'JsonSchemaValidationException', 'JsonSchemaDefinitionException', 'validate', 'compile', 'compile_to_code')
+__all__ = (
+    'VERSION', 'JsonSchemaException', 'JsonSchemaValidationException', 'JsonSchemaDefinitionException',
+    'JsonSchemaLimitException', 'Profile', 'AdaptiveValidator', 'validate', 'compile', 'compile_to_code',
+    'compile_json', 'compile_incremental', 'validate_stream', 'validate_shard', 'merge_reports', 'compile_pool',
+    'ValidatorPool', 'optimize_schema',
+)
 
 
 def validate(definition, data, handlers={}, formats={}):
@@ -106,7 +121,11 @@ def validate(definition, data, handlers={}, formats={}):
 
 
 # pylint: disable=redefined-builtin,dangerous-default-value,exec-used
-def compile(definition, handlers={}, formats={}, **resolver_kwargs):
+def compile(
+    definition, handlers={}, formats={}, *, mode='exception', max_errors=None, max_depth=None, max_nodes=None,
+    timeout=None, recursion='calls', optimize=False, profile=None, instrument=None, adaptive=None, stats=None,
+    backend='codegen', defaults='inject', batch=False, cooperative=None, **resolver_kwargs,
+):
     """
     Generates validation function for validating JSON schema passed in ``definition``.
     Example:
@@ -157,21 +176,84 @@ def compile(definition, handlers={}, formats={}, **resolver_kwargs):
             'bar': lambda value: value in ('foo', 'bar'),
         })
 
+    Other options are keyword-only:
+
+     * ``mode`` - ``exception`` (default) raises the first error, ``bool`` returns
+       ``True`` or ``False`` and ``collect`` returns list of all errors (up to ``max_errors``).
+     * ``max_depth``, ``max_nodes`` and ``timeout`` (seconds) limit the work done for
+       untrusted data, :any:`JsonSchemaLimitException` is raised when exceeded.
+     * ``recursion='stack'`` validates references from an explicit stack, so deep data
+       do not hit Python recursion limit.
+     * ``optimize=True`` simplifies the definition first by :any:`optimize_schema`.
+     * ``instrument`` records a :any:`Profile` of real data, ``profile`` orders checks by it
+       and ``adaptive=calls`` does both automatically (see :any:`AdaptiveValidator`).
+     * ``stats`` is a dictionary filled with statistics of the generated code.
+     * ``defaults`` - ``inject`` (default) sets defaults in the data, ``copy`` returns
+       a copy with defaults and ``off`` ignores them.
+     * ``batch=True`` returns function validating an iterable of documents, which returns
+       failures as pairs of index and error (list of errors in ``collect`` mode, ``None``
+       in ``bool`` mode unless a limit was exceeded).
+     * ``cooperative=seconds`` returns coroutine function yielding to ``asyncio`` event loop
+       at least that often.
+     * ``backend='closures'`` builds a tree of closures without ``exec``, which is cheaper
+       to build but slower, supporting only ``mode``, ``defaults`` and ``optimize``.
+
+    .. code-block:: python
+
+        validate = fastjsonschema.compile(definition, mode='collect', max_nodes=100000)
+        for error in validate(data):
+            print(error.path, error.rule)
+
     Exception :any:`JsonSchemaDefinitionException` is raised when generating the
     code fails (bad definition).
 
     Exception :any:`JsonSchemaValidationException` is raised from generated function when
     validation fails (data do not follow the definition).
     """
-    resolver, code_generator = _factory(definition, handlers, formats, **resolver_kwargs)
+    if backend == 'closures':
+        return _compile_closures(
+            definition, handlers, formats, mode=mode, optimize=optimize, defaults=defaults, **resolver_kwargs,
+            unsupported=dict(
+                max_errors=max_errors, max_depth=max_depth, max_nodes=max_nodes, timeout=timeout, profile=profile,
+                instrument=instrument, adaptive=adaptive, stats=stats,
+                recursion=None if recursion == 'calls' else recursion,
+                batch=batch or None, cooperative=cooperative,
+            ),
+        )
+    if backend != 'codegen':
+        raise JsonSchemaDefinitionException('Unknown backend: {}'.format(backend))
+    if adaptive is not None:
+        if not isinstance(adaptive, int) or isinstance(adaptive, bool) or adaptive < 1:
+            raise JsonSchemaDefinitionException('adaptive must be a positive number of calls')
+        if profile is not None or instrument is not None:
+            raise JsonSchemaDefinitionException('adaptive can not be used together with profile or instrument')
+        return AdaptiveValidator(lambda **options: compile(
+            definition, handlers, formats, mode=mode, max_errors=max_errors, max_depth=max_depth, max_nodes=max_nodes,
+            timeout=timeout, recursion=recursion, optimize=optimize, stats=stats, defaults=defaults, batch=batch,
+            cooperative=cooperative, **options, **resolver_kwargs,
+        ), adaptive)
+    resolver, code_generator = _factory(
+        definition, handlers, formats, mode=mode, max_errors=max_errors,
+        max_depth=max_depth, max_nodes=max_nodes, timeout=timeout, recursion=recursion, optimize=optimize,
+        profile=profile, instrument=instrument, defaults=defaults, batch=batch, cooperative=cooperative,
+        **resolver_kwargs,
+    )
     global_state = code_generator.global_state
+    if stats is not None:
+        stats.update(code_generator.stats)
     # Do not pass local state so it can recursively call itself.
     exec(code_generator.func_code, global_state)
+    if batch:
+        return global_state[code_generator.batch_function_name]
     return global_state[resolver.get_scope_name()]
 
 
 # pylint: disable=dangerous-default-value
-def compile_to_code(definition, handlers={}, formats={}, **resolver_kwargs):
+def compile_to_code(
+    definition, handlers={}, formats={}, *, mode='exception', max_errors=None, max_depth=None, max_nodes=None,
+    timeout=None, recursion='calls', optimize=False, profile=None, stats=None, defaults='inject', batch=False,
+    cooperative=None, **resolver_kwargs,
+):
     """
     Generates validation code for validating JSON schema passed in ``definition``.
     Example:
@@ -194,23 +276,325 @@ def compile_to_code(definition, handlers={}, formats={}, **resolver_kwargs):
         resolver = RefResolver.from_schema(definition, handlers=handlers, **resolver_kwargs)
         getattr(module, resolver.get_scope_name())(obj_dict, ...)
 
+    Parameters ``mode``, ``max_errors``, ``max_depth``, ``max_nodes``, ``timeout``,
+    ``recursion``, ``optimize``, ``profile``, ``stats``, ``defaults`` and ``cooperative`` have the same meaning as
+    for :any:`compile`.
+    With ``batch=True`` the code contains also function validating many documents, named
+    as the validation function with suffix ``_many``.
+    Instrumented code can be created only by :any:`compile`.
+
     Exception :any:`JsonSchemaDefinitionException` is raised when generating the
     code fails (bad definition).
     """
-    resolver, code_generator = _factory(definition, handlers, formats, **resolver_kwargs)
+    resolver, code_generator = _factory(
+        definition, handlers, formats, mode=mode, max_errors=max_errors,
+        max_depth=max_depth, max_nodes=max_nodes, timeout=timeout, recursion=recursion, optimize=optimize,
+        profile=profile, defaults=defaults, batch=batch, cooperative=cooperative, **resolver_kwargs,
+    )
+    if stats is not None:
+        stats.update(code_generator.stats)
+    example_call = '(obj_dict)' if mode == 'bool' else '(obj_dict, special_fields_extractor=...)'
     return (
         'VERSION = "' + VERSION + '"\n' +
         code_generator.global_state_code + '\n' +
         code_generator.func_code + '\n\n\n' +
         'if __name__ == "__main__":' + '\n' +
         '    # Example code:' + '\n' +
-        '    ' + resolver.get_scope_name() + '(obj_dict, special_fields_extractor=...)' + '\n'
+        '    ' + resolver.get_scope_name() + example_call + '\n'
     )
 
 
-def _factory(definition, handlers, formats={}, **resolver_kwargs):
+# pylint: disable=dangerous-default-value
+def compile_json(
+    definition, handlers={}, formats={}, *, mode='exception', defaults='inject', duplicate_keys=False,
+    prefix_size=1 << 16, lazy=False, optimize=False, **resolver_kwargs,
+):
+    """
+    Generates function validating JSON document given as string or bytes while it is
+    parsed. It returns parsed data (or ``True`` in ``bool`` mode) and raises
+    ``json.JSONDecodeError`` for malformed documents like ``json.loads``, except values
+    skipped with ``lazy=True``, which are not checked to be well-formed JSON (see below).
+
+    .. code-block:: python
+
+        validate_json = fastjsonschema.compile_json(definition)
+        data = validate_json(request.body)
+
+    Members of the top-level object or array in the first ``prefix_size`` characters
+    of documents longer than that are validated by their subschemas (``properties``,
+    ``items``, ...) right after they are parsed, so a document with an error near its
+    start is rejected without parsing the rest of it. The rest is parsed at once, which
+    is faster, and the whole document is validated at the end. Valid documents are
+    therefore about as fast as with ``json.loads`` and :any:`compile`.
+
+    With ``duplicate_keys=True`` objects with the same key more than once are invalid
+    (rule ``duplicateKeys``), ``json.loads`` would silently keep only the last value.
+
+    With ``lazy=True`` values of subschemas which do not constrain anything (``{}``,
+    ``true``, ``additionalProperties`` missing or true, ...) are not parsed at all. Their
+    strings, objects and arrays are skipped by finding the end of the string or matching
+    bracket and returned as :any:`Unparsed` with position in the document, so documents
+    with big opaque payloads take less time and memory. Skipped values are checked only
+    for ends of strings and matching brackets, so malformed values like ``[1,,2]``,
+    ``[tru]`` or ``{"x" 1}`` are accepted there. Duplicate keys are not checked in them
+    and early rejection by members of the prefix is not done.
+
+    .. code-block:: python
+
+        validate_json = fastjsonschema.compile_json({'properties': {'id': {'type': 'integer'}}}, lazy=True)
+        data = validate_json('{"id": 1, "payload": {"a": [1, 2]}}')
+        data['payload'].load()  # {'a': [1, 2]}
+
+    Parameters ``handlers``, ``formats``, ``mode`` (``exception`` or ``bool``), ``defaults``
+    (``inject`` or ``off``) and ``optimize`` have the same meaning as for :any:`compile`.
+    """
+    if mode not in ('exception', 'bool'):
+        raise JsonSchemaDefinitionException('compile_json supports only exception and bool mode')
+    if defaults == 'copy':
+        raise JsonSchemaDefinitionException('compile_json can not copy defaults')
+    if not isinstance(prefix_size, int) or isinstance(prefix_size, bool) or prefix_size < 0:
+        raise JsonSchemaDefinitionException('prefix_size must be a non-negative number')
+    if optimize:
+        definition, _ = optimize_schema(definition)
+    return _json_validator(
+        definition, handlers, formats, mode, defaults, duplicate_keys, prefix_size, lazy, **resolver_kwargs,
+    )
+
+
+# pylint: disable=dangerous-default-value
+def compile_incremental(
+    definition, handlers={}, formats={}, *, mode='exception', duplicate_keys=False, optimize=False, **resolver_kwargs,
+):
+    """
+    Generates function validating JSON document too big to be parsed at once, typically
+    a huge top-level array of records. Each member of the top-level array or object is
+    validated by its subschema as soon as it is parsed and then thrown away, so memory
+    is bounded by the size of the biggest member (and keys of the top-level object).
+
+    .. code-block:: python
+
+        validate = fastjsonschema.compile_incremental(definition)
+        with open('records.json', 'rb') as file:
+            validate(file)
+
+        # Or chunks can be pushed one by one:
+        parser = validate.parser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+
+    The top-level value itself is validated only by its keys and length (``required``,
+    ``additionalProperties: false``, ``minItems``, ...) when the document is closed, so
+    definitions with keywords needing the whole value at the top level (``enum``,
+    ``uniqueItems``, ``anyOf``, ...) raise :any:`JsonSchemaDefinitionException`. Errors
+    of members have path from the top-level value, but defaults are not injected.
+
+    Parameters ``handlers``, ``formats``, ``mode`` (``exception`` or ``bool``), ``duplicate_keys``
+    and ``optimize`` have the same meaning as for :any:`compile_json`.
+    """
+    if mode not in ('exception', 'bool'):
+        raise JsonSchemaDefinitionException('compile_incremental supports only exception and bool mode')
+    if optimize:
+        definition, _ = optimize_schema(definition)
+    end = end_definition(definition)
+    members = _json_validator(definition, handlers, formats, mode, 'off', duplicate_keys, 0, **resolver_kwargs)
+    validate_end = compile(end, handlers, formats, mode=mode, defaults='off', **resolver_kwargs)
+    return IncrementalValidator(members, validate_end, end, mode)
+
+
+# pylint: disable=dangerous-default-value
+def validate_stream(
+    source, definition, handlers={}, formats={}, *, workers=None, chunk_size=1000, range_size=1 << 24, optimize=False,
+    stats=None, **resolver_kwargs,
+):
+    """
+    Validates stream of JSON documents, one per line (NDJSON), by ``workers`` processes
+    (by default one per CPU) and yields ``Failure`` with ``line`` number (from 1), ``rule``,
+    ``path`` and ``message`` of each invalid document in the order of lines. Source can be
+    any iterable of strings or bytes, such as an opened file, or a path to a file. Empty
+    lines are skipped.
+
+    .. code-block:: python
+
+        for failure in fastjsonschema.validate_stream('events.ndjson', definition, workers=8):
+            print(failure.line, failure.message)
+
+    Lines are sent to workers in chunks of ``chunk_size`` raw lines, so documents are
+    parsed in parallel too. Files given by a path are memory-mapped and split into ranges
+    of about ``range_size`` bytes ending by a new line, which workers read themselves,
+    only compressed files (``.gz``) are read as a stream. The schema is turned into code
+    only once and workers get that code when they start. Defaults are not applied as
+    documents are not returned. With ``workers=1`` everything is done in the calling process.
+
+    Pass a dictionary as ``stats`` to get number of ``lines``, ``documents`` and ``failures``
+    once all failures were yielded.
+
+    Parameters ``handlers``, ``formats`` and ``optimize`` have the same meaning as for
+    :any:`compile_to_code`, so custom formats have to be regular expressions.
+    """
+    workers = _check_stream_options(workers, chunk_size=chunk_size, range_size=range_size)
+    code, name = _batch_code(definition, handlers, formats, optimize, **resolver_kwargs)
+    if isinstance(source, (str, os.PathLike)):
+        return validate_file(code, name, source, workers, chunk_size, range_size, stats)
+    return validate_chunks(code, name, source, workers, chunk_size, stats)
+
+
+# pylint: disable=dangerous-default-value
+def validate_shard(
+    path, definition, shard, shards, handlers={}, formats={}, *, workers=None, range_size=1 << 24, samples=100,
+    optimize=False, **resolver_kwargs,
+):
+    """
+    Validates part ``shard`` (from 0) of ``shards`` parts of NDJSON file on ``path``
+    in the same way as :any:`validate_stream` and returns report as a dictionary which
+    can be stored as JSON. Parts have about the same size and they start by a new line,
+    so independent jobs (for example on different machines) with the same file and
+    number of shards validate every line exactly once without any coordination.
+
+    .. code-block:: python
+
+        report = fastjsonschema.validate_shard('events.ndjson', definition, shard=3, shards=16)
+        # ... reports of all shards collected ...
+        report = fastjsonschema.merge_reports(reports)
+        print(report['documents'], report['failures'], report['rules'])
+
+    Report contains number of lines of the shard (``shard_lines``), of ``documents`` and
+    of ``failures``, ``failures`` per rule (``rules``), time in ``seconds`` and first
+    ``samples`` failures with ``shard`` and ``line`` in it. Reports are combined by
+    :any:`merge_reports`, which also adds ``file_line`` to samples once the number of lines
+    of all previous shards is known. Compressed files can not be split, ``ValueError``
+    is raised for them.
+    """
+    workers = _check_stream_options(workers, range_size=range_size, shards=shards)
+    if not isinstance(shard, int) or isinstance(shard, bool) or not 0 <= shard < shards:
+        raise JsonSchemaDefinitionException('shard must be a number from 0 to shards - 1')
+    if not isinstance(samples, int) or isinstance(samples, bool) or samples < 0:
+        raise JsonSchemaDefinitionException('samples must be a non-negative number')
+    if str(path).endswith('.gz'):
+        raise ValueError('Compressed files can not be split into shards')
+    code, name = _batch_code(definition, handlers, formats, optimize, **resolver_kwargs)
+    return validate_file_shard(code, name, path, shard, shards, workers, range_size, samples)
+
+
+# pylint: disable=dangerous-default-value
+def compile_pool(
+    definition, handlers={}, formats={}, *, mode='exception', workers=None, chunk_size=1000, in_flight=None,
+    inline_size=None, optimize=False, **resolver_kwargs,
+):
+    """
+    Generates :any:`ValidatorPool` validating batches of documents from ``asyncio`` code
+    by ``workers`` processes (by default one per CPU). Failures are yielded in the order
+    of documents, the same as by the function compiled with ``batch=True``.
+
+    .. code-block:: python
+
+        pool = fastjsonschema.compile_pool(definition, workers=4)
+        async with pool:
+            async for index, error in pool.validate_many_async(records):
+                print(index, error.message)
+
+    Documents are sent to workers in chunks of ``chunk_size`` documents and at most
+    ``in_flight`` chunks (by default two per worker) are waiting for the result, next
+    documents are taken from the iterable only when the consumer of failures catches up.
+    Workers get the generated code once when they start and they are reused by all batches
+    until the pool is closed. Batches with at most ``inline_size`` documents (by default
+    ``chunk_size``) are validated right away in the calling process, as sending them to
+    workers would take longer than the validation. Defaults are not applied as documents
+    are not returned.
+
+    Parameters ``handlers``, ``formats``, ``mode`` and ``optimize`` have the same meaning
+    as for :any:`compile_to_code`, so custom formats have to be regular expressions.
+    """
+    workers = _check_stream_options(workers, chunk_size=chunk_size)
+    if in_flight is None:
+        in_flight = CHUNKS_IN_FLIGHT * workers
+    if inline_size is None:
+        inline_size = chunk_size
+    _check_stream_options(workers, in_flight=in_flight)
+    if not isinstance(inline_size, int) or isinstance(inline_size, bool) or inline_size < 0:
+        raise JsonSchemaDefinitionException('inline_size must be a non-negative number')
+    code, name = _batch_code(definition, handlers, formats, optimize, mode=mode, **resolver_kwargs)
+    return ValidatorPool(code, name, workers, chunk_size, in_flight, inline_size)
+
+
+def _json_validator(
+    definition, handlers, formats, mode, defaults, duplicate_keys, prefix_size, lazy=False, **resolver_kwargs,
+):
+    resolver, code_generator = _factory(definition, handlers, formats, mode=mode, defaults=defaults, **resolver_kwargs)
+    # Functions of members are generated together with the validation function.
+    names = {}
+    for keyword, refs in member_refs(definition).items():
+        if isinstance(refs, dict):
+            names[keyword] = {key: code_generator.get_ref_function_name(ref) for key, ref in refs.items()}
+        elif isinstance(refs, list):
+            names[keyword] = [code_generator.get_ref_function_name(ref) for ref in refs]
+        else:
+            names[keyword] = code_generator.get_ref_function_name(refs)
+    global_state = code_generator.global_state
+    exec(code_generator.func_code, global_state)
+    functions = {}
+    for keyword, value in names.items():
+        if isinstance(value, dict):
+            functions[keyword] = {key: global_state[name] for key, name in value.items()}
+        elif isinstance(value, list):
+            functions[keyword] = [global_state[name] for name in value]
+        else:
+            functions[keyword] = global_state[value]
+    # Definition is known to be valid after the code was generated.
+    plan = lazy_plan(definition) if lazy else FULL
+    return JsonValidator(global_state[resolver.get_scope_name()], functions, mode, duplicate_keys, prefix_size, plan)
+
+
+def _check_stream_options(workers, **options):
+    """
+    Returns number of workers, by default one per CPU.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    for name, value in (('workers', workers),) + tuple(options.items()):
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            raise JsonSchemaDefinitionException('{} must be a positive number'.format(name))
+    return workers
+
+
+def _batch_code(definition, handlers, formats, optimize, mode='exception', **resolver_kwargs):
+    """
+    Returns code for worker processes and name of its batch validation function.
+    """
+    _, code_generator = _factory(
+        definition, handlers, formats, mode=mode, optimize=optimize, defaults='off', batch=True, **resolver_kwargs,
+    )
+    return code_generator.global_state_code + '\n' + code_generator.func_code, code_generator.batch_function_name
+
+
+def _compile_closures(definition, handlers, formats, mode, optimize, defaults, unsupported, **resolver_kwargs):
+    options = [name for name, value in unsupported.items() if value is not None]
+    if options:
+        raise JsonSchemaDefinitionException('closures backend does not support: {}'.format(', '.join(sorted(options))))
+    if optimize:
+        definition, _ = optimize_schema(definition)
     resolver = RefResolver.from_schema(definition, handlers=handlers, **resolver_kwargs)
-    code_generator = _get_code_generator_class(definition)(definition, resolver=resolver, formats=formats)
+    builder_class = {
+        CodeGeneratorDraft04: ClosureBuilderDraft04,
+        CodeGeneratorDraft06: ClosureBuilderDraft06,
+        CodeGeneratorDraft07: ClosureBuilderDraft07,
+    }[_get_code_generator_class(definition)]
+    return builder_class(resolver, formats=formats, mode=mode, defaults=defaults).build()
+
+
+def _factory(
+    definition, handlers, formats={}, mode='exception', max_errors=None, max_depth=None, max_nodes=None, timeout=None,
+    recursion='calls', optimize=False, profile=None, instrument=None, defaults='inject', batch=False, cooperative=None,
+    **resolver_kwargs,
+):
+    if optimize:
+        definition, _ = optimize_schema(definition)
+    resolver = RefResolver.from_schema(definition, handlers=handlers, **resolver_kwargs)
+    code_generator = _get_code_generator_class(definition)(
+        definition, resolver=resolver, formats=formats, mode=mode, max_errors=max_errors,
+        max_depth=max_depth, max_nodes=max_nodes, timeout=timeout, recursion=recursion,
+        profile=profile, instrument=instrument, defaults=defaults, batch=batch, cooperative=cooperative,
+    )
     return resolver, code_generator
 
 
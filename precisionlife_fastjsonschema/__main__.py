@@ -1,10 +1,19 @@
+import argparse
+import gzip
 import json
+import os
 import sys
+import time
 
-from . import compile_to_code
+from . import compile_to_code, merge_reports, validate_shard, validate_stream
 
 
 def main():
+    if sys.argv[1:2] == ['validate']:
+        sys.exit(validate(sys.argv[2:]))
+    if sys.argv[1:2] == ['merge']:
+        sys.exit(merge(sys.argv[2:]))
+
     if len(sys.argv) == 2:
         definition = sys.argv[1]
     else:
@@ -15,5 +24,130 @@ def main():
     print(code)
 
 
+def validate(args):
+    """
+    Validates NDJSON files (documents are one per line) and JSON files (``.json`` with one
+    document) by schema file and prints report as JSON lines: one with ``type`` ``failure``
+    per invalid document and one with ``type`` ``summary`` with statistics per file.
+    Returns exit code, 1 when any document is invalid.
+
+    NDJSON files are read in ranges or chunks, so memory does not grow with their size.
+    JSON file is a single document, which is read and validated whole, so big data sets
+    should be in NDJSON files.
+
+    With ``--shard I/N`` only part I (from 0) of N parts of one NDJSON file is validated
+    and the report of the shard is written as JSON, see ``validate_shard`` and `merge`.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m precisionlife_fastjsonschema validate',
+        description='Validate NDJSON or JSON files, optionally compressed by gzip, by JSON schema.',
+    )
+    parser.add_argument('schema', help='file with JSON schema')
+    parser.add_argument(
+        'files', nargs='+', help='NDJSON files, or JSON files with a single document read whole into memory (.json)',
+    )
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    parser.add_argument(
+        '--chunk-size', type=int, default=1000, help='lines sent to worker at once for compressed files',
+    )
+    parser.add_argument('--range-size', type=int, default=1 << 24, help='bytes of file read by worker at once')
+    parser.add_argument('--shard', type=shard_option, help='validate only part I (from 0) of N parts of the file (I/N)')
+    parser.add_argument('--samples', type=int, default=100, help='failures kept in the report of the shard')
+    parser.add_argument('--output', help='file for the report of the shard (default is standard output)')
+    options = parser.parse_args(args)
+
+    with open(options.schema, 'rb') as file:
+        definition = json.load(file)
+    if options.shard:
+        if len(options.files) != 1:
+            parser.error('only one file can be validated with --shard')
+        if options.files[0].endswith('.gz'):
+            parser.error('compressed files can not be split into shards')
+        report = validate_shard(
+            options.files[0], definition, *options.shard, workers=options.workers,
+            range_size=options.range_size, samples=options.samples,
+        )
+        report['file'] = options.files[0]
+        write_report(report, options.output)
+        return 1 if report['failures'] else 0
+    invalid = False
+    for path in options.files:
+        stats = {}
+        start = time.monotonic()
+        if path.endswith(('.json', '.json.gz')):
+            # One document, possibly on many lines, validated as one "line".
+            with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as file:
+                failures = [
+                    failure._replace(line=None)
+                    for failure in validate_stream([file.read()], definition, workers=1, stats=stats)
+                ]
+        else:
+            failures = validate_stream(
+                path, definition, workers=options.workers, chunk_size=options.chunk_size,
+                range_size=options.range_size, stats=stats,
+            )
+        for failure in failures:
+            invalid = True
+            print(json.dumps(dict(type='failure', file=path, **failure._asdict()), default=str))
+        seconds = time.monotonic() - start
+        size = os.path.getsize(path)
+        print(json.dumps(dict(
+            type='summary',
+            file=path,
+            documents=stats['documents'],
+            failures=stats['failures'],
+            bytes=size,
+            seconds=round(seconds, 6),
+            documents_per_second=round(stats['documents'] / seconds, 1) if seconds else None,
+            bytes_per_second=round(size / seconds, 1) if seconds else None,
+        )))
+    return 1 if invalid else 0
+
+
+def merge(args):
+    """
+    Merges reports of shards created by ``validate --shard`` and writes the report as JSON.
+    Returns exit code, 1 when any document is invalid.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m precisionlife_fastjsonschema merge',
+        description='Merge reports of shards created by validate --shard.',
+    )
+    parser.add_argument('reports', nargs='+', help='files with reports of shards')
+    parser.add_argument(
+        '--samples', type=int, help='failures kept in the merged report (default is the limit of the shards)',
+    )
+    parser.add_argument('--output', help='file for the merged report (default is standard output)')
+    options = parser.parse_args(args)
+
+    reports = []
+    for path in options.reports:
+        with open(path, 'rb') as file:
+            reports.append(json.load(file))
+    report = merge_reports(reports, options.samples)
+    report['file'] = reports[0].get('file')
+    write_report(report, options.output)
+    return 1 if report['failures'] else 0
+
+
+def shard_option(value):
+    try:
+        shard, shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('shard must be in format I/N') from None
+    if not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError('shard must be from 0 to N - 1')
+    return shard, shards
+
+
+def write_report(report, path):
+    content = json.dumps(report, default=str)
+    if path is None:
+        print(content)
+    else:
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content + '\n')
+
+
 if __name__ == '__main__':
     main()
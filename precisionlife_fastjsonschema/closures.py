@@ -0,0 +1,787 @@
+"""
+Validation by a tree of closures
+
+Generating the source code and compiling it by ``exec`` costs much more than validating
+a few documents, and ``exec`` is not allowed everywhere. Builders in this module turn
+the schema into nested closures instead, one per keyword, each bound to its part of the
+definition. Building them is almost free, validation is a few times slower than by
+generated code. Used by ``compile(definition, backend='closures')``.
+
+Keywords mean the same as in generated code (see `CodeGeneratorDraft04` and its subclasses)
+and errors have the same messages, rules and paths. Each closure takes the validated value,
+path to it (as in `JsonSchemaValidationException.path`) and tuple of the root object and
+the special fields extractor, and raises `JsonSchemaValidationException` when it's invalid.
+"""
+
+from collections import OrderedDict
+import base64
+import collections.abc
+import copy
+import decimal
+import json
+import re
+
+from .disjointness import are_disjoint, summarize
+from .draft04 import DOLLAR_FINDER, CodeGeneratorDraft04
+from .draft06 import CodeGeneratorDraft06
+from .draft07 import CodeGeneratorDraft07
+from .exceptions import JsonSchemaDefinitionException, JsonSchemaValidationException
+from .generator import best_anyof_error, enforce_list
+
+NoneType = type(None)
+
+JSON_TYPE_TO_PYTHON_TYPE = {
+    'null': (NoneType,),
+    'boolean': (bool,),
+    'number': (int, float),
+    'integer': (int,),
+    'string': (str,),
+    'array': (collections.abc.Sequence,),
+    'object': (collections.abc.Mapping,),
+}
+
+# Default values of those types can be injected without copying.
+IMMUTABLE_TYPES = (NoneType, bool, int, float, str)
+
+
+def is_dict(value):
+    return isinstance(value, collections.abc.Mapping)
+
+
+def is_list(value):
+    return isinstance(value, collections.abc.Sequence) and not isinstance(value, str)
+
+
+def error(message, value, definition, rule, path, context, **kwargs):
+    root_object, special_fields_extractor = context
+    return JsonSchemaValidationException(
+        message, value=value, definition=definition, rule=rule, path=path,
+        root_object=root_object, special_fields_extractor=special_fields_extractor, **kwargs,
+    )
+
+
+def valid(_data, _path, _context):
+    """
+    Closure of subschema which is valid for any data.
+    """
+
+
+def make_default(default):
+    """
+    Returns function creating the ``default`` value, so mutable defaults are never shared
+    between validated documents.
+    """
+    if isinstance(default, IMMUTABLE_TYPES):
+        return lambda: default
+    return lambda: copy.deepcopy(default)
+
+
+# pylint: disable=too-many-public-methods
+class ClosureBuilderDraft04:
+    """
+    This class is not supposed to be used directly, use ``compile(definition, backend='closures')``.
+
+    In ``bool`` mode defaults are not injected, same as by generated code.
+    """
+
+    FORMAT_REGEXS = CodeGeneratorDraft04.FORMAT_REGEXS
+
+    def __init__(self, resolver, formats={}, mode='exception', defaults='inject'):
+        if mode not in ('exception', 'bool'):
+            raise JsonSchemaDefinitionException('closures backend supports only exception and bool modes')
+        if defaults not in ('inject', 'off'):
+            raise JsonSchemaDefinitionException('closures backend supports only inject and off defaults')
+        self._resolver = resolver
+        self._custom_formats = formats
+        self._mode = mode
+        self._inject_defaults = mode != 'bool' and defaults == 'inject'
+        # Map of URI to list with the closure of referenced schema. The list is empty while
+        # the closure is being built, so recursive references look into it only at runtime.
+        self._refs = {}
+        self._keywords = OrderedDict((
+            ('type', self.build_type),
+            ('enum', self.build_enum),
+            ('allOf', self.build_all_of),
+            ('anyOf', self.build_any_of),
+            ('oneOf', self.build_one_of),
+            ('not', self.build_not),
+            ('minLength', self.build_min_length),
+            ('maxLength', self.build_max_length),
+            ('pattern', self.build_pattern),
+            ('format', self.build_format),
+            ('minimum', self.build_minimum),
+            ('maximum', self.build_maximum),
+            ('multipleOf', self.build_multiple_of),
+            ('minItems', self.build_min_items),
+            ('maxItems', self.build_max_items),
+            ('uniqueItems', self.build_unique_items),
+            ('items', self.build_items),
+            ('minProperties', self.build_min_properties),
+            ('maxProperties', self.build_max_properties),
+            ('properties', self.build_properties),
+            ('patternProperties', self.build_pattern_properties),
+            ('required', self.build_required_and_additional),
+            ('additionalProperties', self.build_required_and_additional),
+            ('dependencies', self.build_dependencies),
+        ))
+
+    def build(self):
+        """
+        Returns validation function of the whole schema with the same signature
+        as generated one.
+        """
+        check = self.build_ref(self._resolver.resolution_scope)
+        if self._mode == 'bool':
+            def validate(data):
+                try:
+                    check(data, [], (data, None))
+                except JsonSchemaValidationException:
+                    return False
+                return True
+        else:
+            # pylint: disable=dangerous-default-value
+            def validate(data, *, root_object=None, root_path=[], special_fields_extractor=None):
+                check(data, root_path, (data if root_object is None else root_object, special_fields_extractor))
+                return data
+        return validate
+
+    def build_node(self, definition):
+        """
+        Returns closure validating data by ``definition``.
+        """
+        if not isinstance(definition, dict):
+            raise JsonSchemaDefinitionException('definition must be an object')
+        if '$ref' in definition:
+            # Ref overrides any sibling keywords.
+            return self.build_ref(definition['$ref'])
+        checks = []
+        builders = []
+        for key, builder in self._keywords.items():
+            # One builder can handle more keywords.
+            if key in definition and builder not in builders:
+                builders.append(builder)
+                check = builder(definition)
+                if check is not None:
+                    checks.append(check)
+        if not checks:
+            return valid
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(data, path, context):
+            for check in checks:
+                check(data, path, context)
+        return check_all
+
+    def build_ref(self, ref):
+        with self._resolver.in_scope(ref):
+            uri = self._resolver.get_uri()
+        cell = self._refs.get(uri)
+        if cell is None:
+            cell = self._refs[uri] = []
+            with self._resolver.resolving(uri) as definition:
+                cell.append(self.build_node(definition))
+        if cell:
+            return cell[0]
+
+        def check_recursive(data, path, context):
+            cell[0](data, path, context)
+        return check_recursive
+
+    def type_exceptions(self, types):
+        """
+        Returns which values are valid or invalid regardless of Python type, as
+        (floats without fraction are integers, bool is not a number, str is not an array).
+        """
+        if 'array' in types and 'string' not in types:
+            return False, False, True
+        return False, ('number' in types or 'integer' in types) and 'boolean' not in types, False
+
+    def build_type(self, definition):
+        types = enforce_list(definition['type'])
+        try:
+            python_types = tuple(python_type for type_ in types for python_type in JSON_TYPE_TO_PYTHON_TYPE[type_])
+        except KeyError as exc:
+            raise JsonSchemaDefinitionException('Unknown type: {}'.format(exc))
+        integer_floats, reject_bool, reject_str = self.type_exceptions(types)
+        message = 'must be {}, but is a: '.format(' or '.join(types))
+
+        def check_type(data, path, context):
+            if (
+                not isinstance(data, python_types)
+                and not (integer_floats and isinstance(data, float) and data.is_integer())
+                or reject_bool and isinstance(data, bool)
+                or reject_str and isinstance(data, str)
+            ):
+                raise error(message + type(data).__name__, data, definition, 'type', path, context)
+        return check_type
+
+    def build_enum(self, definition):
+        enum = definition['enum']
+        if not isinstance(enum, (list, tuple)):
+            raise JsonSchemaDefinitionException('enum must be an array')
+        message = 'must be one of {} but is: '.format(enum)
+
+        def check_enum(data, path, context):
+            if data not in enum:
+                raise error(message + str(data), data, definition, 'enum', path, context)
+        return check_enum
+
+    def build_all_of(self, definition):
+        checks = [self.build_node(item) for item in definition['allOf']]
+
+        def check_all_of(data, path, context):
+            for check in checks:
+                check(data, path, context)
+        return check_all_of
+
+    def build_any_of(self, definition):
+        checks = [self.build_node(item) for item in definition['anyOf']]
+        if self._mode == 'bool':
+            def check_any_of_bool(data, path, context):
+                for check in checks:
+                    try:
+                        check(data, path, context)
+                    except JsonSchemaValidationException:
+                        continue
+                    return
+                raise error('must be valid by one of anyOf definition', data, definition, 'anyOf', path, context)
+            return check_any_of_bool
+
+        def check_any_of(data, path, context):
+            errors = []
+            for check in checks:
+                try:
+                    check(data, path, context)
+                except JsonSchemaValidationException as exc:
+                    errors.append(exc)
+                else:
+                    return
+            raise best_anyof_error(data, context[0], path, errors, context[1], definition)
+        return check_any_of
+
+    def build_one_of(self, definition):
+        checks = [self.build_node(item) for item in definition['oneOf']]
+        # When branches are disjoint, no other branch can be valid after the first valid one.
+        summaries = [summarize(item, self._resolver, self._keywords) for item in definition['oneOf']]
+        enough = 1 if are_disjoint(summaries) else 2
+
+        def check_one_of(data, path, context):
+            count = 0
+            for check in checks:
+                try:
+                    check(data, path, context)
+                except JsonSchemaValidationException:
+                    continue
+                count += 1
+                if count == enough:
+                    break
+            if count != 1:
+                raise error(
+                    'must be valid exactly by one of oneOf definition', data, definition, 'oneOf', path, context,
+                )
+        return check_one_of
+
+    def build_not(self, definition):
+        not_definition = definition['not']
+        if not_definition is False:
+            return None
+        if not_definition is True:
+            def check_not_true(data, path, context):
+                raise error('must not be there', data, definition, 'not', path, context)
+            return check_not_true
+        not_check = self.build_node(not_definition)
+
+        def check_not(data, path, context):
+            try:
+                not_check(data, path, context)
+            except JsonSchemaValidationException:
+                return
+            raise error('must not be valid by not definition', data, definition, 'not', path, context)
+        return check_not
+
+    def build_min_length(self, definition):
+        min_length = definition['minLength']
+        if not isinstance(min_length, int):
+            raise JsonSchemaDefinitionException('minLength must be a number')
+        message = 'must be longer than or equal to {} characters'.format(min_length)
+
+        def check_min_length(data, path, context):
+            if isinstance(data, str) and len(data) < min_length:
+                raise error(message, data, definition, 'minLength', path, context)
+        return check_min_length
+
+    def build_max_length(self, definition):
+        max_length = definition['maxLength']
+        if not isinstance(max_length, int):
+            raise JsonSchemaDefinitionException('maxLength must be a number')
+        message = 'must be shorter than or equal to {} characters'.format(max_length)
+
+        def check_max_length(data, path, context):
+            if isinstance(data, str) and len(data) > max_length:
+                raise error(message, data, definition, 'maxLength', path, context)
+        return check_max_length
+
+    def build_pattern(self, definition):
+        pattern = definition['pattern']
+        regex = re.compile(DOLLAR_FINDER.sub(r'\\Z', pattern))
+        message = '" does not match pattern "{}"'.format(pattern)
+
+        def check_pattern(data, path, context):
+            if isinstance(data, str) and not regex.search(data):
+                raise error('"' + data + message, data, definition, 'pattern', path, context)
+        return check_pattern
+
+    def build_format(self, definition):
+        format_ = definition['format']
+        message = 'must be {}'.format(format_)
+        # Checking custom formats - user is allowed to override default formats.
+        if format_ in self._custom_formats and not isinstance(self._custom_formats[format_], str):
+            is_valid = self._custom_formats[format_]
+        elif format_ in self._custom_formats or format_ in self.FORMAT_REGEXS:
+            is_valid = re.compile(self._custom_formats.get(format_) or self.FORMAT_REGEXS[format_]).match
+        # Format regex is used only in meta schemas.
+        elif format_ == 'regex':
+            message = 'must be a valid regex'
+
+            def is_valid(data):
+                try:
+                    re.compile(data)
+                except Exception:  # pylint: disable=broad-except
+                    return False
+                return True
+        else:
+            raise JsonSchemaDefinitionException('Unknown format: {}'.format(format_))
+
+        def check_format(data, path, context):
+            if isinstance(data, str) and not is_valid(data):
+                raise error(message, data, definition, 'format', path, context)
+        return check_format
+
+    def is_exclusive(self, definition, key):
+        """
+        Returns if ``minimum`` or ``maximum`` is made exclusive by boolean ``key``.
+        """
+        return definition.get(key, False)
+
+    def build_minimum(self, definition):
+        minimum = definition['minimum']
+        if not isinstance(minimum, (int, float)):
+            raise JsonSchemaDefinitionException('minimum must be a number')
+        if self.is_exclusive(definition, 'exclusiveMinimum'):
+            message = 'must be bigger than {}'.format(minimum)
+
+            def check_minimum(data, path, context):
+                if isinstance(data, (int, float)) and data <= minimum:
+                    raise error(message, data, definition, 'minimum', path, context)
+        else:
+            message = 'must be bigger than or equal to {}'.format(minimum)
+
+            def check_minimum(data, path, context):
+                if isinstance(data, (int, float)) and data < minimum:
+                    raise error(message, data, definition, 'minimum', path, context)
+        return check_minimum
+
+    def build_maximum(self, definition):
+        maximum = definition['maximum']
+        if not isinstance(maximum, (int, float)):
+            raise JsonSchemaDefinitionException('maximum must be a number')
+        if self.is_exclusive(definition, 'exclusiveMaximum'):
+            message = 'must be smaller than {}'.format(maximum)
+
+            def check_maximum(data, path, context):
+                if isinstance(data, (int, float)) and data >= maximum:
+                    raise error(message, data, definition, 'maximum', path, context)
+        else:
+            message = 'must be smaller than or equal to {}'.format(maximum)
+
+            def check_maximum(data, path, context):
+                if isinstance(data, (int, float)) and data > maximum:
+                    raise error(message, data, definition, 'maximum', path, context)
+        return check_maximum
+
+    def build_multiple_of(self, definition):
+        multiple_of = definition['multipleOf']
+        if not isinstance(multiple_of, (int, float)):
+            raise JsonSchemaDefinitionException('multipleOf must be a number')
+        message = 'must be multiple of {}'.format(multiple_of)
+        # For proper multiplication check of floats we need to use decimals,
+        # because for example 19.01 / 0.01 = 1901.0000000000002.
+        decimal_multiple_of = decimal.Decimal(repr(multiple_of)) if isinstance(multiple_of, float) else None
+
+        def check_multiple_of(data, path, context):
+            if isinstance(data, (int, float)):
+                if decimal_multiple_of is None:
+                    quotient = data / multiple_of
+                else:
+                    quotient = decimal.Decimal(repr(data)) / decimal_multiple_of
+                if int(quotient) != quotient:
+                    raise error(message, data, definition, 'multipleOf', path, context)
+        return check_multiple_of
+
+    def build_min_items(self, definition):
+        min_items = definition['minItems']
+        if not isinstance(min_items, int):
+            raise JsonSchemaDefinitionException('minItems must be a number')
+        message = 'must contain at least {} items'.format(min_items)
+
+        def check_min_items(data, path, context):
+            if is_list(data) and len(data) < min_items:
+                raise error(message, data, definition, 'minItems', path, context)
+        return check_min_items
+
+    def build_max_items(self, definition):
+        max_items = definition['maxItems']
+        if not isinstance(max_items, int):
+            raise JsonSchemaDefinitionException('maxItems must be a number')
+        message = 'must contain less than or equal to {} items'.format(max_items)
+
+        def check_max_items(data, path, context):
+            if is_list(data) and len(data) > max_items:
+                raise error(message, data, definition, 'maxItems', path, context)
+        return check_max_items
+
+    def build_unique_items(self, definition):
+        def check_unique_items(data, path, context):
+            if is_list(data) and len(data) > len(set(str(item) for item in data)):
+                raise error('must contain unique items', data, definition, 'uniqueItems', path, context)
+        return check_unique_items
+
+    def build_items(self, definition):
+        items_definition = definition['items']
+        if items_definition is True:
+            return None
+        if items_definition is False:
+            def check_no_items(data, path, context):
+                if is_list(data) and data:
+                    raise error(
+                        'must be empty, because items definition is False', data, definition, 'items', path, context,
+                    )
+            return check_no_items
+        if not isinstance(items_definition, list):
+            if not items_definition:
+                return None
+            item_check = self.build_node(items_definition)
+
+            def check_items(data, path, context):
+                if is_list(data):
+                    for index, item in enumerate(data):
+                        item_check(item, path + [index], context)
+            return check_items
+
+        item_checks = []
+        for item_definition in items_definition:
+            default = None
+            if self._inject_defaults and isinstance(item_definition, dict) and 'default' in item_definition:
+                default = make_default(item_definition['default'])
+            item_checks.append((self.build_node(item_definition), default))
+        count = len(item_checks)
+        additional_items = definition.get('additionalItems', True)
+        additional_check = None
+        if additional_items is not False and 'additionalItems' in definition:
+            additional_check = self.build_node(additional_items)
+
+        def check_tuple(data, path, context):
+            if not is_list(data):
+                return
+            length = len(data)
+            for index, (item_check, default) in enumerate(item_checks):
+                if index < length:
+                    item_check(data[index], path + [index], context)
+                elif default is not None:
+                    data.append(default())
+            if additional_items is False:
+                if length > count:
+                    raise error('must contain only specified items', data, definition, 'items', path, context)
+            elif additional_check is not None:
+                for index in range(count, length):
+                    additional_check(data[index], path + [index], context)
+        return check_tuple
+
+    def build_min_properties(self, definition):
+        min_properties = definition['minProperties']
+        if not isinstance(min_properties, int):
+            raise JsonSchemaDefinitionException('minProperties must be a number')
+        message = 'must contain at least {} properties'.format(min_properties)
+
+        def check_min_properties(data, path, context):
+            if is_dict(data) and len(data) < min_properties:
+                raise error(message, data, definition, 'minProperties', path, context)
+        return check_min_properties
+
+    def build_max_properties(self, definition):
+        max_properties = definition['maxProperties']
+        if not isinstance(max_properties, int):
+            raise JsonSchemaDefinitionException('maxProperties must be a number')
+        message = 'must contain less than or equal to {} properties'.format(max_properties)
+
+        def check_max_properties(data, path, context):
+            if is_dict(data) and len(data) > max_properties:
+                raise error(message, data, definition, 'maxProperties', path, context)
+        return check_max_properties
+
+    def build_properties(self, definition):
+        properties = []
+        for key, prop_definition in definition['properties'].items():
+            if not isinstance(prop_definition, (dict, bool)):
+                raise JsonSchemaDefinitionException('data[{}] must be object'.format(key))
+            default = None
+            if self._inject_defaults and isinstance(prop_definition, dict) and 'default' in prop_definition:
+                default = make_default(prop_definition['default'])
+            properties.append((key, self.build_node(prop_definition), default))
+
+        def check_properties(data, path, context):
+            if not is_dict(data):
+                return
+            for key, prop_check, default in properties:
+                if key in data:
+                    prop_check(data[key], path + [key], context)
+                elif default is not None:
+                    data[key] = default()
+        return check_properties
+
+    def build_pattern_properties(self, definition):
+        patterns = [
+            (re.compile(pattern), self.build_node(pattern_definition))
+            for pattern, pattern_definition in definition['patternProperties'].items()
+        ]
+
+        def check_pattern_properties(data, path, context):
+            if not is_dict(data):
+                return
+            for key, value in data.items():
+                for regex, pattern_check in patterns:
+                    if regex.search(key):
+                        pattern_check(value, path + [key], context)
+        return check_pattern_properties
+
+    def build_required_and_additional(self, definition):
+        """
+        Both keywords are reported together by one exception (rule ``required-additionalProperties``)
+        listing all missing and all extra fields.
+        """
+        required = definition.get('required', ())
+        if not isinstance(required, (list, tuple)):
+            raise JsonSchemaDefinitionException('required must be an array')
+        additional = definition.get('additionalProperties', True)
+        if additional is True or additional == {}:
+            additional = None
+        properties = definition.get('properties', {})
+        patterns = [re.compile(pattern) for pattern in definition.get('patternProperties', {})]
+        additional_check = self.build_node(additional) if additional else None
+
+        def check_required_and_additional(data, path, context):
+            if not is_dict(data):
+                return
+            missing = []
+            extra = []
+            if required and not all(prop in data for prop in required):
+                missing = sorted(set(required) - data.keys())
+            if additional is not None:
+                for key in data:
+                    if key in properties or any(regex.search(key) for regex in patterns):
+                        continue
+                    if additional_check is None:
+                        extra.append(key)
+                    else:
+                        additional_check(data[key], path + [key], context)
+            if missing or extra:
+                raise error(
+                    'missing/extra properties', data, definition, 'required-additionalProperties', path, context,
+                    missing_fields=missing, extra_fields=extra,
+                )
+        return check_required_and_additional
+
+    def build_dependencies(self, definition):
+        dependencies = []
+        for key, values in definition['dependencies'].items():
+            if values == [] or values is True:
+                continue
+            if values is False or isinstance(values, list):
+                dependencies.append((key, values, None))
+            else:
+                dependencies.append((key, None, self.build_node(values)))
+
+        def check_dependencies(data, path, context):
+            if not is_dict(data):
+                return
+            for key, values, dependency_check in dependencies:
+                if key not in data:
+                    continue
+                if values is False:
+                    raise error('{} must not be there'.format(key), data, definition, 'dependencies', path, context)
+                if dependency_check is not None:
+                    dependency_check(data, path, context)
+                    continue
+                for value in values:
+                    if value not in data:
+                        message = 'missing dependency {} for {}'.format(value, key)
+                        raise error(message, data, definition, 'dependencies', path, context)
+        return check_dependencies
+
+
+class ClosureBuilderDraft06(ClosureBuilderDraft04):
+    FORMAT_REGEXS = CodeGeneratorDraft06.FORMAT_REGEXS
+
+    def __init__(self, resolver, formats={}, mode='exception', defaults='inject'):
+        super().__init__(resolver, formats, mode, defaults)
+        self._keywords.update((
+            ('exclusiveMinimum', self.build_exclusive_minimum),
+            ('exclusiveMaximum', self.build_exclusive_maximum),
+            ('propertyNames', self.build_property_names),
+            ('contains', self.build_contains),
+            ('const', self.build_const),
+        ))
+
+    def build_node(self, definition):
+        if definition is True:
+            return valid
+        if definition is False:
+            def check_false(data, path, context):
+                raise error('must not be there', data, definition, None, path, context)
+            return check_false
+        return super().build_node(definition)
+
+    def type_exceptions(self, types):
+        _, reject_bool, reject_str = super().type_exceptions(types)
+        return 'integer' in types and not reject_str, reject_bool, reject_str
+
+    def is_exclusive(self, definition, key):
+        # Since draft 06 exclusive bounds are numbers checked on their own.
+        return False
+
+    def build_exclusive_minimum(self, definition):
+        minimum = definition['exclusiveMinimum']
+        if not isinstance(minimum, (int, float)):
+            raise JsonSchemaDefinitionException('exclusiveMinimum must be an integer or a float')
+        message = 'must be bigger than {}'.format(minimum)
+
+        def check_exclusive_minimum(data, path, context):
+            if isinstance(data, (int, float)) and data <= minimum:
+                raise error(message, data, definition, 'exclusiveMinimum', path, context)
+        return check_exclusive_minimum
+
+    def build_exclusive_maximum(self, definition):
+        maximum = definition['exclusiveMaximum']
+        if not isinstance(maximum, (int, float)):
+            raise JsonSchemaDefinitionException('exclusiveMaximum must be an integer or a float')
+        message = 'must be smaller than {}'.format(maximum)
+
+        def check_exclusive_maximum(data, path, context):
+            if isinstance(data, (int, float)) and data >= maximum:
+                raise error(message, data, definition, 'exclusiveMaximum', path, context)
+        return check_exclusive_maximum
+
+    def build_property_names(self, definition):
+        property_names_definition = definition['propertyNames']
+        if property_names_definition is True:
+            return None
+        if property_names_definition is False:
+            def check_no_property_names(data, path, context):
+                if is_dict(data) and data:
+                    raise error('must not be there', data, definition, 'propertyNames', path, context)
+            return check_no_property_names
+        name_check = self.build_node(property_names_definition)
+
+        def check_property_names(data, path, context):
+            if not is_dict(data):
+                return
+            for key in data:
+                try:
+                    name_check(key, path, context)
+                except JsonSchemaValidationException:
+                    raise error(
+                        'must be named by propertyName definition', data, definition, 'propertyNames', path, context,
+                    )
+        return check_property_names
+
+    def build_contains(self, definition):
+        contains_definition = definition['contains']
+        if contains_definition is False:
+            def check_contains_false(data, path, context):
+                if is_list(data):
+                    raise error('is always invalid', data, definition, 'contains', path, context)
+            return check_contains_false
+        if contains_definition is True:
+            def check_contains_true(data, path, context):
+                if is_list(data) and not data:
+                    raise error('must not be empty', data, definition, 'contains', path, context)
+            return check_contains_true
+        item_check = self.build_node(contains_definition)
+
+        def check_contains(data, path, context):
+            if not is_list(data):
+                return
+            for item in data:
+                try:
+                    item_check(item, path, context)
+                except JsonSchemaValidationException:
+                    continue
+                return
+            raise error('must contain one of contains definition', data, definition, 'contains', path, context)
+        return check_contains
+
+    def build_const(self, definition):
+        const = definition['const']
+        message = 'must be const {} but is: '.format('"{}"'.format(const) if isinstance(const, str) else const)
+
+        def check_const(data, path, context):
+            if data != const:
+                raise error(message + str(data), data, definition, 'const', path, context)
+        return check_const
+
+
+class ClosureBuilderDraft07(ClosureBuilderDraft06):
+    FORMAT_REGEXS = CodeGeneratorDraft07.FORMAT_REGEXS
+
+    def __init__(self, resolver, formats={}, mode='exception', defaults='inject'):
+        super().__init__(resolver, formats, mode, defaults)
+        self._keywords.update((
+            ('if', self.build_if_then_else),
+            ('contentEncoding', self.build_content),
+            ('contentMediaType', self.build_content),
+        ))
+
+    def build_if_then_else(self, definition):
+        if_check = self.build_node(definition['if'])
+        then_check = self.build_node(definition['then']) if 'then' in definition else valid
+        else_check = self.build_node(definition['else']) if 'else' in definition else valid
+
+        def check_if_then_else(data, path, context):
+            try:
+                if_check(data, path, context)
+            except JsonSchemaValidationException:
+                else_check(data, path, context)
+            else:
+                then_check(data, path, context)
+        return check_if_then_else
+
+    def build_content(self, definition):
+        """
+        Both content keywords together, the value decoded by ``contentEncoding`` is then
+        loaded by ``contentMediaType``.
+        """
+        base64_encoded = definition.get('contentEncoding') == 'base64'
+        json_media_type = definition.get('contentMediaType') == 'application/json'
+        if not base64_encoded and not json_media_type:
+            return None
+
+        def check_content(data, path, context):
+            if base64_encoded and isinstance(data, str):
+                try:
+                    data = base64.b64decode(data)
+                except Exception:  # pylint: disable=broad-except
+                    raise error('must be encoded by base64', data, definition, None, path, context)
+            if not json_media_type:
+                return
+            if isinstance(data, bytes):
+                try:
+                    data = data.decode('utf-8')
+                except Exception:  # pylint: disable=broad-except
+                    raise error('must encoded by utf8', data, definition, None, path, context)
+            if isinstance(data, str):
+                try:
+                    json.loads(data)
+                except Exception:  # pylint: disable=broad-except
+                    raise error('must be valid JSON', data, definition, None, path, context)
+        return check_content
@@ -0,0 +1,176 @@
+"""
+Static analysis proving that no value can be valid by two subschemas at once
+
+Used by ``oneOf``: when all its branches are mutually exclusive, validation can stop
+at the first valid branch instead of trying all others to be sure no other is valid.
+Branches are proven disjoint by different ``type``, different ``const``/``enum`` values
+(of the value itself or of a required property of objects) or by numeric ranges which
+do not overlap. Anything else is considered possibly overlapping.
+"""
+
+# How deep references and allOf are followed to find the constraints.
+MAX_DEPTH = 8
+
+
+class Summary:
+    """
+    Constraints of a subschema which are important for disjointness. None means
+    no constraint.
+    """
+
+    def __init__(self):
+        self.types = None
+        self.values = None
+        self.required = set()
+        self.property_values = {}
+        # (value, exclusive) or None
+        self.low = None
+        self.high = None
+
+    def add(self, other):
+        """
+        Add constraints of ``other`` subschema which has to be valid too (``allOf``).
+        """
+        if other.types is not None:
+            self.types = other.types if self.types is None else intersect_types(self.types, other.types)
+        if other.values is not None:
+            self.values = other.values if self.values is None else intersect_values(self.values, other.values)
+        self.required |= other.required
+        for name, values in other.property_values.items():
+            if name in self.property_values:
+                values = intersect_values(self.property_values[name], values)
+            self.property_values[name] = values
+        self.low = stricter_bound(self.low, other.low, lower=True)
+        self.high = stricter_bound(self.high, other.high, lower=False)
+
+
+def summarize(definition, resolver, keywords, depth=0):
+    """
+    Returns `Summary` of ``definition``. References are resolved by ``resolver``.
+    Only ``keywords`` supported by used draft are taken into account.
+    """
+    summary = Summary()
+    if definition is False:
+        summary.types = frozenset()
+        return summary
+    if not isinstance(definition, dict) or depth > MAX_DEPTH:
+        return summary
+    if '$ref' in definition:
+        with resolver.resolving(definition['$ref']) as target:
+            return summarize(target, resolver, keywords, depth + 1)
+
+    types = definition.get('type')
+    if isinstance(types, str):
+        summary.types = frozenset([types])
+    elif isinstance(types, list) and all(isinstance(type_, str) for type_ in types):
+        summary.types = frozenset(types)
+    if 'const' in definition and 'const' in keywords:
+        summary.values = [definition['const']]
+    elif isinstance(definition.get('enum'), list):
+        summary.values = definition['enum']
+
+    if isinstance(definition.get('required'), list):
+        summary.required = set(name for name in definition['required'] if isinstance(name, str))
+    properties = definition.get('properties')
+    if isinstance(properties, dict):
+        for name, property_definition in properties.items():
+            values = summarize(property_definition, resolver, keywords, depth + 1).values
+            if values is not None:
+                summary.property_values[name] = values
+
+    summary.low = numeric_bound(definition, 'minimum', 'exclusiveMinimum', lower=True)
+    summary.high = numeric_bound(definition, 'maximum', 'exclusiveMaximum', lower=False)
+
+    if isinstance(definition.get('allOf'), list):
+        for item in definition['allOf']:
+            summary.add(summarize(item, resolver, keywords, depth + 1))
+    return summary
+
+
+def are_disjoint(summaries):
+    """
+    Returns True only when it's proven that no value is valid by any two summaries.
+    """
+    for index, summary1 in enumerate(summaries):
+        for summary2 in summaries[index + 1:]:
+            if not is_disjoint(summary1, summary2):
+                return False
+    return True
+
+
+def is_disjoint(summary1, summary2):
+    if summary1.types is not None and summary2.types is not None:
+        if not intersect_types(summary1.types, summary2.types):
+            return True
+    if summary1.values is not None and summary2.values is not None:
+        if not intersect_values(summary1.values, summary2.values):
+            return True
+    # Required properties are checked only for objects, other values are valid by both.
+    if summary1.types == {'object'} and summary2.types == {'object'}:
+        for name in summary1.required & summary2.required:
+            values1 = summary1.property_values.get(name)
+            values2 = summary2.property_values.get(name)
+            if values1 is not None and values2 is not None and not intersect_values(values1, values2):
+                return True
+    # Numeric ranges are checked only for numbers, other values are valid by both.
+    if summary1.types and summary2.types and summary1.types | summary2.types <= {'number', 'integer'}:
+        if is_below(summary1.high, summary2.low) or is_below(summary2.high, summary1.low):
+            return True
+    return False
+
+
+def intersect_types(types1, types2):
+    """
+    Integer is also a number.
+    """
+    return frozenset(
+        [type_ for type_ in types1 if type_ in types2 or (type_ == 'integer' and 'number' in types2)]
+        + [type_ for type_ in types2 if type_ == 'integer' and 'number' in types1]
+    )
+
+
+def intersect_values(values1, values2):
+    """
+    Values are compared by Python equality like generated code does it, so for example
+    ``1``, ``1.0`` and ``True`` are the same.
+    """
+    return [value1 for value1 in values1 if any(value1 == value2 for value2 in values2)]
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def numeric_bound(definition, key, exclusive_key, lower):
+    """
+    Returns the bound as (value, exclusive). Exclusive keyword is boolean in draft 04
+    and number since draft 06.
+    """
+    bound = None
+    exclusive = definition.get(exclusive_key)
+    if is_number(definition.get(key)):
+        bound = (definition[key], exclusive is True)
+    if is_number(exclusive):
+        bound = stricter_bound(bound, (exclusive, True), lower)
+    return bound
+
+
+def stricter_bound(bound1, bound2, lower):
+    if bound1 is None:
+        return bound2
+    if bound2 is None:
+        return bound1
+    if bound1[0] == bound2[0]:
+        return (bound1[0], bound1[1] or bound2[1])
+    if (bound1[0] > bound2[0]) == lower:
+        return bound1
+    return bound2
+
+
+def is_below(high, low):
+    """
+    Returns True if no number is lower than ``high`` and greater than ``low`` bound.
+    """
+    if high is None or low is None:
+        return False
+    return high[0] < low[0] or (high[0] == low[0] and (high[1] or low[1]))
@@ -1,8 +1,9 @@
 import decimal
 import re
 
+from .disjointness import are_disjoint, summarize
 from .exceptions import JsonSchemaDefinitionException
-from .generator import CodeGenerator, enforce_list, prepare_path
+from .generator import CodeGenerator, enforce_list, prepare_call_path, prepare_path
 
 JSON_TYPE_TO_PYTHON_TYPE = {
     'null': 'NoneType',
@@ -33,8 +34,8 @@ class CodeGeneratorDraft04(CodeGenerator):
         'uri': r'^\w+:(\/?\/?)[^\s]+\Z',
     }
 
-    def __init__(self, definition, resolver=None, formats={}):
-        super().__init__(definition, resolver)
+    def __init__(self, definition, resolver=None, formats={}, **kwargs):
+        super().__init__(definition, resolver, **kwargs)
         self._custom_formats = formats
         self._json_keywords_to_function.update((
             ('type', self.generate_type),
@@ -79,6 +80,8 @@ class CodeGeneratorDraft04(CodeGenerator):
             {'type': ['string', 'number']}
         """
         types = enforce_list(self._definition['type'])
+        if self.is_type_proven(*types):
+            return
         try:
             python_types = ', '.join(JSON_TYPE_TO_PYTHON_TYPE[t] for t in types)
         except KeyError as exc:
@@ -92,6 +95,7 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         with self.l('if not isinstance({variable}, ({})){}:', python_types, extra):
             self.exc('must be {}, but is a: " + type({variable}).__name__ + "', ' or '.join(types), rule='type')
+        self.prove_type(types)
 
     def generate_enum(self):
         """
@@ -144,22 +148,47 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         Valid values for this definition are 3, 4, 5, 10, 11, ... but not 8 for example.
         """
+        items = self.any_of_order(self._definition['anyOf'])
+        if self._mode == 'bool':
+            calls = [
+                (index, self.predicate_call(self.get_predicate_function_name(definition_item), self._variable))
+                for index, definition_item in items
+            ]
+            if self._instrument is None:
+                with self.l('if not ({}):', ' or '.join(call for _, call in calls)):
+                    self.exc('must be valid by one of anyOf definition', rule='anyOf')
+                return
+            # Instrumented code has to know which branch matched.
+            for position, (index, call) in enumerate(calls):
+                with self.l('{} {}:', 'elif' if position else 'if', call, optimize=False):
+                    self.l('profile.hit({!r}, {})', self.site_key(self._definition), index)
+            with self.l('else:'):
+                self.exc('must be valid by one of anyOf definition', rule='anyOf')
+            return
+
         self.l('{variable}_any_of_count = 0')
-        self.l('{variable}_errors = []')
-        for definition_item in self._definition['anyOf']:
+        # Tuple, so nothing is allocated unless some branch fails.
+        self.l('{variable}_errors = ()')
+        for index, definition_item in items:
             # When we know it's passing (at least once), we do not need to do another expensive try-except.
             with self.l('if not {variable}_any_of_count:', optimize=False):
-                with self.l('try:', optimize=False):
+                with self.l('try:', optimize=False), self.branch():
                     self.generate_func_code_block(definition_item, self._variable, self._variable_path, clear_variables=True)
                     self.l('{variable}_any_of_count += 1')
+                    if self._instrument is not None:
+                        self.l('profile.hit({!r}, {})', self.site_key(self._definition), index)
                 with self.l('except JsonSchemaValidationException as exc:'):
-                    self.l('{variable}_errors.append(exc)')
+                    self.l('{variable}_errors += (exc,)')
 
         with self.l('if not {variable}_any_of_count:', optimize=False):
             self.create_variable_is_dict()
             #with self.l('if special_fields_extractor and {variable}_is_dict:'):
             name_path = prepare_path(self._variable_path)
-            self.l('raise_best_anyof_error({variable}, root_object, root_path + ' + name_path + ', {variable}_errors, special_fields_extractor, {definition})', definition=repr(self._definition))
+            self.fail(
+                'best_anyof_error({variable}, root_object, build_path(root_path) + ' + name_path
+                + ', {variable}_errors, special_fields_extractor, {definition})',
+                definition=repr(self._definition),
+            )
             #self.exc('must be valid by one of anyOf definition. Candidates:\n  -- " + "\n  -- ".join(str(error) for error in {variable}_errors) + "', rule='anyOf')
 
     def generate_one_of(self):
@@ -178,11 +207,26 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         Valid values for this definition are 3, 5, 6, ... but not 15 for example.
         """
+        # When branches are disjoint, no other branch can be valid after the first valid one.
+        # Otherwise we have to continue until the second valid branch.
+        summaries = [
+            summarize(item, self._resolver, self._json_keywords_to_function) for item in self._definition['oneOf']
+        ]
+        count_condition = 'not {variable}_one_of_count' if are_disjoint(summaries) else '{variable}_one_of_count < 2'
         self.l('{variable}_one_of_count = 0')
+        if self._mode == 'bool':
+            for definition_item in self._definition['oneOf']:
+                call = self.predicate_call(self.get_predicate_function_name(definition_item), self._variable)
+                with self.l('if ' + count_condition + ' and {}:', call, optimize=False):
+                    self.l('{variable}_one_of_count += 1')
+            with self.l('if {variable}_one_of_count != 1:'):
+                self.exc('must be valid exactly by one of oneOf definition', rule='oneOf')
+            return
+
         for definition_item in self._definition['oneOf']:
             # When we know it's failing (one of means exactly once), we do not need to do another expensive try-except.
-            with self.l('if {variable}_one_of_count < 2:', optimize=False):
-                with self.l('try:', optimize=False):
+            with self.l('if ' + count_condition + ':', optimize=False):
+                with self.l('try:', optimize=False), self.branch():
                     self.generate_func_code_block(definition_item, self._variable, self._variable_path, clear_variables=True)
                     self.l('{variable}_one_of_count += 1')
                 self.l('except JsonSchemaValidationException: pass')
@@ -208,8 +252,12 @@ class CodeGeneratorDraft04(CodeGenerator):
             self.exc('must not be there', rule='not')
         elif not_definition is False:
             return
+        elif self._mode == 'bool':
+            call = self.predicate_call(self.get_predicate_function_name(not_definition), self._variable)
+            with self.l('if {}:', call):
+                self.exc('must not be valid by not definition', rule='not')
         else:
-            with self.l('try:', optimize=False):
+            with self.l('try:', optimize=False), self.branch():
                 self.generate_func_code_block(not_definition, self._variable, self._variable_path)
                 if not not_definition:
                     self.l('pass')  # Adding that in case generate_func_code_block() generated nothing.
@@ -218,7 +266,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must not be valid by not definition', rule='not')
 
     def generate_min_length(self):
-        with self.l('if isinstance({variable}, str):'):
+        with self.type_guard('string'):
             self.create_variable_with_length()
             if not isinstance(self._definition['minLength'], int):
                 raise JsonSchemaDefinitionException('minLength must be a number')
@@ -226,7 +274,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must be longer than or equal to {minLength} characters', rule='minLength')
 
     def generate_max_length(self):
-        with self.l('if isinstance({variable}, str):'):
+        with self.type_guard('string'):
             self.create_variable_with_length()
             if not isinstance(self._definition['maxLength'], int):
                 raise JsonSchemaDefinitionException('maxLength must be a number')
@@ -234,7 +282,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must be shorter than or equal to {maxLength} characters', rule='maxLength')
 
     def generate_pattern(self):
-        with self.l('if isinstance({variable}, str):'):
+        with self.type_guard('string'):
             pattern = self._definition['pattern']
             safe_pattern = pattern.replace('\\', '\\\\').replace('"', '\\"')
             end_of_string_fixed_pattern = DOLLAR_FINDER.sub(r'\\Z', pattern)
@@ -252,7 +300,7 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         Valid value for this definition is user@example.com but not @username
         """
-        with self.l('if isinstance({variable}, str):'):
+        with self.type_guard('string'):
             format_ = self._definition['format']
             # Checking custom formats - user is allowed to override default formats.
             if format_ in self._custom_formats:
@@ -283,7 +331,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must be {}', format_name, rule='format')
 
     def generate_minimum(self):
-        with self.l('if isinstance({variable}, (int, float)):'):
+        with self.type_guard('number'):
             if not isinstance(self._definition['minimum'], (int, float)):
                 raise JsonSchemaDefinitionException('minimum must be a number')
             if self._definition.get('exclusiveMinimum', False):
@@ -294,7 +342,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                     self.exc('must be bigger than or equal to {minimum}', rule='minimum')
 
     def generate_maximum(self):
-        with self.l('if isinstance({variable}, (int, float)):'):
+        with self.type_guard('number'):
             if not isinstance(self._definition['maximum'], (int, float)):
                 raise JsonSchemaDefinitionException('maximum must be a number')
             if self._definition.get('exclusiveMaximum', False):
@@ -305,7 +353,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                     self.exc('must be smaller than or equal to {maximum}', rule='maximum')
 
     def generate_multiple_of(self):
-        with self.l('if isinstance({variable}, (int, float)):'):
+        with self.type_guard('number'):
             if not isinstance(self._definition['multipleOf'], (int, float)):
                 raise JsonSchemaDefinitionException('multipleOf must be a number')
             # For proper multiplication check of floats we need to use decimals,
@@ -320,8 +368,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must be multiple of {multipleOf}', rule='multipleOf')
 
     def generate_min_items(self):
-        self.create_variable_is_list()
-        with self.l('if {variable}_is_list:'):
+        with self.type_guard('array'):
             if not isinstance(self._definition['minItems'], int):
                 raise JsonSchemaDefinitionException('minItems must be a number')
             self.create_variable_with_length()
@@ -329,8 +376,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must contain at least {minItems} items', rule='minItems')
 
     def generate_max_items(self):
-        self.create_variable_is_list()
-        with self.l('if {variable}_is_list:'):
+        with self.type_guard('array'):
             if not isinstance(self._definition['maxItems'], int):
                 raise JsonSchemaDefinitionException('maxItems must be a number')
             self.create_variable_with_length()
@@ -352,9 +398,9 @@ class CodeGeneratorDraft04(CodeGenerator):
             >>> timeit.timeit("np.unique(x).size == len(x)", "x=range(100)+range(100); import numpy as np", number=100000)
             2.1439831256866455
         """
-        self.create_variable_is_list()
-        with self.l('if {variable}_is_list:'):
+        with self.type_guard('array'):
             self.create_variable_with_length()
+            self.count_nodes('{variable}_len')
             with self.l('if {variable}_len > len(set(str({variable}_x) for {variable}_x in {variable})):'):
                 self.exc('must contain unique items', rule='uniqueItems')
 
@@ -380,8 +426,7 @@ class CodeGeneratorDraft04(CodeGenerator):
         if items_definition is True:
             return
 
-        self.create_variable_is_list()
-        with self.l('if {variable}_is_list:'):
+        with self.type_guard('array'):
             self.create_variable_with_length()
             if items_definition is False:
                 with self.l('if {variable}:'):
@@ -395,15 +440,18 @@ class CodeGeneratorDraft04(CodeGenerator):
                             '{}__{}'.format(self._variable, idx),
                             self._variable_path + [str(idx)],
                         )
-                    if isinstance(item_definition, dict) and 'default' in item_definition:
-                        self.l('else: {variable}.append({})', repr(item_definition['default']))
+                    if self._inject_defaults and isinstance(item_definition, dict) and 'default' in item_definition:
+                        self.generate_default(idx, item_definition['default'], prefix='else: ')
 
                 if 'additionalItems' in self._definition:
                     if self._definition['additionalItems'] is False:
                         with self.l('if {variable}_len > {}:', len(items_definition)):
                             self.exc('must contain only specified items', rule='items')
                     else:
-                        with self.l('for {variable}_x, {variable}_item in enumerate({variable}[{0}:], {0}):', len(items_definition)):
+                        # Range of indexes instead of a slice, which would copy the items.
+                        with self.l('for {variable}_x in range({}, {variable}_len):', len(items_definition)):
+                            self.count_nodes()
+                            self.l('{variable}_item = {variable}[{variable}_x]')
                             self.generate_func_code_block(
                                 self._definition['additionalItems'],
                                 '{}_item'.format(self._variable),
@@ -412,6 +460,7 @@ class CodeGeneratorDraft04(CodeGenerator):
             else:
                 if items_definition:
                     with self.l('for {variable}_x, {variable}_item in enumerate({variable}):'):
+                        self.count_nodes()
                         self.generate_func_code_block(
                             items_definition,
                             '{}_item'.format(self._variable),
@@ -419,8 +468,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                         )
 
     def generate_min_properties(self):
-        self.create_variable_is_dict()
-        with self.l('if {variable}_is_dict:'):
+        with self.type_guard('object'):
             if not isinstance(self._definition['minProperties'], int):
                 raise JsonSchemaDefinitionException('minProperties must be a number')
             self.create_variable_with_length()
@@ -428,8 +476,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must contain at least {minProperties} properties', rule='minProperties')
 
     def generate_max_properties(self):
-        self.create_variable_is_dict()
-        with self.l('if {variable}_is_dict:'):
+        with self.type_guard('object'):
             if not isinstance(self._definition['maxProperties'], int):
                 raise JsonSchemaDefinitionException('maxProperties must be a number')
             self.create_variable_with_length()
@@ -437,33 +484,53 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must contain less than or equal to {maxProperties} properties', rule='maxProperties')
 
     def generate_required_and_additional(self):
+        """
+        Both keywords are reported together by one exception (rule ``required-additionalProperties``)
+        listing all missing and all extra fields.
+        """
+        if self.dispatch_properties():
+            # Checked together with properties in one pass over the keys.
+            return
         if not self.can_emit_required_and_additional():
             return
-        self.l('{variable}_ra_missing = []')
-        self.l('{variable}_ra_extra = []')
+        if self._mode != 'bool':
+            # Lists are created only for invalid data.
+            self.l('{variable}_ra_missing = {variable}_ra_extra = None')
         if 'required' in self._definition:
-            with self.l('try:'):
-                self._generate_required()
-            with self.l('except JsonSchemaValidationException as exc:'):
-                self.l('{variable}_ra_missing.extend(exc.missing_fields)')
+            self._generate_required()
         if 'additionalProperties' in self._definition:
-            with self.l('try:'):
-                self._generate_additional_properties()
-            with self.l('except Exception as exc:'):
-                with self.l('if exc.rule != \'additionalProperties\':'):
-                    self.l('raise')
-                self.l('{variable}_ra_extra.extend(exc.extra_fields)')
-        with self.l('if {variable}_ra_missing or {variable}_ra_extra:'):
-            self.exc('missing/extra properties', rule='required-additionalProperties', missing_fields='{variable}_ra_missing', extra_fields='{variable}_ra_extra')
+            self._generate_additional_properties()
+        self._generate_required_and_additional_exception()
+
+    def _generate_required_and_additional_exception(self):
+        if self._mode != 'bool':
+            with self.l('if {variable}_ra_missing or {variable}_ra_extra:'):
+                self.exc(
+                    'missing/extra properties', rule='required-additionalProperties',
+                    missing_fields='{variable}_ra_missing', extra_fields='{variable}_ra_extra',
+                )
 
     def _generate_required(self):
-        self.create_variable_is_dict()
-        with self.l('if {variable}_is_dict:'):
-            if not isinstance(self._definition['required'], (list, tuple)):
-                raise JsonSchemaDefinitionException('required must be an array')
-            with self.l('if not all(prop in {variable} for prop in {required}):'):
-                self.l('{variable}_missing_props = sorted(set({required}) - {variable}.keys())')
-                self.exc('is missing required properties', rule='required', missing_fields='{variable}_missing_props')
+        if not isinstance(self._definition['required'], (list, tuple)):
+            raise JsonSchemaDefinitionException('required must be an array')
+        required = self._definition['required']
+        if self._copy_defaults:
+            # Copied defaults are not in the data yet, but properties with a default are never missing.
+            properties = self._definition.get('properties', {})
+            required = [
+                name for name in required
+                if not (isinstance(properties.get(name), dict) and 'default' in properties[name])
+            ]
+        if not required:
+            return
+        with self.type_guard('object'):
+            # Chain of lookups, which is faster than all() and does not create any object.
+            condition = ' and '.join('{!r} in {variable}'.format(name, variable=self._variable) for name in required)
+            with self.l('if not ({}):', condition):
+                if self._mode == 'bool':
+                    self.exc('is missing required properties', rule='required')
+                else:
+                    self.l('{variable}_ra_missing = sorted(set({}) - {variable}.keys())', repr(required))
 
     def generate_properties(self):
         """
@@ -479,24 +546,151 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         Valid object is containing key called 'key' and value any number.
         """
-        self.create_variable_is_dict()
-        with self.l('if {variable}_is_dict:'):
-            self.create_variable_keys()
-            for key, prop_definition in self._definition['properties'].items():
-                key_name = re.sub(r'($[^a-zA-Z]|[^a-zA-Z0-9])', '', key)
-                if not isinstance(prop_definition, (dict, bool)):
-                    raise JsonSchemaDefinitionException('{}[{}] must be object'.format(self._variable, key_name))
-                with self.l('if "{}" in {variable}_keys:', self.e(key)):
-                    self.l('{variable}_keys.remove("{}")', self.e(key))
-                    self.l('{variable}__{0} = {variable}["{1}"]', key_name, self.e(key))
+        with self.type_guard('object'):
+            if self.dispatch_properties():
+                self._generate_properties_dispatch()
+                return
+            if self._instrument is not None:
+                self.l('profile.shape({!r}, {variable})', self.site_key(self._definition))
+            shape = self.object_shape()
+            if shape is None:
+                self._generate_properties()
+                return
+            # Specialized for the usual keys recorded in the profile: no lookups of keys,
+            # other objects are validated by the general code.
+            shape_keys, shape_name = shape
+            with self.l('if {variable}.keys() == {}:', shape_name):
+                self._generate_properties(shape_keys)
+            with self.l('else:'):
+                self._generate_properties()
+
+    def _generate_properties(self, shape_keys=None):
+        """
+        With ``shape_keys`` it is known that validated object has exactly those keys.
+        """
+        for key, prop_definition in self._definition['properties'].items():
+            key_name = re.sub(r'($[^a-zA-Z]|[^a-zA-Z0-9])', '', key)
+            if not isinstance(prop_definition, (dict, bool)):
+                raise JsonSchemaDefinitionException('{}[{}] must be object'.format(self._variable, key_name))
+            has_default = self._inject_defaults and isinstance(prop_definition, dict) and 'default' in prop_definition
+            if shape_keys is not None:
+                if key in shape_keys:
+                    self._generate_property(key, key_name, prop_definition)
+                elif has_default:
+                    self.generate_default(key, prop_definition['default'])
+                continue
+            with self.l('if "{}" in {variable}:', self.e(key)):
+                self._generate_property(key, key_name, prop_definition)
+            if has_default:
+                self.generate_default(key, prop_definition['default'], prefix='else: ')
+
+    def dispatch_properties(self):
+        """
+        Objects with at least ``PROPERTIES_DISPATCH_MIN_SIZE`` properties are validated
+        by `_generate_properties_dispatch`, so the cost depends on the size of the object,
+        not on the size of the definition.
+        """
+        properties = self._definition.get('properties')
+        return isinstance(properties, dict) and len(properties) >= self.PROPERTIES_DISPATCH_MIN_SIZE
+
+    def _generate_properties_dispatch(self):
+        """
+        Goes once through the items of the object and calls validation function of each
+        property found in global map of property names to functions. Pattern properties and
+        additional properties (keys missing in the map and not matched by any pattern) are
+        checked in the same loop, required properties after it.
+        """
+        handlers = {}
+        for key, prop_definition in self._definition['properties'].items():
+            if not isinstance(prop_definition, (dict, bool)):
+                raise JsonSchemaDefinitionException('{}[{}] must be object'.format(self._variable, key))
+            handlers[key] = self.generate_helper_function(prop_definition, 'property')
+        # Functions are defined after all validation functions, so the map is there too.
+        handlers_name = self._unique_function_name('{}_properties'.format(self._function_name))
+        self._helper_functions_code.append('{} = {{{}}}'.format(
+            handlers_name, ', '.join('{!r}: {}'.format(key, name) for key, name in handlers.items()),
+        ))
+        patterns = self._definition.get('patternProperties', {})
+        for pattern in patterns:
+            self._compile_regexps[pattern] = re.compile(pattern)
+
+        add_prop_definition = self._additional_properties_definition()
+        check_keys = 'required' in self._definition or add_prop_definition != True
+        if check_keys and self._mode != 'bool':
+            # Lists are created only for invalid data.
+            self.l('{variable}_ra_missing = {variable}_ra_extra = None')
+
+        with self.l('for {variable}_key, {variable}_val in {variable}.items():'):
+            self.count_nodes()
+            self.l('{variable}_handler = {}.get({variable}_key)', handlers_name)
+            with self.l('if {variable}_handler is not None:'):
+                call = self.call_function(
+                    '{}_handler'.format(self._variable),
+                    '{}_val'.format(self._variable),
+                    path=prepare_call_path(self._variable_path + [self._variable + '_key']),
+                    depth='_depth + {}'.format(len(self._variable_path) + 1),
+                    # Referenced schemas in the property are pushed to the same stack.
+                    stack='_stack' if self._use_stack and not self._branch_depth else 'None',
+                )
+                if self._mode == 'bool':
+                    with self.l('if not {}:', call):
+                        self.l('return False')
+                else:
+                    self.l('{}', call)
+            # Key missing in the map is additional unless some pattern matches it.
+            check_additional = add_prop_definition != True
+            if check_additional and patterns:
+                self.l('{variable}_additional = {variable}_handler is None')
+            for pattern, definition in patterns.items():
+                with self.l('if REGEX_PATTERNS[{}].search({variable}_key):', repr(pattern)):
+                    if check_additional:
+                        self.l('{variable}_additional = False')
                     self.generate_func_code_block(
-                        prop_definition,
-                        '{}__{}'.format(self._variable, key_name),
-                        self._variable_path + ['"{}"'.format(self.e(key))],
+                        definition,
+                        '{}_val'.format(self._variable),
+                        self._variable_path + [self._variable + '_key'],
                         clear_variables=True,
                     )
+            if check_additional:
+                with self.l('if {variable}_additional:' if patterns else 'if {variable}_handler is None:'):
+                    self._generate_dispatched_additional(add_prop_definition)
+        if self._inject_defaults:
+            for key, prop_definition in self._definition['properties'].items():
                 if isinstance(prop_definition, dict) and 'default' in prop_definition:
-                    self.l('else: {variable}["{}"] = {}', self.e(key), repr(prop_definition['default']))
+                    with self.l('if "{}" not in {variable}:', self.e(key)):
+                        self.generate_default(key, prop_definition['default'])
+        if 'required' in self._definition:
+            self._generate_required()
+        if check_keys:
+            self._generate_required_and_additional_exception()
+
+    def _generate_dispatched_additional(self, add_prop_definition):
+        """
+        Same as `_generate_additional_properties` for key ``{variable}_key`` already known
+        to be additional, with its value in ``{variable}_val``.
+        """
+        if add_prop_definition:
+            self.generate_func_code_block(
+                add_prop_definition,
+                '{}_val'.format(self._variable),
+                self._variable_path + [self._variable + '_key'],
+                clear_variables=True,
+            )
+        elif self._mode == 'bool':
+            self.exc('additional properties are not allowed', rule='additionalProperties')
+        else:
+            with self.l('if {variable}_ra_extra is None:'):
+                self.l('{variable}_ra_extra = []')
+            self.l('{variable}_ra_extra.append({variable}_key)')
+
+    def _generate_property(self, key, key_name, prop_definition):
+        self.l('{variable}__{0} = {variable}["{1}"]', key_name, self.e(key))
+        self.generate_func_code_block(
+            prop_definition,
+            '{}__{}'.format(self._variable, key_name),
+            self._variable_path + ['"{}"'.format(self.e(key))],
+            clear_variables=True,
+        )
 
     def generate_pattern_properties(self):
         """
@@ -512,16 +706,17 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         Valid object is containing key starting with a 'x' and value any number.
         """
-        self.create_variable_is_dict()
-        with self.l('if {variable}_is_dict:'):
-            self.create_variable_keys()
+        if self.dispatch_properties() or not self._definition['patternProperties']:
+            # Already checked together with properties.
+            return
+        with self.type_guard('object'):
             for pattern, definition in self._definition['patternProperties'].items():
                 self._compile_regexps[pattern] = re.compile(pattern)
             with self.l('for {variable}_key, {variable}_val in {variable}.items():'):
+                self.count_nodes()
                 for pattern, definition in self._definition['patternProperties'].items():
                     with self.l('if REGEX_PATTERNS[{}].search({variable}_key):', repr(pattern)):
-                        with self.l('if {variable}_key in {variable}_keys:'):
-                            self.l('{variable}_keys.remove({variable}_key)')
+                        self.l('pass')  # Adding that in case generate_func_code_block() generated nothing.
                         self.generate_func_code_block(
                             definition,
                             '{}_val'.format(self._variable),
@@ -545,27 +740,59 @@ class CodeGeneratorDraft04(CodeGenerator):
         Valid object is containing key called 'key' and it's value any number and
         any other key with any string.
         """
-        self.create_variable_is_dict()
-        with self.l('if {variable}_is_dict:'):
-            self.create_variable_keys()
-            add_prop_definition = self._definition["additionalProperties"]
+        with self.type_guard('object'):
+            add_prop_definition = self._additional_properties_definition()
             if add_prop_definition == True:
                 self.l('pass')
                 return
-            elif add_prop_definition:
-                properties_keys = list(self._definition.get("properties", {}).keys())
-                with self.l('for {variable}_key in {variable}_keys:'):
-                    with self.l('if {variable}_key not in {}:', properties_keys):
-                        self.l('{variable}_value = {variable}.get({variable}_key)')
+            is_additional = self._additional_key_condition()
+            if add_prop_definition:
+                with self.l('for {variable}_key in {variable}:'):
+                    self.count_nodes()
+                    with self.l('if {}:', is_additional):
+                        self.l('{variable}_value = {variable}[{variable}_key]')
                         self.generate_func_code_block(
                             add_prop_definition,
                             '{}_value'.format(self._variable),
                             self._variable_path + [self._variable + '_key'],
                         )
+            elif self._mode == 'bool':
+                with self.l('for {variable}_key in {variable}:'):
+                    with self.l('if {}:', is_additional):
+                        self.exc('additional properties are not allowed', rule='additionalProperties')
             else:
-                with self.l('if {variable}_keys:'):
-                    # @note Field names are enclosed in [brackets] to make it easier to detect using regexps.
-                    self.exc('additional properties are not allowed', rule='additionalProperties', extra_fields='{variable}_keys')
+                # Looking for the first extra key only, the list is created only for invalid data.
+                with self.l('for {variable}_key in {variable}:'):
+                    with self.l('if {}:', is_additional):
+                        extra = '[{variable}_key for {variable}_key in {variable} if {}]'
+                        self.l('{variable}_ra_extra = ' + extra, is_additional)
+                        self.l('break')
+
+    def _additional_properties_definition(self):
+        """
+        Returns definition of additional properties. Empty schema allows anything, the same
+        as ``true``, it must not be taken as falsy ``false``.
+        """
+        add_prop_definition = self._definition.get('additionalProperties', True)
+        if add_prop_definition == {}:
+            return True
+        return add_prop_definition
+
+    def _additional_key_condition(self):
+        """
+        Returns condition that ``{variable}_key`` is neither in properties nor matched by any
+        pattern property. Set of constants after ``in`` is compiled by Python as a constant
+        frozenset, so it is not created by every call.
+        """
+        conditions = []
+        properties = self._definition.get('properties', {})
+        if properties:
+            keys = ', '.join('"{}"'.format(self.e(key)) for key in properties)
+            conditions.append('{}_key not in {{{}}}'.format(self._variable, keys))
+        for pattern in self._definition.get('patternProperties', {}):
+            self._compile_regexps[pattern] = re.compile(pattern)
+            conditions.append('not REGEX_PATTERNS[{!r}].search({}_key)'.format(pattern, self._variable))
+        return ' and '.join(conditions) or 'True'
 
     def generate_dependencies(self):
         """
@@ -585,18 +812,20 @@ class CodeGeneratorDraft04(CodeGenerator):
         Since draft 06 definition can be boolean or empty array. True and empty array
         means nothing, False means that key cannot be there at all.
         """
-        self.create_variable_is_dict()
-        with self.l('if {variable}_is_dict:'):
-            self.create_variable_keys()
-            for key, values in self._definition["dependencies"].items():
-                if values == [] or values is True:
-                    continue
-                with self.l('if "{}" in {variable}_keys:', self.e(key)):
+        dependencies = {
+            key: values for key, values in self._definition["dependencies"].items()
+            if values != [] and values is not True
+        }
+        if not dependencies:
+            return
+        with self.type_guard('object'):
+            for key, values in dependencies.items():
+                with self.l('if "{}" in {variable}:', self.e(key)):
                     if values is False:
                         self.exc('{} must not be there', key, rule='dependencies')
                     elif isinstance(values, list):
                         for value in values:
-                            with self.l('if "{}" not in {variable}_keys:', self.e(value)):
+                            with self.l('if "{}" not in {variable}:', self.e(value)):
                                 self.exc('missing dependency {} for {}', self.e(value), self.e(key), rule='dependencies')
                     else:
                         self.generate_func_code_block(values, self._variable, self._variable_path, clear_variables=True)
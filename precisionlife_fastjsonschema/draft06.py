@@ -15,8 +15,8 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
         ),
     })
 
-    def __init__(self, definition, resolver=None, formats={}):
-        super().__init__(definition, resolver, formats)
+    def __init__(self, definition, resolver=None, formats={}, **kwargs):
+        super().__init__(definition, resolver, formats, **kwargs)
         self._json_keywords_to_function.update((
             ('exclusiveMinimum', self.generate_exclusive_minimum),
             ('exclusiveMaximum', self.generate_exclusive_maximum),
@@ -54,6 +54,8 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
             {'type': ['string', 'number']}
         """
         types = enforce_list(self._definition['type'])
+        if self.is_type_proven(*types):
+            return
         try:
             python_types = ', '.join(JSON_TYPE_TO_PYTHON_TYPE[t] for t in types)
         except KeyError as exc:
@@ -73,16 +75,17 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
 
         with self.l('if not isinstance({variable}, ({})){}:', python_types, extra):
             self.exc('must be {}, but is a: " + type({variable}).__name__ + "', ' or '.join(types), rule='type')
+        self.prove_type(types)
 
     def generate_exclusive_minimum(self):
-        with self.l('if isinstance({variable}, (int, float)):'):
+        with self.type_guard('number'):
             if not isinstance(self._definition['exclusiveMinimum'], (int, float)):
                 raise JsonSchemaDefinitionException('exclusiveMinimum must be an integer or a float')
             with self.l('if {variable} <= {exclusiveMinimum}:'):
                 self.exc('must be bigger than {exclusiveMinimum}', rule='exclusiveMinimum')
 
     def generate_exclusive_maximum(self):
-        with self.l('if isinstance({variable}, (int, float)):'):
+        with self.type_guard('number'):
             if not isinstance(self._definition['exclusiveMaximum'], (int, float)):
                 raise JsonSchemaDefinitionException('exclusiveMaximum must be an integer or a float')
             with self.l('if {variable} >= {exclusiveMaximum}:'):
@@ -106,17 +109,24 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
         if property_names_definition is True:
             pass
         elif property_names_definition is False:
-            self.create_variable_keys()
-            with self.l('if {variable}_keys:'):
-                self.exc('must not be there', rule='propertyNames')
+            with self.type_guard('object'):
+                with self.l('if {variable}:'):
+                    self.exc('must not be there', rule='propertyNames')
         else:
-            self.create_variable_is_dict()
-            with self.l('if {variable}_is_dict:'):
+            with self.type_guard('object'):
                 self.create_variable_with_length()
                 with self.l('if {variable}_len != 0:'):
+                    if self._mode == 'bool':
+                        name = self.get_predicate_function_name(property_names_definition)
+                        with self.l('for {variable}_key in {variable}:'):
+                            self.count_nodes()
+                            with self.l('if not {}:', self.predicate_call(name, self._variable + '_key')):
+                                self.exc('must be named by propertyName definition', rule='propertyNames')
+                        return
                     self.l('{variable}_property_names = True')
                     with self.l('for {variable}_key in {variable}:'):
-                        with self.l('try:'):
+                        self.count_nodes()
+                        with self.l('try:'), self.branch():
                             self.generate_func_code_block(
                                 property_names_definition,
                                 '{}_key'.format(self._variable),
@@ -142,8 +152,7 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
 
         Valid array is any with at least one number.
         """
-        self.create_variable_is_list()
-        with self.l('if {variable}_is_list:'):
+        with self.type_guard('array'):
             contains_definition = self._definition['contains']
 
             if contains_definition is False:
@@ -151,10 +160,19 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
             elif contains_definition is True:
                 with self.l('if not {variable}:'):
                     self.exc('must not be empty', rule='contains')
+            elif self._mode == 'bool':
+                name = self.get_predicate_function_name(contains_definition)
+                with self.l('for {variable}_key in {variable}:'):
+                    self.count_nodes()
+                    with self.l('if {}:', self.predicate_call(name, self._variable + '_key')):
+                        self.l('break')
+                with self.l('else:'):
+                    self.exc('must contain one of contains definition', rule='contains')
             else:
                 self.l('{variable}_contains = False')
                 with self.l('for {variable}_key in {variable}:'):
-                    with self.l('try:'):
+                    self.count_nodes()
+                    with self.l('try:'), self.branch():
                         self.generate_func_code_block(
                             contains_definition,
                             '{}_key'.format(self._variable),
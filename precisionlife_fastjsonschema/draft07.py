@@ -17,8 +17,8 @@ class CodeGeneratorDraft07(CodeGeneratorDraft06):
         ),
     })
 
-    def __init__(self, definition, resolver=None, formats={}):
-        super().__init__(definition, resolver, formats)
+    def __init__(self, definition, resolver=None, formats={}, **kwargs):
+        super().__init__(definition, resolver, formats, **kwargs)
         # pylint: disable=duplicate-code
         self._json_keywords_to_function.update((
             ('if', self.generate_if_then_else),
@@ -46,7 +46,10 @@ class CodeGeneratorDraft07(CodeGeneratorDraft06):
 
         Valid values are any between -10 and 0 or any multiplication of two.
         """
-        with self.l('try:'):
+        if self._mode == 'bool':
+            self._generate_if_then_else_predicate()
+            return
+        with self.l('try:'), self.branch():
             self.generate_func_code_block(
                 self._definition['if'],
                 self._variable,
@@ -72,6 +75,28 @@ class CodeGeneratorDraft07(CodeGeneratorDraft06):
                     clear_variables=True
                 )
 
+    def _generate_if_then_else_predicate(self):
+        if 'then' in self._definition:
+            blocks = [('if {}:', 'then'), ('else:', 'else')]
+        elif 'else' in self._definition:
+            blocks = [('if not {}:', 'else')]
+        else:
+            return
+        name = self.predicate_call(self.get_predicate_function_name(self._definition['if']), self._variable)
+        for line, keyword in blocks:
+            if keyword not in self._definition:
+                continue
+            with self.l(line, name, optimize=False):
+                code_length = len(self._code)
+                self.generate_func_code_block(
+                    self._definition[keyword],
+                    self._variable,
+                    self._variable_path,
+                    clear_variables=True
+                )
+                if len(self._code) == code_length:
+                    self.l('pass')
+
     def generate_content_encoding(self):
         """
         Means decoding value when it's encoded by base64.
@@ -83,6 +108,7 @@ class CodeGeneratorDraft07(CodeGeneratorDraft06):
             }
         """
         if self._definition['contentEncoding'] == 'base64':
+            self.forget_type()
             with self.l('if isinstance({variable}, str):'):
                 with self.l('try:'):
                     self.l('import base64')
@@ -103,6 +129,7 @@ class CodeGeneratorDraft07(CodeGeneratorDraft06):
             }
         """
         if self._definition['contentMediaType'] == 'application/json':
+            self.forget_type()
             with self.l('if isinstance({variable}, bytes):'):
                 with self.l('try:'):
                     self.l('{variable} = {variable}.decode("utf-8")')
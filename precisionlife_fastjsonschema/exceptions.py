@@ -51,6 +51,11 @@ class JsonSchemaValidationException(JsonSchemaException):
             return f'JsonSchemaValidationException({self.message}, {self.rule}, {self.path}, {self.missing_fields}, {self.extra_fields})'
         return f'JsonSchemaValidationException({self.message}, {self.rule}, {self.path})'
 
+    def __reduce__(self):
+        # Sent between processes without the root object, so the path is rendered before.
+        state = dict(self.__dict__, root_object=None, special_fields_extractor=None, _rendered_path=self.rendered_path)
+        return self.__class__, (self.message, self.value, self.definition, self.rule, self.path), state
+
     def __str__(self):
         if self.rule == 'required-additionalProperties':
             message = self.rendered_path
@@ -78,6 +83,30 @@ class JsonSchemaValidationException(JsonSchemaException):
         return self.definition.get(self.rule)
 
 
+class JsonSchemaLimitException(JsonSchemaException):
+    """
+    Exception raised by validation function when some of limits passed to
+    :any:`compile` (``max_depth``, ``max_nodes`` or ``timeout``) is exceeded. The
+    validation was not finished, so it is not known whether data are valid or not.
+    It is not :any:`JsonSchemaValidationException`, so it is never handled as
+    a failed subschema of ``anyOf`` and similar rules. Available properties:
+
+     * ``message`` containing human-readable information what limit was exceeded,
+     * ``limit`` with name of the limit (``max_depth``, ``max_nodes`` or ``timeout``).
+    """
+
+    def __init__(self, message, limit):
+        super().__init__(message)
+        self.message = message
+        self.limit = limit
+
+    def __reduce__(self):
+        return self.__class__, (self.message, self.limit)
+
+    def __repr__(self):
+        return f'JsonSchemaLimitException({self.message}, {self.limit})'
+
+
 def render_path(obj, path, special_fields_extractor):
     """
     Returns path as a string that can be displayed to the user.
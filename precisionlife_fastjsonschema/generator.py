@@ -1,14 +1,92 @@
+import asyncio
 import collections
 from collections import OrderedDict
+import contextlib
+import functools
 import re
 import inspect
+import math
+import sys
+from time import monotonic
 from typing import Optional, Any
 
-from .exceptions import JsonSchemaValidationException, JsonSchemaDefinitionException
+from .exceptions import JsonSchemaValidationException, JsonSchemaDefinitionException, JsonSchemaLimitException
 from .indent import indent
+from .profiling import site_key
 from .ref_resolver import RefResolver
 
 
+# Kinds of validation functions that can be generated:
+#  * ``exception`` - function returns (possibly modified) data or raises JsonSchemaValidationException,
+#  * ``bool`` - function returns True or False and never raises nor touches the data,
+#  * ``collect`` - function returns list of all JsonSchemaValidationException (up to ``max_errors``).
+MODES = ('exception', 'bool', 'collect')
+
+# How validation functions of referenced schemas ($ref) are called:
+#  * ``calls`` - directly, so deep data need deep Python recursion,
+#  * ``stack`` - through explicit work stack processed by the function called by the user,
+#    so depth of data is not limited by Python recursion limit.
+RECURSIONS = ('calls', 'stack')
+
+# What is done with ``default`` values of missing properties and items:
+#  * ``inject`` - those are set directly in the validated data,
+#  * ``copy`` - validated data are not changed, the function returns a copy with defaults,
+#    where only containers on the paths to injected defaults are copied,
+#  * ``off`` - defaults are ignored, no code is generated for them.
+DEFAULTS = ('inject', 'copy', 'off')
+
+# Keywords checking only strings and numbers, which are never changed by other keywords,
+# so those can be checked in any order right after the type.
+SCALAR_KEYWORDS = frozenset((
+    'minLength', 'maxLength', 'pattern', 'format',
+    'minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum', 'multipleOf',
+))
+# Keywords without side effects. Those can be reordered among each other as long as they
+# stay between the same other keywords, which can change the data (by injecting defaults).
+PURE_KEYWORDS = SCALAR_KEYWORDS | frozenset((
+    'enum', 'const', 'minItems', 'maxItems', 'uniqueItems', 'minProperties', 'maxProperties', 'propertyNames',
+))
+# Keywords with subschemas, which are without side effects when subschemas do not contain
+# any default. Map to all keywords with those subschemas.
+SUBSCHEMA_KEYWORDS = {
+    'allOf': ('allOf',),
+    'anyOf': ('anyOf',),
+    'oneOf': ('oneOf',),
+    'not': ('not',),
+    'items': ('items', 'additionalItems'),
+    'contains': ('contains',),
+    'if': ('if', 'then', 'else'),
+}
+
+# Cost classes of checks. Independent checks are done from the cheapest (see `keywords_order`).
+COST_CONSTANT = 1  # comparing number or length
+COST_VALUES = 2  # comparing with given values
+COST_REGEX = 3  # matching regular expression or format
+COST_ELEMENTS = 4  # going through all items or properties
+COST_SUBSCHEMAS = 5  # validating by other subschemas
+KEYWORD_COSTS = {
+    'minLength': COST_CONSTANT,
+    'maxLength': COST_CONSTANT,
+    'minimum': COST_CONSTANT,
+    'maximum': COST_CONSTANT,
+    'exclusiveMinimum': COST_CONSTANT,
+    'exclusiveMaximum': COST_CONSTANT,
+    'multipleOf': COST_CONSTANT,
+    'minItems': COST_CONSTANT,
+    'maxItems': COST_CONSTANT,
+    'minProperties': COST_CONSTANT,
+    'maxProperties': COST_CONSTANT,
+    'enum': COST_VALUES,
+    'const': COST_VALUES,
+    'pattern': COST_REGEX,
+    'format': COST_REGEX,
+    'uniqueItems': COST_ELEMENTS,
+    'propertyNames': COST_ELEMENTS,
+    'items': COST_ELEMENTS,
+    'contains': COST_ELEMENTS,
+}
+
+
 def enforce_list(variable):
     if isinstance(variable, list):
         return variable
@@ -32,6 +110,29 @@ def prepare_path(path):
     return result
 
 
+def prepare_call_path(path):
+    """
+    Returns code of the path passed to validation function called for the value on ``path``
+    (code fragments as for `prepare_path`). It is a tuple of ``root_path`` and the keys, so
+    no list is allocated for valid data. The list is created by `build_path` only for errors.
+    """
+    if not path:
+        return 'root_path'
+    return '(root_path, ' + ', '.join(path) + ')'
+
+
+def build_path(path):
+    """
+    Returns path passed to validation function (a list, or a tuple of the parent path
+    and keys created by `prepare_call_path`) as a new list.
+    """
+    keys = []
+    while isinstance(path, tuple):
+        keys[:0] = path[1:]
+        path = path[0]
+    return path + keys
+
+
 def is_any_field_error(path, error):
     """
     Returns True if given error is related to any field.
@@ -86,7 +187,7 @@ def is_fundamental_error(path, error):
     return not is_any_field_error(path, error)
 
 
-def raise_best_anyof_error(data, root_object, root_path, errors, special_fields_extractor, definition):
+def best_anyof_error(data, root_object, root_path, errors, special_fields_extractor, definition):
     """
     If any tag or discriminator fields are present:
       First schema that:
@@ -106,12 +207,12 @@ def raise_best_anyof_error(data, root_object, root_path, errors, special_fields_
 
     if (special_fields_extractor is None) or not isinstance(data, dict):
         best_error = max(errors, key=lambda exc: len(exc.path))
-        raise best_error
+        return best_error
 
     tag_fields, discriminator_fields, identification_fields = special_fields_extractor(data)
     if len(tag_fields) + len(discriminator_fields) == 0:
         best_error = max(errors, key=lambda exc: len(exc.path))
-        raise best_error
+        return best_error
 
     for error in errors:
         if is_fundamental_error(root_path, error):
@@ -123,27 +224,110 @@ def raise_best_anyof_error(data, root_object, root_path, errors, special_fields_
         if len(tag_fields) > 0:
             allowed_fields = [not is_specific_field_error(root_path, error, tag_field, existence_only=True) for tag_field in tag_fields]
             if all(allowed_fields):
-                raise error
+                return error
 
         # If object has discriminator fields, and there were no errors on discriminator fields, we raise this error.
         if len(discriminator_fields) > 0:
             allowed_fields = [not is_specific_field_error(root_path, error, discriminator_field, existence_only=False) for discriminator_field in discriminator_fields]
             if all(allowed_fields):
-                raise error
+                return error
 
     # If object has tag fields, we know those were not accepted by any schema, so we raise an error for a tag field.
     if len(tag_fields) > 0:
-        raise JsonSchemaValidationException('tag fields not recognized', data, definition, 'unknownTags', root_path, root_object, special_fields_extractor)
+        return JsonSchemaValidationException(
+            'tag fields not recognized', data, definition, 'unknownTags', root_path, root_object,
+            special_fields_extractor,
+        )
 
     # If object has any discriminator fields, we know those were not accepted by any schema, so complain that discriminators were not matched.
     if len(discriminator_fields) > 0:
-        raise JsonSchemaValidationException('discriminator fields not recognized', data, definition, 'badDiscriminators', root_path, root_object, special_fields_extractor)
+        return JsonSchemaValidationException(
+            'discriminator fields not recognized', data, definition, 'badDiscriminators', root_path, root_object,
+            special_fields_extractor,
+        )
 
     best_error = max(errors, key=lambda exc: len(exc.path))
-    raise best_error
+    return best_error
+
+
+class ErrorLimitReached(Exception):
+    """
+    Raised by validation function in ``collect`` mode when ``max_errors`` errors were found
+    to stop the validation. It never leaves the validation function called by the user.
+    """
+
+
+def budget_checkpoint(budget):
+    """
+    Called by validation function generated with ``max_nodes`` or ``timeout`` limits when
+    the number of remaining nodes in ``budget`` drops to the next checkpoint.
+    Budget is a list: [number of remaining nodes, deadline or None, next checkpoint].
+    Time is checked only every 1024 nodes, because it is much slower than counting.
+    """
+    if budget[0] < 0:
+        raise JsonSchemaLimitException('validation exceeded maximum number of nodes', 'max_nodes')
+    if budget[1] is not None and monotonic() > budget[1]:
+        raise JsonSchemaLimitException('validation exceeded time limit', 'timeout')
+    budget[2] = max(budget[0] - 1024, -1) if budget[1] is not None else -1
+
+
+async def cooperative_checkpoint(budget):
+    """
+    Called by validation function generated with ``cooperative`` instead of `budget_checkpoint`,
+    every 256 nodes. Budget has two more items: [..., time of the next yield, interval].
+    When the interval has passed since the last yield, control is given back to the event
+    loop, so other tasks are not blocked by validation of big data.
+    """
+    budget_checkpoint(budget)
+    budget[2] = max(budget[0] - 256, -1)
+    if monotonic() >= budget[3]:
+        await asyncio.sleep(0)
+        budget[3] = monotonic() + budget[4]
+
+
+def copy_container(container):
+    """
+    Returns shallow copy of a Mapping or a Sequence which can be modified. Other types than
+    dict and list are copied as dict or list.
+    """
+    if isinstance(container, (dict, list)):
+        return container.copy()
+    if isinstance(container, collections.abc.Mapping):
+        return dict(container)
+    return list(container)
+
+
+def apply_defaults(data, defaults, skip):
+    """
+    Called by validation function generated with ``defaults='copy'``. Returns ``data`` with
+    ``defaults`` recorded during the validation as (path, key or index, value). Only
+    containers on those paths are copied, everything else is shared with ``data``. First
+    ``skip`` items of the paths are the ``root_path`` which is not part of ``data``.
+    """
+    result = copy_container(data)
+    copies = {id(result)}
+    for path, key, value in defaults:
+        node = result
+        for part in path[skip:]:
+            child = node[part]
+            if id(child) not in copies:
+                child = copy_container(child)
+                copies.add(id(child))
+                node[part] = child
+            node = child
+        # Same as direct injection, the first default wins.
+        if isinstance(node, list):
+            if key == len(node):
+                node.append(value)
+        elif key not in node:
+            node[key] = value
+    return result
 
 
 common_functions_lines = [
+    *inspect.getsourcelines(build_path)[0],
+    '',
+    '',
     *inspect.getsourcelines(is_any_field_error)[0],
     '',
     '',
@@ -153,7 +337,22 @@ common_functions_lines = [
     *inspect.getsourcelines(is_fundamental_error)[0],
     '',
     '',
-    *inspect.getsourcelines(raise_best_anyof_error)[0],
+    *inspect.getsourcelines(best_anyof_error)[0],
+    '',
+    '',
+    *inspect.getsourcelines(ErrorLimitReached)[0],
+    '',
+    '',
+    *inspect.getsourcelines(budget_checkpoint)[0],
+    '',
+    '',
+    *inspect.getsourcelines(cooperative_checkpoint)[0],
+    '',
+    '',
+    *inspect.getsourcelines(copy_container)[0],
+    '',
+    '',
+    *inspect.getsourcelines(apply_defaults)[0],
 ]
 
 
@@ -172,9 +371,90 @@ class CodeGenerator:
     """
 
     INDENT = 4  # spaces
+    INLINE_REF_MAX_SIZE = 10
+    # Share of recorded objects which has to have the same keys to get specialized code.
+    SHAPE_MIN_SHARE = 0.8
+    # Number of properties from which objects are validated by dispatching keys to functions.
+    PROPERTIES_DISPATCH_MIN_SIZE = 32
+    # Budget of one generated function. Huge functions are slow to compile and to run, so when
+    # the function has more lines or local variables, next subschemas with at least
+    # ``SPLIT_MIN_SIZE`` keys and items are validated by separate functions.
+    FUNCTION_MAX_LINES = 1000
+    FUNCTION_MAX_LOCALS = 200
+    SPLIT_MIN_SIZE = 5
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, definition, resolver=None, mode='exception', max_errors=None, max_depth=None, max_nodes=None,
+        timeout=None, recursion='calls', profile=None, instrument=None, defaults='inject', batch=False,
+        cooperative=None,
+    ):
+        if mode not in MODES:
+            raise JsonSchemaDefinitionException('Unknown mode: {}'.format(mode))
+        if defaults not in DEFAULTS:
+            raise JsonSchemaDefinitionException('Unknown defaults: {}'.format(defaults))
+        if defaults == 'copy' and mode != 'exception':
+            raise JsonSchemaDefinitionException('defaults can be copied only in exception mode')
+        if recursion not in RECURSIONS:
+            raise JsonSchemaDefinitionException('Unknown recursion: {}'.format(recursion))
+        if max_errors is not None and (mode != 'collect' or not isinstance(max_errors, int) or max_errors < 1):
+            raise JsonSchemaDefinitionException(
+                'max_errors must be a positive number and can be used only in collect mode',
+            )
+        if max_depth is not None and (not isinstance(max_depth, int) or isinstance(max_depth, bool) or max_depth < 0):
+            raise JsonSchemaDefinitionException('max_depth must be a non-negative number')
+        if max_nodes is not None and (not isinstance(max_nodes, int) or isinstance(max_nodes, bool) or max_nodes < 1):
+            raise JsonSchemaDefinitionException('max_nodes must be a positive number')
+        if timeout is not None and (not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or timeout <= 0):
+            raise JsonSchemaDefinitionException('timeout must be a positive number of seconds')
+        if cooperative is not None:
+            if not isinstance(cooperative, (int, float)) or isinstance(cooperative, bool) or cooperative < 0:
+                raise JsonSchemaDefinitionException('cooperative must be a non-negative number of seconds')
+            if batch:
+                raise JsonSchemaDefinitionException('cooperative can not be used together with batch')
+
+        # Mode of the function called by the user and mode of the code being generated right now.
+        # Those can differ, for example subschemas of anyOf are always raising exceptions.
+        self._root_mode = mode
+        self._mode = mode
+        self._max_errors = max_errors
+        # Predicates only answer the question, they never modify validated data. Copied
+        # defaults are recorded to `_defaults` and applied by `apply_defaults` at the end.
+        self._inject_defaults = mode != 'bool' and defaults != 'off'
+        self._copy_defaults = defaults == 'copy'
+        # Generate also `batch_function_name` validating many documents in one call.
+        self._batch = batch
+        # Limits protecting against too big or too deep data. Depth is passed to validation
+        # functions as `_depth`, number of remaining nodes and deadline as `_budget`.
+        self._max_depth = max_depth
+        self._max_nodes = max_nodes
+        self._timeout = timeout
+        # With ``cooperative`` all functions are coroutines, which give control back to the event
+        # loop from `cooperative_checkpoint` when they run longer than this number of seconds.
+        self._cooperative = cooperative
+        # With ``stack`` recursion, references are validated later from `_stack` instead of
+        # calling them right away. Not possible inside of branches (``anyOf``, ``not``, ...)
+        # where the result is needed immediately, so nesting of branches is counted.
+        self._use_stack = recursion == 'stack'
+        self._branch_depth = 0
+        # Recorded `Profile` used to order the checks and `Profile` to record into
+        # by generated code (see `profiling` module). Subschemas are identified by
+        # site keys, cached by id of the subschema.
+        self._profile = profile
+        self._instrument = instrument
+        self._site_keys = {}
 
-    def __init__(self, definition, resolver=None):
         self._code = []
+        # Code of helper functions generated on the side (see `generate_helper_function`).
+        # Appended after all validation functions.
+        self._helper_functions_code = []
+        # Name of the function which code is currently being generated, index of its first
+        # line in `_code` and its local variables (see `generate_func_code_block`).
+        self._function_name = None
+        self._function_start = 0
+        self._function_locals = set()
+        # Subschemas generated as separate functions to keep functions small, see `stats`.
+        self._splits = []
         self._compile_regexps = {}
 
         # Any extra library should be here to be imported only once.
@@ -182,8 +462,16 @@ class CodeGenerator:
         # key-value pair to pass to compile function directly.
         self._extra_imports_lines = []
         self._extra_imports_objects = {}
+        if self._has_budget:
+            self._extra_imports_lines.append('from time import monotonic')
+            self._extra_imports_objects['monotonic'] = monotonic
+        if self._cooperative is not None:
+            self._extra_imports_lines.append('import asyncio')
+            self._extra_imports_objects['asyncio'] = asyncio
 
         self._variables = set()
+        # Map of variables to JSON types already proven by generated code (see `prove_type`).
+        self._proven_types = {}
         self._indent = 0
         self._indent_last_line = None
         # Name of the variable in generated code, that holds object that is being validated.
@@ -195,18 +483,24 @@ class CodeGenerator:
         self._root_definition = definition
         self._definition = None
 
-        # map schema URIs to validation function names for functions
+        # map (schema URI, mode) to validation function names for functions
         # that are not yet generated, but need to be generated
         self._needed_validation_functions = {}
-        # validation function names that are already done
+        # (schema URI, mode) of validation functions that are already done
         self._validation_functions_done = set()
+        # map (schema URI, mode) to names of validation functions
+        self._validation_functions_names = {}
 
         if resolver is None:
             resolver = RefResolver.from_schema(definition)
         self._resolver = resolver
 
         # add main function to `self._needed_validation_functions`
-        self._needed_validation_functions[self._resolver.get_uri()] = self._resolver.get_scope_name()
+        self.get_ref_function_name(self._resolver.resolution_scope)
+        # function called by the user, see `generate_entry_function`
+        self._entry_function_name = self._resolver.get_scope_name()
+        # function validating many documents, see `generate_batch_function`
+        self.batch_function_name = self._entry_function_name + '_many'
 
         self._json_keywords_to_function = OrderedDict()
 
@@ -219,6 +513,23 @@ class CodeGenerator:
 
         return '\n'.join(self._code)
 
+    @property
+    def stats(self):
+        """
+        Returns statistics of generated code: number of ``functions`` and ``lines`` and
+        list of ``splits``, subschemas validated by separate functions to keep size of
+        generated functions in the budget. Each split is described by names of the ``function``
+        and the new ``helper`` function, validated ``variable`` and number of ``lines`` and
+        ``locals`` the function had at that moment.
+        """
+        self._generate_func_code()
+
+        return {
+            'functions': sum(1 for line in self._code if line.startswith(('def ', 'async def '))),
+            'lines': len(self._code),
+            'splits': list(self._splits),
+        }
+
     @property
     def global_state(self):
         """
@@ -228,17 +539,26 @@ class CodeGenerator:
         """
         self._generate_func_code()
 
-        return dict(
+        state = dict(
             **self._extra_imports_objects,
             REGEX_PATTERNS=self._compile_regexps,
             collections=collections,
             re=re,
             JsonSchemaValidationException=JsonSchemaValidationException,
+            JsonSchemaLimitException=JsonSchemaLimitException,
             is_any_field_error=is_any_field_error,
             is_specific_field_error=is_specific_field_error,
             is_fundamental_error=is_fundamental_error,
-            raise_best_anyof_error=raise_best_anyof_error,
+            best_anyof_error=best_anyof_error,
+            build_path=build_path,
+            ErrorLimitReached=ErrorLimitReached,
+            budget_checkpoint=budget_checkpoint,
+            cooperative_checkpoint=cooperative_checkpoint,
+            apply_defaults=apply_defaults,
         )
+        if self._instrument is not None:
+            state['profile'] = self._instrument
+        return state
 
     @property
     def global_state_code(self):
@@ -251,7 +571,7 @@ class CodeGenerator:
         if not self._compile_regexps:
             return '\n'.join(self._extra_imports_lines + [
                 'import collections',
-                'from precisionlife_fastjsonschema import JsonSchemaValidationException',
+                'from precisionlife_fastjsonschema import JsonSchemaValidationException, JsonSchemaLimitException',
                 '',
                 '',
                 '',
@@ -262,7 +582,7 @@ class CodeGenerator:
         return '\n'.join(self._extra_imports_lines + [
             'import re',
             'import collections',
-            'from precisionlife_fastjsonschema import JsonSchemaValidationException',
+            'from precisionlife_fastjsonschema import JsonSchemaValidationException, JsonSchemaLimitException',
             '',
             '',
             'REGEX_PATTERNS = {',
@@ -290,38 +610,373 @@ class CodeGenerator:
             # During generation of validation function, could be needed to generate
             # new one that is added again to `_needed_validation_functions`.
             # Therefore usage of while instead of for loop.
-            uri, name = self._needed_validation_functions.popitem()
-            self.generate_validation_function(uri, name)
-
-    def generate_validation_function(self, uri, name):
+            (uri, mode), name = self._needed_validation_functions.popitem()
+            self.generate_validation_function(uri, name, mode)
+        self.generate_entry_function()
+        if self._batch:
+            self.generate_batch_function()
+        self._code.extend(self._helper_functions_code)
+
+    def generate_validation_function(self, uri, name, mode=None):
         """
         Generate validation function for given uri with given name
         """
-        self._validation_functions_done.add(uri)
+        mode = mode or self._root_mode
+        self._validation_functions_done.add((uri, mode))
+        self.l('')
+        with self._resolver.resolving(uri) as definition, self.in_mode(mode):
+            docstring = f'""" Validation function for: base_uri={self._resolver.base_uri} uri={uri} """'
+            self._generate_function(name, definition, docstring)
+
+    def generate_helper_function(self, definition, name_suffix):
+        """
+        Generate function validating ``definition`` on the side (its code is collected separately
+        and appended at the end) and return its name. Generated in current resolution scope,
+        so the definition can contain relative references.
+        """
+        name = self._unique_function_name('{}_{}'.format(self._function_name, name_suffix))
+        backup = (
+            self._code, self._indent, self._indent_last_line, self._function_name, self._function_start,
+            self._function_locals, self._branch_depth, self._proven_types,
+        )
+        self._code, self._indent, self._indent_last_line, self._branch_depth = [], 0, None, 0
         self.l('')
-        with self._resolver.resolving(uri) as definition:
-            with self.l('def {}(data, *, root_object=None, root_path=[], special_fields_extractor=None):', name):
-                self.l(f'""" Validation function for: base_uri={self._resolver.base_uri} uri={uri} """')
-                self.l('root_object = (data if root_object is None else root_object)')
-                self.generate_func_code_block(definition, 'data', [], clear_variables=True)
+        self._generate_function(name, definition)
+        self._helper_functions_code.extend(self._code)
+        (
+            self._code, self._indent, self._indent_last_line, self._function_name, self._function_start,
+            self._function_locals, self._branch_depth, self._proven_types,
+        ) = backup
+        return name
+
+    def _generate_function(self, name, definition, docstring=None):
+        self._function_name = name
+        self._function_locals = set()
+        self._proven_types = {}
+        with self.l(self._def + ' {}({}):', name, ', '.join(self._function_params())):
+            if docstring:
+                self.l(docstring)
+            if self._use_stack:
+                self._generate_stack_entry(name)
+            self._generate_limits_checks()
+            # Counted from here, so the definition of the function itself is never split.
+            self._function_start = len(self._code)
+            self.generate_func_code_block(definition, 'data', [], clear_variables=True)
+            self.l('return True' if self._mode == 'bool' else 'return data')
+
+    def _function_params(self):
+        """
+        Parameters of validation functions (in current mode). Those are called only from
+        generated code, so all parameters are positional which is cheaper to call than
+        keyword arguments. Keyword API for the user is in `generate_entry_function`.
+        """
+        params = ['data']
+        if self._mode != 'bool':
+            params += ['root_object', 'root_path', 'special_fields_extractor']
+        if self._mode == 'collect':
+            params.append('errors')
+        if self._max_depth is not None:
+            params.append('_depth')
+        if self._has_budget:
+            params.append('_budget')
+        if self._use_stack:
+            params.append('_stack')
+        if self._copy_defaults and self._mode != 'bool':
+            params.append('_defaults')
+        return params
+
+    def call_function(self, name, variable, path=None, depth=None, stack='None'):
+        """
+        Returns code calling validation function ``name`` (in current mode) with arguments
+        matching `_function_params`. By default the path and the depth are of the current
+        variable.
+        """
+        args = [variable]
+        if self._mode != 'bool':
+            if path is None:
+                path = prepare_call_path(self._variable_path)
+            args += ['root_object', path, 'special_fields_extractor']
+        if self._mode == 'collect':
+            args.append('errors')
+        if self._max_depth is not None:
+            args.append(self._depth_expr() if depth is None else depth)
+        if self._has_budget:
+            args.append('_budget')
+        if self._use_stack:
+            args.append(stack)
+        if self._copy_defaults and self._mode != 'bool':
+            args.append('_defaults')
+        if self._cooperative is not None:
+            return 'await {}({})'.format(name, ', '.join(args))
+        return '{}({})'.format(name, ', '.join(args))
+
+    def generate_entry_function(self):
+        """
+        Generate function called by the user with keyword API. It prepares arguments
+        of the main validation function, which is then called with positional ones.
+        """
+        name = self._entry_function_name
+        main_name = self._validation_functions_names[(self._resolver.get_uri(), self._root_mode)]
+        self.l('')
+        if self._mode == 'bool':
+            if len(self._function_params()) == 1:
+                self.l('{} = {}', name, main_name)
+                return
+            with self.l(self._def + ' {}(data):', name):
+                self._generate_budget()
+                self.l('return {}', self.call_function(main_name, 'data', depth='0'))
+            return
+        with self.l(self._def + ' {}(data, *, root_object=None, root_path=[], special_fields_extractor=None):', name):
+            self.l('root_object = (data if root_object is None else root_object)')
+            self._generate_budget()
+            if self._mode == 'collect':
+                self.l('errors = []')
+                with self.l('try:'):
+                    self.l('{}', self.call_function(main_name, 'data', path='root_path', depth='0'))
+                with self.l('except ErrorLimitReached:'):
+                    self.l('pass')
+                self.l('return errors')
+            elif self._copy_defaults:
+                self.l('_defaults = []')
+                self.l('data = {}', self.call_function(main_name, 'data', path='root_path', depth='0'))
+                with self.l('if _defaults:'):
+                    self.l('return apply_defaults(data, _defaults, len(root_path))')
+                self.l('return data')
+            else:
+                self.l('return {}', self.call_function(main_name, 'data', path='root_path', depth='0'))
+
+    def generate_batch_function(self):
+        """
+        Generate function validating all documents of an iterable in one call. It returns
+        list of failures, pairs of index and the exception in all modes: list of errors in
+        collect mode and ``None`` in bool mode. Globals are looked up only once and the main
+        validation function is called directly with positional arguments, so the overhead
+        per document is much lower than calling entry function. Exceeded limit stops only
+        validation of its document and the limit exception is recorded as its failure
+        (added to the list of errors in collect mode).
+        """
+        main_name = self._validation_functions_names[(self._resolver.get_uri(), self._root_mode)]
+        # Limit exceptions can be raised only by code checking some limit.
+        limits = self._max_depth is not None or self._has_budget
+        self.l('')
+        if self._mode == 'bool':
+            signature = 'documents, *, stop_on_failure=False'
+        else:
+            signature = 'documents, *, stop_on_failure=False, special_fields_extractor=None'
+        with self.l('def {}({}):', self.batch_function_name, signature):
+            self.l('_main = {}', main_name)
+            self.l('_failures = []')
+            self.l('_append = _failures.append')
+            if self._mode == 'exception':
+                if limits:
+                    self.l('_exception = (JsonSchemaValidationException, JsonSchemaLimitException)')
+                else:
+                    self.l('_exception = JsonSchemaValidationException')
+            elif limits:
+                self.l('_limit = JsonSchemaLimitException')
+            if self._mode != 'bool':
+                self.l('root_path = []')
+            # Each document is also the root object.
+            document = 'data' if self._mode == 'bool' else 'root_object'
+            with self.l('for _index, {} in enumerate(documents):', document):
+                self._generate_budget()
+                if self._copy_defaults:
+                    # Copies with defaults are not returned, only recorded defaults are dropped.
+                    self.l('_defaults = []')
+                call = self.call_function('_main', document, path='root_path', depth='0')
+                if self._mode == 'bool':
+                    if limits:
+                        with self.l('try:'):
+                            self._generate_batch_bool_check(call)
+                        with self.l('except _limit as _error:'):
+                            self.l('_append((_index, _error))')
+                            with self.l('if stop_on_failure:'):
+                                self.l('break')
+                    else:
+                        self._generate_batch_bool_check(call)
+                elif self._mode == 'collect':
+                    self.l('errors = []')
+                    with self.l('try:'):
+                        self.l('{}', call)
+                    with self.l('except ErrorLimitReached:'):
+                        self.l('pass')
+                    if limits:
+                        with self.l('except _limit as _error:'):
+                            self.l('errors.append(_error)')
+                    with self.l('if errors:'):
+                        self.l('_append((_index, errors))')
+                        with self.l('if stop_on_failure:'):
+                            self.l('break')
+                else:
+                    with self.l('try:'):
+                        self.l('{}', call)
+                    with self.l('except _exception as _error:'):
+                        self.l('_append((_index, _error))')
+                        with self.l('if stop_on_failure:'):
+                            self.l('break')
+            self.l('return _failures')
+
+    def _generate_batch_bool_check(self, call):
+        with self.l('if not {}:', call):
+            self.l('_append((_index, None))')
+            with self.l('if stop_on_failure:'):
+                self.l('break')
+
+    def _generate_stack_entry(self, name):
+        """
+        Function called by the user (or from a branch) gets no stack. It creates one with
+        the validation of its own data and processes it until it is empty. Functions called
+        from the loop push validations of referenced schemas to the stack instead of calling
+        them. Newly pushed items are reversed, so the data are validated in the same order
+        as with direct calls.
+        """
+        depth = ', _depth' if self._max_depth is not None else ''
+        with self.l('if _stack is None:'):
+            if self._mode == 'bool':
+                self.l('_stack = [({}, data{})]', name, depth)
+                with self.l('while _stack:'):
+                    self.l('_func, _data{} = _stack.pop()', depth)
+                    with self.l('if not {}:', self.call_function('_func', '_data', depth='_depth', stack='_stack')):
+                        self.l('return False')
+                self.l('return True')
+            else:
+                self.l('_stack = [({}, data, root_path{})]', name, depth)
+                with self.l('while _stack:'):
+                    self.l('_func, _data, _path{} = _stack.pop()', depth)
+                    self.l('_stack_len = len(_stack)')
+                    self.l('{}', self.call_function('_func', '_data', path='_path', depth='_depth', stack='_stack'))
+                    with self.l('if len(_stack) > _stack_len + 1:'):
+                        self.l('_stack[_stack_len:] = reversed(_stack[_stack_len:])')
                 self.l('return data')
 
+    @property
+    def _has_budget(self):
+        return self._max_nodes is not None or self._timeout is not None or self._cooperative is not None
+
+    @property
+    def _def(self):
+        return 'def' if self._cooperative is None else 'async def'
+
+    def _depth_expr(self):
+        if self._variable_path:
+            return '_depth + {}'.format(len(self._variable_path))
+        return '_depth'
+
+    def _generate_budget(self):
+        if self._has_budget:
+            nodes = self._max_nodes if self._max_nodes is not None else sys.maxsize
+            if self._cooperative is not None:
+                deadline = 'monotonic() + {}'.format(self._timeout) if self._timeout is not None else 'None'
+                self.l(
+                    '_budget = [{}, {}, {}, monotonic() + {cooperative}, {cooperative}]',
+                    nodes, deadline, max(nodes - 256, -1), cooperative=self._cooperative,
+                )
+            elif self._timeout is not None:
+                self.l('_budget = [{}, monotonic() + {}, {}]', nodes, self._timeout, max(nodes - 1024, -1))
+            else:
+                self.l('_budget = [{}, None, -1]', nodes)
+
+    def _generate_limits_checks(self):
+        if self._max_depth is not None:
+            with self.l('if _depth > {}:', self._max_depth):
+                self.l('raise JsonSchemaLimitException("validation exceeded maximum depth", "max_depth")')
+        self.count_nodes()
+
+    def count_nodes(self, count='1'):
+        """
+        Append code counting visited nodes (or any other work) to ``max_nodes``
+        and ``timeout`` limits. Used for every validation function call and
+        for every iteration of loops over data.
+        """
+        if not self._has_budget:
+            return
+        self.l('_budget[0] -= ' + count)
+        with self.l('if _budget[0] <= _budget[2]:', optimize=False):
+            if self._cooperative is not None:
+                self.l('await cooperative_checkpoint(_budget)')
+            else:
+                self.l('budget_checkpoint(_budget)')
+
+    def _unique_function_name(self, name):
+        """
+        Reserve name for a generated function which is not bound to any scope. Names are shared
+        with the resolver, so it will never give the same name to some scope later.
+        """
+        taken = self._resolver.unique_names_taken
+        unique_name = name
+        idx = -1
+        while unique_name in taken:
+            idx += 1
+            unique_name = f'{name}_{idx}'
+        taken.add(unique_name)
+        return unique_name
+
     def generate_func_code_block(self, definition, variable, variable_path, clear_variables=False):
         """
-        Creates validation rules for current definition.
+        Creates validation rules for current definition. Subschemas (with ``clear_variables``)
+        are validated by a separate function when the current one is already too big.
         """
-        backup = self._definition, self._variable, self._variable_path
+        if clear_variables and self._is_split_needed(definition):
+            self._generate_split(definition, variable, variable_path)
+            return
+        backup = self._definition, self._variable, self._variable_path, self._proven_types
         self._definition, self._variable, self._variable_path = definition, variable, variable_path
+        # Types proven inside of the block are not valid after it (block can be in a condition).
+        self._proven_types = dict(self._proven_types)
         if clear_variables:
             backup_variables = self._variables
             self._variables = set()
 
         self._generate_func_code_block(definition)
 
-        self._definition, self._variable, self._variable_path = backup
+        self._definition, self._variable, self._variable_path, self._proven_types = backup
+        self._function_locals.add(variable)
+        self._function_locals.update(self._variables)
         if clear_variables:
             self._variables = backup_variables
 
+    def _is_split_needed(self, definition):
+        lines = len(self._code) - self._function_start
+        if lines < self.FUNCTION_MAX_LINES and len(self._function_locals) < self.FUNCTION_MAX_LOCALS:
+            return False
+        # Content keywords are replacing the validated variable, which has to stay local.
+        size = 0
+        nodes = [definition]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, dict):
+                if 'contentEncoding' in node or 'contentMediaType' in node:
+                    return False
+                nodes.extend(node.values())
+            elif isinstance(node, list):
+                nodes.extend(node)
+            else:
+                continue
+            size += len(node)
+        return size >= self.SPLIT_MIN_SIZE
+
+    def _generate_split(self, definition, variable, variable_path):
+        split = {
+            'function': self._function_name,
+            'variable': variable,
+            'lines': len(self._code) - self._function_start,
+            'locals': len(self._function_locals),
+        }
+        self._splits.append(split)
+        name = split['helper'] = self.generate_helper_function(definition, 'split')
+        call = self.call_function(
+            name,
+            variable,
+            path=prepare_call_path(variable_path),
+            depth='_depth + {}'.format(len(variable_path)),
+            stack='_stack' if self._use_stack and not self._branch_depth else 'None',
+        )
+        if self._mode == 'bool':
+            with self.l('if not {}:', call):
+                self.l('return False')
+        else:
+            self.l('{}', call)
+
     def _generate_func_code_block(self, definition):
         if not isinstance(definition, dict):
             raise JsonSchemaDefinitionException("definition must be an object")
@@ -332,9 +987,127 @@ class CodeGenerator:
             self.run_generate_functions(definition)
 
     def run_generate_functions(self, definition):
-        for key, func in self._json_keywords_to_function.items():
-            if key in definition:
-                func()
+        if self._instrument is not None:
+            self.l('profile.visit({!r})', self.site_key(definition))
+        for key in self.keywords_order(definition):
+            self._json_keywords_to_function[key]()
+
+    def keywords_order(self, definition):
+        """
+        Returns keywords of ``definition`` in order in which those are checked, so invalid
+        data are rejected as soon as possible. Type is always checked first, then checks
+        of strings and numbers and then other checks in order of `_json_keywords_to_function`.
+        Checks without side effects are reordered between keywords with side effects from
+        the cheapest (see `KEYWORD_COSTS`) or, with recorded profile, from the cheapest
+        relative to how often those fail. The order is always the same for the same input.
+        """
+        keywords = [key for key in self._json_keywords_to_function if key in definition]
+        site = self.site_key(definition) if self._profile is not None else None
+        priority = functools.partial(self.keyword_priority, site)
+
+        order = [key for key in keywords if key == 'type']
+        order.extend(sorted((key for key in keywords if key in SCALAR_KEYWORDS), key=priority))
+        run = []
+        for key in keywords:
+            if key == 'type' or key in SCALAR_KEYWORDS:
+                continue
+            if self.is_pure_keyword(definition, key):
+                run.append(key)
+            else:
+                order.extend(sorted(run, key=priority))
+                order.append(key)
+                run = []
+        order.extend(sorted(run, key=priority))
+        return order
+
+    def keyword_priority(self, site, key):
+        cost = KEYWORD_COSTS.get(key, COST_SUBSCHEMAS)
+        failure_rate = self._profile.failure_rate(site, key) if site else 0
+        return (cost / failure_rate if failure_rate else math.inf, cost)
+
+    def is_pure_keyword(self, definition, key):
+        if key in PURE_KEYWORDS:
+            return True
+        if key not in SUBSCHEMA_KEYWORDS:
+            return False
+        if not self._inject_defaults:
+            return True
+        return not self.has_defaults([definition.get(name) for name in SUBSCHEMA_KEYWORDS[key]])
+
+    def site_key(self, definition):
+        key = self._site_keys.get(id(definition))
+        if key is None:
+            key = self._site_keys[id(definition)] = site_key(definition)
+        return key
+
+    def object_shape(self):
+        """
+        Returns keys which most objects validated by current definition have according to
+        the recorded profile and name of global frozenset with them, or None. See `generate_properties`.
+        """
+        if self._profile is None:
+            return None
+        site = self.site_key(self._definition)
+        keys = self._profile.dominant_shape(site, self.SHAPE_MIN_SHARE)
+        if keys is None:
+            return None
+        # Shapes are global constants, so those are created only once like imports.
+        name = 'SHAPE_' + site
+        if name not in self._extra_imports_objects:
+            self._extra_imports_objects[name] = keys
+            self._extra_imports_lines.append('{} = frozenset({!r})'.format(name, sorted(keys)))
+        return keys, name
+
+    def any_of_order(self, definitions):
+        """
+        Returns list of (index, definition) of ``anyOf`` branches in order in which those
+        are tried. With recorded profile the most often matching branches are tried first,
+        but only when no branch changes the data, because then all tried branches matter.
+        """
+        items = list(enumerate(definitions))
+        if self._profile is None or (self._inject_defaults and any(self.has_defaults(item) for item in definitions)):
+            return items
+        site = self.site_key(self._definition)
+        return sorted(items, key=lambda item: -self._profile.hit_rate(site, item[0]))
+
+    def generate_default(self, key, default, prefix=''):
+        """
+        Append code setting ``default`` value of missing property ``key`` of current variable
+        or, when ``key`` is an index, appending it as the next item. With ``defaults='copy'``
+        the default is only recorded for `apply_defaults`. Default literal is evaluated every
+        time, so mutable values are never shared, immutable ones are constants of the code.
+        """
+        key_code = str(key) if isinstance(key, int) else '"{}"'.format(self.e(key))
+        if self._copy_defaults:
+            self.l(
+                prefix + '_defaults.append((build_path(root_path) + {}, {}, {}))',
+                prepare_path(self._variable_path), key_code, repr(default),
+            )
+        elif isinstance(key, int):
+            self.l(prefix + '{variable}.append({})', repr(default))
+        else:
+            self.l(prefix + '{variable}[{}] = {}', key_code, repr(default))
+
+    def has_defaults(self, definition, seen=None):
+        """
+        Returns if ``definition`` or any subschema (also referenced) contains ``default``.
+        """
+        if seen is None:
+            seen = set()
+        if isinstance(definition, list):
+            return any(self.has_defaults(item, seen) for item in definition)
+        if not isinstance(definition, dict) or id(definition) in seen:
+            return False
+        seen.add(id(definition))
+        if 'default' in definition:
+            return True
+        if isinstance(definition.get('$ref'), str):
+            with self._resolver.resolving(definition['$ref']) as target:
+                if self.has_defaults(target, seen):
+                    return True
+        return any(
+            self.has_defaults(item, seen) for key, item in definition.items() if key != 'enum' and key != 'const'
+        )
 
     def generate_ref(self):
         """
@@ -350,13 +1123,108 @@ class CodeGenerator:
                 }
             }
         """
-        with self._resolver.in_scope(self._definition['$ref']):
-            name = self._resolver.get_scope_name()
-            uri = self._resolver.get_uri()
-            if uri not in self._validation_functions_done:
-                self._needed_validation_functions[uri] = name
+        ref = self._definition['$ref']
+        with self._resolver.resolving(ref) as definition:
+            if self._is_inlinable(definition):
+                self.generate_func_code_block(definition, self._variable, self._variable_path, clear_variables=True)
+                return
+        name = self.get_ref_function_name(ref)
+        if self._use_stack and not self._branch_depth:
+            depth = ', ' + self._depth_expr() if self._max_depth is not None else ''
+            if self._mode == 'bool':
+                self.l('_stack.append(({}, {variable}{}))', name, depth)
+            else:
+                path = prepare_call_path(self._variable_path)
+                self.l('_stack.append(({}, {variable}, {path}{}))', name, depth, path=path)
+        elif self._mode == 'bool':
+            with self.l('if not {}:', self.call_function(name, self._variable)):
+                self.l('return False')
+        else:
             # call validation function, with current full name as a root_path
-            self.l('{}({variable}, root_object=root_object, root_path=root_path + {path}, special_fields_extractor=special_fields_extractor)', name, path=prepare_path(self._variable_path))
+            self.l('{}', self.call_function(name, self._variable))
+
+    def _is_inlinable(self, definition):
+        """
+        Referenced definitions smaller than ``INLINE_REF_MAX_SIZE`` (number of keys and items)
+        are validated in place instead of calling a validation function. Only definitions
+        without any reference, so those are never recursive. Content keywords are replacing
+        the validated variable, which has to stay local to validation function.
+        """
+        size = 0
+        nodes = [definition]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, dict):
+                if '$ref' in node or 'contentEncoding' in node or 'contentMediaType' in node:
+                    return False
+                nodes.extend(node.values())
+            elif isinstance(node, list):
+                nodes.extend(node)
+            else:
+                continue
+            size += len(node)
+            if size > self.INLINE_REF_MAX_SIZE:
+                return False
+        return True
+
+    def get_ref_function_name(self, ref):
+        """
+        Returns name of the validation function (in current mode) for given reference
+        and makes sure it will be generated.
+        """
+        with self._resolver.in_scope(ref):
+            key = (self._resolver.get_uri(), self._mode)
+            if key not in self._validation_functions_names:
+                name = self._resolver.get_scope_name()
+                if self._mode != self._root_mode:
+                    name = '{}_{}'.format(name, self._mode)
+                self._validation_functions_names[key] = self._unique_function_name('_' + name)
+            if key not in self._validation_functions_done:
+                self._needed_validation_functions[key] = self._validation_functions_names[key]
+        return self._validation_functions_names[key]
+
+    def predicate_call(self, name, variable):
+        """
+        Returns code calling predicate function ``name`` (see `get_predicate_function_name`)
+        with ``variable``.
+        """
+        return self.call_function(name, variable)
+
+    @contextlib.contextmanager
+    def in_mode(self, mode):
+        """
+        Context manager generating code in given mode.
+        """
+        backup = self._mode
+        self._mode = mode
+        try:
+            yield
+        finally:
+            self._mode = backup
+
+    @contextlib.contextmanager
+    def branch(self):
+        """
+        Context manager for generating subschemas which result decides about something
+        else (``anyOf``, ``not``, ...) inside ``try`` block. Errors of such subschemas are
+        not errors of the data, so those are raising exceptions even in ``collect`` mode.
+        """
+        self._branch_depth += 1
+        try:
+            with self.in_mode('exception' if self._mode == 'collect' else self._mode):
+                yield
+        finally:
+            self._branch_depth -= 1
+
+    def get_predicate_function_name(self, definition):
+        """
+        Returns name of a function returning True or False for given ``definition``.
+        Used only in ``bool`` mode for subschemas which result is needed (``anyOf``,
+        ``not``, ...), so there is no need to catch anything.
+        """
+        if isinstance(definition, dict) and '$ref' in definition:
+            return self.get_ref_function_name(definition['$ref'])
+        return self.generate_helper_function(definition, 'part')
 
 
     # pylint: disable=invalid-name
@@ -403,15 +1271,39 @@ class CodeGenerator:
 
     def exc(self, msg, *args, rule=None, missing_fields: Optional[list[str]] = None, extra_fields: Optional[list[str]] = None):
         """
+        Short-cut of failing validation. Raises an exception with given message,
+        in ``bool`` mode simply returns False.
         """
+        if self._instrument is not None:
+            self.l('profile.fail({!r}, {!r})', self.site_key(self._definition), rule)
+        if self._mode == 'bool':
+            self.l('return False')
+            return
         name_path = prepare_path(self._variable_path)
-        msg = 'raise JsonSchemaValidationException("'+msg+'", value={variable}, definition={definition}, rule={rule}, path=root_path + ' + name_path + ', root_object=root_object, special_fields_extractor=special_fields_extractor'
+        msg = (
+            'JsonSchemaValidationException("' + msg + '", value={variable}, definition={definition}, rule={rule}, '
+            'path=build_path(root_path) + ' + name_path + ', root_object=root_object, '
+            'special_fields_extractor=special_fields_extractor'
+        )
         if missing_fields is not None:
             msg += f', missing_fields={missing_fields}'
         if extra_fields is not None:
             msg += f', extra_fields={extra_fields}'
         msg += ')'
-        self.l(msg, *args, definition=repr(self._definition), rule=repr(rule))
+        self.fail(msg, *args, definition=repr(self._definition), rule=repr(rule))
+
+    def fail(self, exception, *args, **kwds):
+        """
+        Raises given ``exception`` (code creating it), in ``collect`` mode adds
+        it to the list of errors and validation continues.
+        """
+        if self._mode == 'collect':
+            self.l('errors.append(' + exception + ')', *args, **kwds)
+            if self._max_errors is not None:
+                with self.l('if len(errors) >= {}:', self._max_errors, optimize=False):
+                    self.l('raise ErrorLimitReached')
+        else:
+            self.l('raise ' + exception, *args, **kwds)
 
     def create_variable_with_length(self):
         """
@@ -426,17 +1318,6 @@ class CodeGenerator:
         self._variables.add(variable_name)
         self.l('{variable}_len = len({variable})')
 
-    def create_variable_keys(self):
-        """
-        Append code for creating variable with keys of that variable (dictionary)
-        with a name ``{variable}_keys``. Similar to `create_variable_with_length`.
-        """
-        variable_name = '{}_keys'.format(self._variable)
-        if variable_name in self._variables:
-            return
-        self._variables.add(variable_name)
-        self.l('{variable}_keys = set({variable}.keys())')
-
     def create_variable_is_list(self):
         """
         Append code for creating variable with bool if it's instance of list
@@ -459,6 +1340,48 @@ class CodeGenerator:
         self._variables.add(variable_name)
         self.l('{variable}_is_dict = isinstance({variable}, collections.abc.Mapping)')
 
+    def prove_type(self, types):
+        """
+        Remember that current variable is of given JSON type in the rest of the current block,
+        called right after generating the check of the type. Only in modes where failed check
+        stops the validation; in ``collect`` mode the code continues after the error.
+        """
+        if len(types) == 1 and self._mode != 'collect':
+            self._proven_types[self._variable] = types[0]
+
+    def forget_type(self):
+        """
+        Called when the value of current variable is replaced by generated code.
+        """
+        self._proven_types.pop(self._variable, None)
+
+    def is_type_proven(self, *types):
+        proven = self._proven_types.get(self._variable)
+        return proven in types or (proven == 'integer' and 'number' in types)
+
+    @contextlib.contextmanager
+    def type_guard(self, json_type):
+        """
+        Context manager for code of keywords applicable only to some JSON type (``object``,
+        ``array``, ``string`` or ``number``). The condition is not generated at all when
+        the type of the variable is already proven by ``type`` keyword.
+        """
+        if self.is_type_proven(json_type):
+            yield
+            return
+        if json_type == 'object':
+            self.create_variable_is_dict()
+            condition = 'if {variable}_is_dict:'
+        elif json_type == 'array':
+            self.create_variable_is_list()
+            condition = 'if {variable}_is_list:'
+        elif json_type == 'string':
+            condition = 'if isinstance({variable}, str):'
+        else:
+            condition = 'if isinstance({variable}, (int, float)):'
+        with self.l(condition):
+            yield
+
     def can_emit_required_and_additional(self):
         variable_name = '{}_required_and_additional'.format(self._variable)
         if variable_name in self._variables:
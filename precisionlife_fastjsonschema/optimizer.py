@@ -0,0 +1,325 @@
+"""
+Optimization of JSON schema before generating the code
+
+Machine generated schemas often contain constructs which are translated literally
+to slower code: nested ``allOf`` with single items, ``anyOf`` with one branch, duplicate
+constraints, always valid subschemas or ``$ref`` pointing to another ``$ref``. Function
+`optimize_schema` returns an equivalent smaller schema and a report of what was changed.
+
+Validity of data is never changed. Details of errors (rule, definition) can be different,
+because some checks are moved to other place of the schema.
+"""
+
+import copy
+from urllib.parse import unquote
+
+# Keywords with one subschema, list of subschemas and map of subschemas.
+SUBSCHEMA_KEYWORDS = (
+    'additionalItems', 'additionalProperties', 'contains', 'propertyNames', 'not', 'if', 'then', 'else',
+)
+SUBSCHEMA_LIST_KEYWORDS = ('allOf', 'anyOf', 'oneOf')
+SUBSCHEMA_MAP_KEYWORDS = ('definitions', 'properties', 'patternProperties', 'dependencies')
+
+# Keywords which meaning depends on each other. Those can be merged from two subschemas
+# only when both subschemas have the same set of them.
+COUPLED_KEYWORDS = (
+    {'properties', 'patternProperties', 'additionalProperties'},
+    {'items', 'additionalItems'},
+    {'if', 'then', 'else'},
+    {'minimum', 'exclusiveMinimum'},
+    {'maximum', 'exclusiveMaximum'},
+)
+LOWER_BOUNDS = ('minimum', 'minLength', 'minItems', 'minProperties')
+UPPER_BOUNDS = ('maximum', 'maxLength', 'maxItems', 'maxProperties')
+ANNOTATIONS = ('title', 'description', '$comment', 'examples')
+# Subschemas with those keywords can't be moved, it would change the meaning.
+NOT_MOVABLE = ('$ref', '$id', 'id', '$schema', 'definitions', 'allOf')
+
+
+def optimize_schema(definition):
+    """
+    Returns optimized copy of ``definition`` and list of changes done, each change as
+    a string with JSON pointer of the changed subschema. Example:
+
+    .. code-block:: python
+
+        schema, report = fastjsonschema.optimize_schema({
+            'allOf': [{'type': 'integer'}, {'minimum': 0}],
+            'anyOf': [{'maximum': 10}],
+        })
+        # schema == {'type': 'integer', 'minimum': 0, 'maximum': 10}
+        # report == ['#: anyOf with one branch merged', '#: allOf item merged', '#: allOf item merged']
+
+    Schemas using ``id`` (``$id``) in subschemas are returned unchanged, because
+    references can't be followed reliably without full resolution.
+    """
+    schema = copy.deepcopy(definition)
+    if not isinstance(schema, dict):
+        return schema, []
+    optimizer = SchemaOptimizer(schema)
+    if optimizer.has_ids:
+        return schema, ['#: not optimized, schema contains ids']
+    optimizer.optimize(schema, [])
+    optimizer.shorten_ref_chains()
+    return schema, optimizer.report
+
+
+class SchemaOptimizer:
+    """
+    This class is not supposed to be used directly, use `optimize_schema`.
+
+    Optimizes the schema in place. Subschemas under a JSON pointer used by some ``$ref``
+    are never moved or removed, so all references stay valid.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.report = []
+        self._ref_targets = []
+        self.has_ids = False
+        self._collect_refs(schema, is_root=True)
+
+    def _collect_refs(self, node, is_root=False):
+        if isinstance(node, list):
+            for item in node:
+                self._collect_refs(item)
+        if not isinstance(node, dict):
+            return
+        if not is_root and (isinstance(node.get('$id'), str) or isinstance(node.get('id'), str)):
+            self.has_ids = True
+        ref = node.get('$ref')
+        if isinstance(ref, str) and ref.startswith('#'):
+            self._ref_targets.append(pointer_to_path(ref))
+        for item in node.values():
+            self._collect_refs(item)
+
+    def is_referenced(self, path):
+        return any(target[:len(path)] == path for target in self._ref_targets)
+
+    def changed(self, path, message):
+        self.report.append('{}: {}'.format(path_to_pointer(path), message))
+
+    def optimize(self, node, path):
+        """
+        Optimize subschemas first, then the ``node`` itself.
+        """
+        if not isinstance(node, dict):
+            return
+        if '$ref' in node:
+            # Other keywords are ignored next to the reference, only definitions can be used.
+            if isinstance(node.get('definitions'), dict):
+                for name, item in node['definitions'].items():
+                    self.optimize(item, path + ['definitions', name])
+            return
+        for key in SUBSCHEMA_KEYWORDS:
+            if key in node:
+                self.optimize(node[key], path + [key])
+        items = node.get('items')
+        if isinstance(items, dict):
+            self.optimize(items, path + ['items'])
+        elif isinstance(items, list):
+            for index, item in enumerate(items):
+                self.optimize(item, path + ['items', str(index)])
+        for key in SUBSCHEMA_LIST_KEYWORDS:
+            if isinstance(node.get(key), list):
+                for index, item in enumerate(node[key]):
+                    self.optimize(item, path + [key, str(index)])
+        for key in SUBSCHEMA_MAP_KEYWORDS:
+            if isinstance(node.get(key), dict):
+                for name, item in node[key].items():
+                    self.optimize(item, path + [key, name])
+
+        self.normalize_type(node, path)
+        self.drop_always_valid(node, path)
+        self.simplify_single_branch(node, path, 'anyOf')
+        self.simplify_single_branch(node, path, 'oneOf')
+        self.simplify_all_of(node, path)
+
+    def normalize_type(self, node, path):
+        types = node.get('type')
+        if not isinstance(types, list):
+            return
+        unique_types = []
+        for type_ in types:
+            if type_ not in unique_types:
+                unique_types.append(type_)
+        if len(unique_types) == 1:
+            node['type'] = unique_types[0]
+            self.changed(path, 'type list with one type replaced by the type')
+        elif len(unique_types) != len(types):
+            node['type'] = unique_types
+            self.changed(path, 'duplicate types removed')
+
+    def drop_always_valid(self, node, path):
+        for key in ('minLength', 'minItems', 'minProperties'):
+            if is_number(node.get(key)) and node[key] <= 0:
+                del node[key]
+                self.changed(path, '{} without effect removed'.format(key))
+        if node.get('required') == []:
+            del node['required']
+            self.changed(path, 'empty required removed')
+        for key in ('items', 'additionalItems', 'additionalProperties', 'propertyNames'):
+            if key in node and is_always_valid(node[key]) and not self.is_referenced(path + [key]):
+                del node[key]
+                self.changed(path, 'always valid {} removed'.format(key))
+        if 'if' in node and 'then' not in node and 'else' not in node and not contains_default(node['if']) \
+                and not self.is_referenced(path + ['if']):
+            del node['if']
+            self.changed(path, 'if without then and else removed')
+        if isinstance(node.get('anyOf'), list) and any(is_always_valid(item) for item in node['anyOf']) \
+                and not contains_default(node['anyOf']) and not self.is_referenced(path + ['anyOf']):
+            del node['anyOf']
+            self.changed(path, 'anyOf with always valid branch removed')
+
+    def simplify_single_branch(self, node, path, key):
+        """
+        ``anyOf`` or ``oneOf`` with one branch is the same as the branch. It's merged into
+        the ``node`` or moved to ``allOf``, which does not need any ``try`` block.
+        """
+        if not isinstance(node.get(key), list) or len(node[key]) != 1 or self.is_referenced(path + [key]):
+            return
+        item = node.pop(key)[0]
+        if self.merge(node, item):
+            self.changed(path, '{} with one branch merged'.format(key))
+        else:
+            node.setdefault('allOf', []).append(item)
+            self.changed(path, '{} with one branch replaced by allOf'.format(key))
+
+    def simplify_all_of(self, node, path):
+        if not isinstance(node.get('allOf'), list) or self.is_referenced(path + ['allOf']):
+            return
+        items = []
+        for item in node.pop('allOf'):
+            if isinstance(item, dict) and list(item) == ['allOf'] and isinstance(item['allOf'], list):
+                items.extend(item['allOf'])
+                self.changed(path, 'nested allOf flattened')
+            elif is_always_valid(item):
+                self.changed(path, 'always valid allOf item removed')
+            else:
+                items.append(item)
+        remaining = []
+        for item in items:
+            if self.merge(node, item):
+                self.changed(path, 'allOf item merged')
+            else:
+                remaining.append(item)
+        if remaining:
+            node['allOf'] = remaining
+
+    def merge(self, node, item):
+        """
+        Merge subschema ``item`` into ``node`` when the result means the same as both of them
+        together. Returns if it was merged.
+        """
+        if not isinstance(item, dict) or '$ref' in node or any(key in item for key in NOT_MOVABLE):
+            return False
+        if 'default' in item and node.get('default', item) != item['default']:
+            return False
+        for keywords in COUPLED_KEYWORDS:
+            node_keywords = keywords & node.keys()
+            item_keywords = keywords & item.keys()
+            if node_keywords and item_keywords and node_keywords != item_keywords:
+                return False
+        merged = {}
+        for key, value in item.items():
+            if key not in node:
+                merged[key] = value
+            elif key not in ANNOTATIONS:
+                merged_value = merge_keyword(key, node[key], value)
+                if merged_value is None:
+                    return False
+                merged[key] = merged_value
+        node.update(merged)
+        return True
+
+    def shorten_ref_chains(self):
+        """
+        Reference pointing to a subschema with another reference is replaced by the final one.
+        """
+        for node, path in iterate_refs(self.schema, []):
+            ref = node['$ref']
+            seen = {ref}
+            target = resolve_pointer(self.schema, ref)
+            while isinstance(target, dict) and isinstance(target.get('$ref'), str) \
+                    and target['$ref'].startswith('#') and target['$ref'] not in seen:
+                ref = target['$ref']
+                seen.add(ref)
+                target = resolve_pointer(self.schema, ref)
+            if ref != node['$ref'] and (not isinstance(target, dict) or '$ref' not in target):
+                node['$ref'] = ref
+                self.changed(path, 'reference chain shortened to {}'.format(ref))
+
+
+def merge_keyword(key, value1, value2):
+    """
+    Returns one value of keyword ``key`` meaning the same as both values, or None.
+    """
+    if value1 == value2:
+        return value1
+    if is_number(value1) and is_number(value2):
+        if key in LOWER_BOUNDS:
+            return max(value1, value2)
+        if key in UPPER_BOUNDS:
+            return min(value1, value2)
+    if key == 'required' and isinstance(value1, list) and isinstance(value2, list):
+        return value1 + [name for name in value2 if name not in value1]
+    if key == 'type':
+        types1 = value1 if isinstance(value1, list) else [value1]
+        types2 = value2 if isinstance(value2, list) else [value2]
+        types = [
+            type_ for type_ in types1
+            if type_ in types2 or (type_ == 'integer' and 'number' in types2)
+        ] + [
+            type_ for type_ in types2
+            if type_ == 'integer' and 'number' in types1 and type_ not in types1
+        ]
+        if types:
+            return types[0] if len(types) == 1 else types
+    return None
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def is_always_valid(definition):
+    return definition is True or definition == {}
+
+
+def contains_default(definition):
+    if isinstance(definition, dict):
+        return 'default' in definition or any(contains_default(item) for item in definition.values())
+    if isinstance(definition, list):
+        return any(contains_default(item) for item in definition)
+    return False
+
+
+def iterate_refs(node, path):
+    if isinstance(node, list):
+        for index, item in enumerate(node):
+            yield from iterate_refs(item, path + [str(index)])
+    elif isinstance(node, dict):
+        if isinstance(node.get('$ref'), str) and node['$ref'].startswith('#'):
+            yield node, path
+        for key, item in node.items():
+            if key != '$ref':
+                yield from iterate_refs(item, path + [key])
+
+
+def pointer_to_path(ref):
+    fragment = ref[1:].lstrip('/')
+    return [part.replace('~1', '/').replace('~0', '~') for part in unquote(fragment).split('/')] if fragment else []
+
+
+def path_to_pointer(path):
+    return '#' + ''.join('/' + part.replace('~', '~0').replace('/', '~1') for part in path)
+
+
+def resolve_pointer(schema, ref):
+    node = schema
+    for part in pointer_to_path(ref):
+        try:
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            return None
+    return node
@@ -0,0 +1,900 @@
+"""
+Validation of JSON documents while they are parsed
+
+Members of the top-level object or array at the start of the document are parsed one
+by one and each is validated right after it is parsed by generated functions of its
+subschemas (``properties``, ``patternProperties``, ``additionalProperties``, ``items``
+and ``additionalItems``). Invalid document is therefore rejected without parsing the
+rest of it. Parsing members one by one is slower than parsing all of them at once by
+``json`` module, so it is done only for the first ``prefix_size`` characters of bigger
+documents. The rest is parsed at once and the whole document is validated by the
+validation function, which validates members of the prefix again, but that is only
+a small part of the document.
+
+Huge documents can be given in chunks to :any:`PushParser`, which keeps only unparsed
+text and validates members of the top-level array or object as soon as they are complete.
+"""
+
+import codecs
+import json
+import re
+from json.decoder import WHITESPACE, scanstring
+from urllib.parse import quote, unquote
+
+from .exceptions import JsonSchemaDefinitionException, JsonSchemaValidationException
+
+
+def pointer(*parts):
+    """
+    Returns local reference to the subschema on the path of ``parts``.
+    """
+    return '#/' + '/'.join(quote(str(part).replace('~', '~0').replace('/', '~1'), safe='') for part in parts)
+
+
+def member_refs(definition):
+    """
+    Returns references to subschemas of members of the top-level value in dictionary
+    with keys as names of keywords. Values of ``properties`` and ``patternProperties``
+    map names and patterns to references and ``items`` is a reference or list of them.
+    """
+    refs = {}
+    # Other keywords are ignored next to the reference.
+    if not isinstance(definition, dict) or '$ref' in definition:
+        return refs
+    if isinstance(definition.get('properties'), dict):
+        refs['properties'] = {key: pointer('properties', key) for key in definition['properties']}
+    if isinstance(definition.get('patternProperties'), dict):
+        refs['patternProperties'] = {
+            pattern: pointer('patternProperties', pattern) for pattern in definition['patternProperties']
+        }
+    if isinstance(definition.get('additionalProperties'), dict):
+        refs['additionalProperties'] = pointer('additionalProperties')
+    items = definition.get('items')
+    if isinstance(items, dict):
+        refs['items'] = pointer('items')
+    elif isinstance(items, list):
+        refs['items'] = [pointer('items', index) for index in range(len(items))]
+        if isinstance(definition.get('additionalItems'), dict):
+            refs['additionalItems'] = pointer('additionalItems')
+    return refs
+
+
+class DuplicateKey(Exception):
+    """
+    Object ``value`` has ``key`` more than once.
+    """
+
+    def __init__(self, key, value):
+        super().__init__(key)
+        self.key = key
+        self.value = value
+
+
+class InvalidMember(Exception):
+    """
+    Member is invalid in bool mode.
+    """
+
+
+def dict_without_duplicates(pairs):
+    data = dict(pairs)
+    if len(data) != len(pairs):
+        seen = set()
+        for key, _ in pairs:
+            if key in seen:
+                raise DuplicateKey(key, data)
+            seen.add(key)
+    return data
+
+
+# Plans of lazy parsing: value is parsed at once or skipped, ``LazyPlan`` gives plans of members.
+FULL = 'full'
+SKIP = 'skip'
+
+# Keywords which do not constrain the value.
+NOT_VALIDATING_KEYWORDS = frozenset((
+    'title', 'description', '$comment', 'examples', 'default', '$schema', 'definitions', 'readOnly', 'writeOnly',
+))
+# Keywords which constrain only keys or length of the value, or constrain its members by subschemas.
+LAZY_KEYWORDS = frozenset((
+    'type', 'properties', 'patternProperties', 'additionalProperties', 'required', 'minProperties',
+    'maxProperties', 'propertyNames', 'dependencies', 'items', 'additionalItems', 'minItems', 'maxItems',
+))
+
+WHITESPACE_CHARACTERS = ('', ' ', '\t', '\n', '\r')
+BRACKET = re.compile(r'[\[\]{}]')
+CLOSING_BRACKETS = {'[': ']', '{': '}'}
+OPENING_TO_CLOSING = str.maketrans(CLOSING_BRACKETS)
+MATCH_BRACKETS_PASSES = 8
+# Skipped object or array is parsed instead when it has more quotes in the first characters.
+SKIP_WINDOW = 4096
+SKIP_MAX_QUOTES = 4
+
+
+class LazyPlan:
+    """
+    Plan of lazy parsing of object or array with plans (``FULL``, ``SKIP`` or other
+    ``LazyPlan``) of its members by subschemas of ``properties``, ``items``, ...
+    """
+
+    def __init__(self, properties, patterns, additional, items, additional_items):
+        self.properties = properties
+        self.patterns = patterns
+        self.additional = additional
+        self.items = items
+        self.additional_items = additional_items
+
+    def member(self, key):
+        if not self.patterns:
+            return self.properties.get(key, self.additional)
+        plans = [plan for regex, plan in self.patterns if regex.search(key)]
+        if key in self.properties:
+            plans.append(self.properties[key])
+        elif not plans:
+            return self.additional
+        if all(plan is SKIP for plan in plans):
+            return SKIP
+        return plans[0] if len(plans) == 1 else FULL
+
+    def item(self, index):
+        if isinstance(self.items, list):
+            return self.items[index] if index < len(self.items) else self.additional_items
+        return self.items
+
+    def plans(self):
+        yield from self.properties.values()
+        yield from (plan for _, plan in self.patterns)
+        yield self.additional
+        yield from (self.items if isinstance(self.items, list) else [self.items])
+        yield self.additional_items
+
+
+def lazy_plan(definition, root=None, resolving=()):
+    """
+    Returns plan of lazy parsing of values valid by ``definition``. Values of subschemas
+    which do not constrain anything are skipped, objects and arrays constrained only by
+    keywords which do not look at values of members are parsed member by member, anything
+    else is parsed at once. Only local references (``#/...``) are followed.
+    """
+    if root is None:
+        root = definition
+    elif isinstance(definition, dict) and isinstance(definition.get('$id', definition.get('id')), str):
+        # References inside are relative to another document.
+        return FULL
+    if definition is True or isinstance(definition, dict) and definition.keys() <= NOT_VALIDATING_KEYWORDS:
+        return SKIP
+    if not isinstance(definition, dict):
+        return FULL
+    if '$ref' in definition:
+        ref = definition['$ref']
+        if not isinstance(ref, str) or not ref.startswith('#') or ref in resolving:
+            return FULL
+        try:
+            target = resolve_pointer(root, ref[1:])
+        except (KeyError, IndexError, ValueError, TypeError):
+            return FULL
+        return lazy_plan(target, root, resolving + (ref,))
+    keywords = definition.keys() - NOT_VALIDATING_KEYWORDS - {'$id', 'id'}
+    types = definition.get('type', ['object', 'array'])
+    if isinstance(types, str):
+        types = [types]
+    if keywords - LAZY_KEYWORDS or not {'object', 'array'} & set(types):
+        return FULL
+    dependencies = definition.get('dependencies', {})
+    if not isinstance(dependencies, dict) or not all(isinstance(value, list) for value in dependencies.values()):
+        return FULL
+    plan = LazyPlan({}, [], FULL, FULL, FULL)
+    if 'object' in types:
+        plan.properties = {
+            key: lazy_plan(value, root, resolving) for key, value in definition.get('properties', {}).items()
+        }
+        plan.patterns = [
+            (re.compile(pattern), lazy_plan(value, root, resolving))
+            for pattern, value in definition.get('patternProperties', {}).items()
+        ]
+        plan.additional = lazy_plan(definition.get('additionalProperties', True), root, resolving)
+    if 'array' in types:
+        items = definition.get('items', True)
+        if isinstance(items, list):
+            plan.items = [lazy_plan(value, root, resolving) for value in items]
+            plan.additional_items = lazy_plan(definition.get('additionalItems', True), root, resolving)
+        else:
+            plan.items = lazy_plan(items, root, resolving)
+    if all(member is FULL for member in plan.plans()):
+        return FULL
+    return plan
+
+
+def resolve_pointer(document, ref):
+    for part in ref.split('/')[1:]:
+        part = unquote(part).replace('~1', '/').replace('~0', '~')
+        document = document[int(part)] if isinstance(document, list) else document[part]
+    return document
+
+
+def skip_value(body, index, scan):
+    """
+    Returns index after value starting on ``index`` without creating it. Skipped strings,
+    objects and arrays are checked only for ends of strings and matching brackets.
+    """
+    char = body[index:index + 1]
+    if char == '"':
+        return string_end(body, index)
+    if char not in ('[', '{'):
+        try:
+            return scan(body, index)[1]
+        except StopIteration as error:
+            raise json.JSONDecodeError('Expecting value', body, error.value) from None
+    # Short strings are parsed by C scanner faster than skipped in Python, the value is
+    # thrown away right away, so at least it does not take memory.
+    if body.count('"', index, index + SKIP_WINDOW) > SKIP_MAX_QUOTES:
+        try:
+            return scan(body, index)[1]
+        except StopIteration as error:
+            raise json.JSONDecodeError('Expecting value', body, error.value) from None
+    # Closing brackets expected by the open objects and arrays, innermost last.
+    closing = []
+    position = index
+    while True:
+        string_start = body.find('"', position)
+        stop = len(body) if string_start < 0 else string_start
+        closes = body.count(']', position, stop) + body.count('}', position, stop)
+        # Text between strings which cannot close the value is matched at once, which is
+        # much faster than going through its brackets one by one in Python.
+        if closes >= len(closing) or not match_brackets(closing, BRACKET.findall(body, position, stop)):
+            for match in BRACKET.finditer(body, position, stop):
+                bracket = match.group()
+                if bracket in '[{':
+                    closing.append(CLOSING_BRACKETS[bracket])
+                elif closing.pop() != bracket:
+                    raise json.JSONDecodeError("Expecting ',' delimiter", body, match.start())
+                if not closing:
+                    return match.end()
+        if string_start < 0:
+            raise json.JSONDecodeError("Expecting ',' delimiter", body, len(body))
+        position = string_end(body, string_start)
+
+
+def match_brackets(closing, brackets):
+    """
+    Updates ``closing`` brackets expected by open containers by ``brackets`` which do
+    not close all of them. Returns false, with ``closing`` untouched, when some bracket
+    does not match.
+    """
+    brackets = ''.join(brackets)
+    # Pairs next to each other match, what remains are closing brackets of containers
+    # opened before and then opening brackets of new containers. Deeply nested brackets
+    # are left to the caller, each pass removes only one level.
+    for _ in range(MATCH_BRACKETS_PASSES):
+        if '[]' not in brackets and '{}' not in brackets:
+            break
+        brackets = brackets.replace('[]', '').replace('{}', '')
+    else:
+        return False
+    opening = brackets.lstrip(']}')
+    if ']' in opening or '}' in opening:
+        return False
+    count = len(brackets) - len(opening)
+    start = len(closing) - count
+    if ''.join(reversed(closing[start:])) != brackets[:count]:
+        return False
+    del closing[start:]
+    closing.extend(opening.translate(OPENING_TO_CLOSING))
+    return True
+
+
+def string_end(body, index):
+    end = body.find('"', index + 1)
+    while end > 0 and body[end - 1] == '\\':
+        # Quote is escaped by odd number of backslashes.
+        backslash = end - 1
+        while body[backslash - 1] == '\\':
+            backslash -= 1
+        if (end - backslash) % 2 == 0:
+            break
+        end = body.find('"', end + 1)
+    if end < 0:
+        raise json.JSONDecodeError('Unterminated string starting at', body, index)
+    return end + 1
+
+
+class Unparsed:
+    """
+    Value of a subtree not constrained by the schema, which was skipped by lazy parsing
+    (see ``compile_json``). It keeps only its position in the document.
+    """
+
+    __slots__ = ('document', 'start', 'end')
+
+    def __init__(self, document, start, end):
+        self.document = document
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        if self.end - self.start <= 60:
+            return 'Unparsed({!r})'.format(self.text)
+        return 'Unparsed({!r})'.format(self.document[self.start:self.start + 57] + '...')
+
+    @property
+    def text(self):
+        return self.document[self.start:self.end]
+
+    def load(self):
+        """
+        Returns the value parsed by ``json.loads``.
+        """
+        return json.loads(self.text)
+
+
+def duplicate_key_exception(error):
+    # Objects are created from the innermost, so the path is not known.
+    return JsonSchemaValidationException(
+        'must not contain duplicate key {}'.format(error.key), value=error.value, definition=None,
+        rule='duplicateKeys', path=[], root_object=error.value,
+    )
+
+
+class JsonValidator:
+    """
+    Function validating JSON document given as string or bytes, created by ``compile_json``.
+    Functions validating members are called with positional arguments like from generated
+    code, the whole document is validated by ``validate`` (function called by the user).
+    """
+
+    def __init__(self, validate, functions, mode, duplicate_keys, prefix_size, plan=FULL):
+        self._validate = validate
+        self._plan = plan
+        self._mode = mode
+        self._properties = functions.get('properties', {})
+        self._patterns = [
+            (re.compile(pattern), function) for pattern, function in functions.get('patternProperties', {}).items()
+        ]
+        self._additional_properties = functions.get('additionalProperties')
+        self._items = functions.get('items')
+        self._additional_items = functions.get('additionalItems')
+        self.duplicate_keys = duplicate_keys
+        self._prefix_size = prefix_size
+        # Keys of lazily parsed objects are shared like by ``json`` module.
+        self._keys = {}
+        self._decoder = json.JSONDecoder(object_pairs_hook=dict_without_duplicates if duplicate_keys else None)
+        self._split_objects = bool(self._properties or self._patterns or self._additional_properties)
+        self._split_arrays = self._items is not None
+
+    def __call__(self, body, *, special_fields_extractor=None):
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode(json.detect_encoding(body), 'surrogatepass')
+        try:
+            index = WHITESPACE.match(body, 0).end()
+            if self._plan is not FULL:
+                data, index = self._scan_lazy(body, index)
+            elif len(body) <= self._prefix_size:
+                # Small document is parsed at once, nothing to save by rejecting it early.
+                data, index = self.scan(body, index)
+            elif self._split_objects and body.startswith('{', index):
+                data, index = self._parse_object(body, index + 1, special_fields_extractor)
+            elif self._split_arrays and body.startswith('[', index):
+                data, index = self._parse_array(body, index + 1, special_fields_extractor)
+            else:
+                data, index = self.scan(body, index)
+        except InvalidMember:
+            return False
+        except DuplicateKey as error:
+            if self._mode == 'bool':
+                return False
+            raise duplicate_key_exception(error) from None
+        index = WHITESPACE.match(body, index).end()
+        if index != len(body):
+            raise json.JSONDecodeError('Extra data', body, index)
+        if self._mode == 'bool':
+            return self._validate(data)
+        return self._validate(data, special_fields_extractor=special_fields_extractor)
+
+    def scan(self, body, index):
+        """
+        Returns value starting on ``index`` of ``body`` and index after it.
+        """
+        try:
+            return self._decoder.scan_once(body, index)
+        except StopIteration as error:
+            raise json.JSONDecodeError('Expecting value', body, error.value) from None
+
+    def _scan_lazy(self, body, index):
+        try:
+            return self._parse_lazy(self._plan, body, index)
+        except StopIteration as error:
+            raise json.JSONDecodeError('Expecting value', body, error.value) from None
+
+    def _scan_rest(self, body, index, opening):
+        """
+        Returns remaining members of the container which continues by a comma on ``index``
+        parsed at once, as a container of the same type, and index after the container.
+        """
+        rest = opening + body[index + 1:]
+        try:
+            value, end = self._decoder.scan_once(rest, 0)
+        except StopIteration as error:
+            raise json.JSONDecodeError('Expecting value', body, error.value + index) from None
+        except json.JSONDecodeError as error:
+            raise json.JSONDecodeError(error.msg, body, error.pos + index) from None
+        return value, end + index
+
+    def _item_function(self, index):
+        if isinstance(self._items, list):
+            return self._items[index] if index < len(self._items) else self._additional_items
+        return self._items
+
+    def _property_functions(self, key):
+        """
+        Same as generated code: value is valid by definition of the property, by all
+        matching patterns and by ``additionalProperties`` when nothing else matched.
+        """
+        functions = [function for regex, function in self._patterns if regex.search(key)]
+        if key in self._properties:
+            functions.append(self._properties[key])
+        elif not functions and self._additional_properties is not None:
+            functions.append(self._additional_properties)
+        return functions
+
+    def _parse_object(self, body, index, special_fields_extractor):
+        data = {}
+        match = WHITESPACE.match
+        prefix_end = index + self._prefix_size
+        index = match(body, index).end()
+        if body[index:index + 1] == '}':
+            return data, index + 1
+        while True:
+            if body[index:index + 1] != '"':
+                raise json.JSONDecodeError('Expecting property name enclosed in double quotes', body, index)
+            key, index = scanstring(body, index + 1)
+            index = match(body, index).end()
+            if body[index:index + 1] != ':':
+                raise json.JSONDecodeError("Expecting ':' delimiter", body, index)
+            value, index = self.scan(body, match(body, index + 1).end())
+            if self.duplicate_keys and key in data:
+                raise DuplicateKey(key, data)
+            data[key] = value
+            for function in self._property_functions(key):
+                self._check(function, value, data, key, special_fields_extractor)
+            index = match(body, index).end()
+            char = body[index:index + 1]
+            if char == '}':
+                return data, index + 1
+            if char != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", body, index)
+            if index >= prefix_end:
+                rest, index = self._scan_rest(body, index, '{')
+                if self.duplicate_keys and not data.keys().isdisjoint(rest):
+                    raise DuplicateKey(next(key for key in rest if key in data), data)
+                data.update(rest)
+                return data, index
+            index = match(body, index + 1).end()
+
+    def _parse_array(self, body, index, special_fields_extractor):
+        data = []
+        match = WHITESPACE.match
+        prefix_end = index + self._prefix_size
+        index = match(body, index).end()
+        if body[index:index + 1] == ']':
+            return data, index + 1
+        while True:
+            value, index = self.scan(body, index)
+            data.append(value)
+            function = self._item_function(len(data) - 1)
+            if function is not None:
+                self._check(function, value, data, len(data) - 1, special_fields_extractor)
+            index = match(body, index).end()
+            char = body[index:index + 1]
+            if char == ']':
+                return data, index + 1
+            if char != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", body, index)
+            if index >= prefix_end:
+                rest, index = self._scan_rest(body, index, '[')
+                data.extend(rest)
+                return data, index
+            index = match(body, index + 1).end()
+
+    def _parse_lazy(self, plan, body, index):
+        """
+        Parses value starting on ``index`` by ``plan`` (see :any:`lazy_plan`). Members parsed
+        at once are the most common, so those are parsed directly in the loop.
+        """
+        char = body[index:index + 1]
+        if plan is SKIP and char in ('"', '[', '{'):
+            end = skip_value(body, index, self._decoder.scan_once)
+            return Unparsed(body, index, end), end
+        scan = self._decoder.scan_once
+        if plan is FULL or plan is SKIP or char not in ('[', '{'):
+            return scan(body, index)
+        data = {} if char == '{' else []
+        closing = ']}'[char == '{']
+        properties = None if plan.patterns else plan.properties
+        match = WHITESPACE.match
+        index = match(body, index + 1).end()
+        if body[index:index + 1] == closing:
+            return data, index + 1
+        while True:
+            if char == '{':
+                if body[index:index + 1] != '"':
+                    raise json.JSONDecodeError('Expecting property name enclosed in double quotes', body, index)
+                key, index = scanstring(body, index + 1)
+                key = self._keys.setdefault(key, key)
+                if body[index:index + 1] != ':':
+                    index = match(body, index).end()
+                    if body[index:index + 1] != ':':
+                        raise json.JSONDecodeError("Expecting ':' delimiter", body, index)
+                index += 1
+                if body[index:index + 1] in WHITESPACE_CHARACTERS:
+                    index = match(body, index).end()
+                member = plan.member(key) if properties is None else properties.get(key, plan.additional)
+                if member is FULL:
+                    value, index = scan(body, index)
+                else:
+                    value, index = self._parse_lazy(member, body, index)
+                if self.duplicate_keys and key in data:
+                    raise DuplicateKey(key, data)
+                data[key] = value
+            else:
+                value, index = self._parse_lazy(plan.item(len(data)), body, index)
+                data.append(value)
+            if body[index:index + 1] in WHITESPACE_CHARACTERS:
+                index = match(body, index).end()
+            end = body[index:index + 1]
+            if end == closing:
+                return data, index + 1
+            if end != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", body, index)
+            index = match(body, index + 1).end()
+
+    def validate_member(self, key, value, data, special_fields_extractor):
+        """
+        Validates ``value`` of member ``key`` (index for arrays) of the top-level
+        value by its subschemas, ``data`` is used for rendering of paths.
+        """
+        if isinstance(key, int):
+            function = self._item_function(key)
+            functions = [] if function is None else [function]
+        else:
+            functions = self._property_functions(key)
+        for function in functions:
+            self._check(function, value, data, key, special_fields_extractor)
+
+    def _check(self, function, value, data, key, special_fields_extractor):
+        if self._mode == 'bool':
+            if not function(value):
+                raise InvalidMember()
+        else:
+            function(value, data, [key], special_fields_extractor)
+
+
+# Keywords which need the whole top-level value, not only its keys or length.
+WHOLE_VALUE_KEYWORDS = (
+    '$ref', 'enum', 'const', 'allOf', 'anyOf', 'oneOf', 'not', 'if', 'uniqueItems', 'contains', 'format',
+)
+
+# Errors further than this from the end of parsed text can not be caused by missing rest
+# of a value (the longest one is partial ``-Infinity``).
+INCOMPLETE_MARGIN = 32
+
+
+def end_definition(definition):
+    """
+    Returns definition of the top-level value validated when the whole document is parsed,
+    without subschemas of members, which are validated one by one. It validates only keys
+    of objects (``required``, ``additionalProperties: false``, ``propertyNames``, ...) and
+    lengths of arrays (``minItems``, ``maxItems``, ...).
+    """
+    if not isinstance(definition, dict):
+        return definition
+    keywords = [keyword for keyword in WHOLE_VALUE_KEYWORDS if keyword in definition]
+    dependencies = definition.get('dependencies')
+    if isinstance(dependencies, dict) and not all(isinstance(value, list) for value in dependencies.values()):
+        keywords.append('dependencies')
+    if keywords:
+        raise JsonSchemaDefinitionException(
+            'Can not validate {} of the top-level value incrementally'.format(', '.join(keywords)),
+        )
+    end = dict(definition)
+    for keyword in ('properties', 'patternProperties'):
+        if isinstance(end.get(keyword), dict):
+            end[keyword] = {key: {} for key in end[keyword]}
+    if end.get('additionalProperties') is not False:
+        end.pop('additionalProperties', None)
+    if isinstance(end.get('items'), list):
+        end['items'] = [{} for _ in end['items']]
+        if end.get('additionalItems') is not False:
+            end.pop('additionalItems', None)
+    elif end.get('items') is not False:
+        end.pop('items', None)
+        end.pop('additionalItems', None)
+    return end
+
+
+class IncrementalValidator:
+    """
+    Function validating JSON document given in chunks, created by ``compile_incremental``.
+    Members of the top-level array or object are validated by ``members`` (see
+    :any:`JsonValidator`) as soon as they are parsed and then thrown away, keys and length
+    of the top-level value are validated by ``validate_end`` at the end.
+    """
+
+    def __init__(self, members, validate_end, definition, mode):
+        self.members = members
+        self.mode = mode
+        self._validate_end = validate_end
+        # Length limits do not say the length, so longer arrays fail the same as this one.
+        limits = [0]
+        if isinstance(definition, dict):
+            limits += [definition[keyword] for keyword in ('minItems', 'maxItems') if keyword in definition]
+            if isinstance(definition.get('items'), list):
+                limits.append(len(definition['items']))
+        self._max_length = max(limits) + 1
+
+    def __call__(self, source, *, special_fields_extractor=None, chunk_size=1 << 20):
+        """
+        Validates document from file-like object (read by ``chunk_size``) or iterable of
+        chunks, see :any:`PushParser.close` for the result.
+        """
+        parser = self.parser(special_fields_extractor=special_fields_extractor)
+        chunks = source
+        if hasattr(source, 'read'):
+            chunks = iter(lambda: source.read(chunk_size), source.read(0))
+        for chunk in chunks:
+            parser.feed(chunk)
+            if parser.finished:
+                break
+        return parser.close()
+
+    def parser(self, *, special_fields_extractor=None):
+        """
+        Returns new :any:`PushParser` for one document.
+        """
+        return PushParser(self, special_fields_extractor)
+
+    def validate_top_level(self, container, length, keys, special_fields_extractor):
+        """
+        Validates keys of the top-level object (``container`` is ``{``) or ``length``
+        of the top-level array (``[``) once the whole document is parsed.
+        """
+        if container == '[':
+            data = [None] * min(length, self._max_length)
+        else:
+            data = dict.fromkeys(keys)
+        if self.mode == 'bool':
+            return self._validate_end(data)
+        self._validate_end(data, special_fields_extractor=special_fields_extractor)
+        return True
+
+
+class Member:
+    """
+    Stands for the top-level value in paths of errors, only the member is kept.
+    """
+
+    __slots__ = ('key', 'value')
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+    def __getitem__(self, key):
+        if key != self.key:
+            raise KeyError(key)
+        return self.value
+
+
+class PushParser:
+    """
+    Parses JSON document given by chunks of string or bytes passed to ``feed`` and
+    validates members of the top-level array or object as soon as they are complete.
+    Only the unparsed rest of the document is kept, so memory is bounded by the size of
+    the biggest member (and keys of the top-level object). Other top-level values are
+    kept and validated at once by ``close``.
+
+    In exception mode the first error is raised by ``feed`` or ``close``, in bool mode
+    ``close`` returns ``False`` and ``finished`` tells that the rest can be skipped.
+    Malformed document raises ``json.JSONDecodeError`` with position in the whole document.
+    """
+
+    def __init__(self, validator, special_fields_extractor):
+        self._validator = validator
+        self._members = validator.members
+        self._special_fields_extractor = special_fields_extractor
+        self._expect = 'start'
+        self._container = None
+        self._length = 0
+        self._keys = {}
+        self._chunks = []
+        self._pending = 0
+        self._retry = 0
+        self._raw = b''
+        self._decoder = None
+        self._offset = 0
+        self._lineno = 1
+        self._line_start = 0
+        self._valid = True
+
+    @property
+    def finished(self):
+        """
+        True when document is known to be invalid (in bool mode) or was already closed.
+        """
+        return self._expect == 'done'
+
+    def feed(self, chunk):
+        """
+        Parses next chunk of the document, string or bytes in any encoding of JSON.
+        """
+        if self._expect == 'done':
+            return
+        text = self._decode(chunk, final=False)
+        if text:
+            self._chunks.append(text)
+            self._pending += len(text)
+            # Incomplete member is parsed again only when its text doubled since the last
+            # attempt, so parsing of a member sent in many chunks is still linear.
+            if self._pending >= self._retry and self._expect != 'scalar':
+                self._run(final=False)
+
+    def close(self):
+        """
+        Finishes parsing and returns ``True`` for valid document (``False`` in bool mode
+        for invalid one).
+        """
+        if self._expect == 'done':
+            return self._valid
+        text = self._decode(b'', final=True)
+        if text:
+            self._chunks.append(text)
+        self._run(final=True)
+        if self._expect == 'done':
+            return self._valid
+        self._expect = 'done'
+        if self._container is None:
+            result = self._members(''.join(self._chunks), special_fields_extractor=self._special_fields_extractor)
+            return result if self._validator.mode == 'bool' else True
+        return self._validator.validate_top_level(
+            self._container, self._length, self._keys, self._special_fields_extractor,
+        )
+
+    def _decode(self, chunk, final):
+        if isinstance(chunk, str):
+            return chunk
+        if self._decoder is None:
+            self._raw += chunk
+            # Encoding is detected from the first four bytes.
+            if len(self._raw) < 4 and not final:
+                return ''
+            self._decoder = codecs.getincrementaldecoder(json.detect_encoding(self._raw))('surrogatepass')
+            chunk, self._raw = self._raw, b''
+        return self._decoder.decode(chunk, final)
+
+    def _run(self, final):
+        try:
+            self._process(final)
+        except InvalidMember:
+            self._expect = 'done'
+            self._valid = False
+        except DuplicateKey as error:
+            self._expect = 'done'
+            self._valid = False
+            if self._validator.mode != 'bool':
+                raise duplicate_key_exception(error) from None
+        except Exception:
+            self._expect = 'done'
+            self._valid = False
+            raise
+
+    def _process(self, final):
+        buffer = ''.join(self._chunks)
+        match = WHITESPACE.match
+        index = 0
+        self._retry = 0
+        while self._expect != 'scalar':
+            index = match(buffer, index).end()
+            if index == len(buffer):
+                if final and self._expect != 'end':
+                    raise self._error(self._missing(), buffer, index)
+                break
+            char = buffer[index]
+            if self._expect == 'start':
+                if char in '[{':
+                    self._container = char
+                    self._expect = 'first'
+                    index += 1
+                else:
+                    self._expect = 'scalar'
+            elif self._expect == 'end':
+                raise self._error('Extra data', buffer, index)
+            elif self._expect == 'delimiter':
+                if char == ',':
+                    self._expect = 'member'
+                    index += 1
+                elif char == ']}'[self._container == '{']:
+                    self._expect = 'end'
+                    index += 1
+                else:
+                    raise self._error("Expecting ',' delimiter", buffer, index)
+            elif self._expect == 'first' and char == ']}'[self._container == '{']:
+                self._expect = 'end'
+                index += 1
+            else:
+                end = self._member(buffer, index, final)
+                if end is None:
+                    self._retry = 2 * (len(buffer) - index)
+                    break
+                self._expect = 'delimiter'
+                index = end
+        if self._expect != 'scalar':
+            self._consume(buffer, index)
+
+    def _missing(self):
+        if self._expect == 'delimiter':
+            return "Expecting ',' delimiter"
+        if self._container == '{':
+            return 'Expecting property name enclosed in double quotes'
+        return 'Expecting value'
+
+    def _member(self, buffer, index, final):
+        """
+        Parses and validates member starting on ``index`` and returns index after it,
+        or ``None`` when the member continues in chunks not fed yet.
+        """
+        try:
+            if self._container == '{':
+                if buffer[index] != '"':
+                    raise json.JSONDecodeError('Expecting property name enclosed in double quotes', buffer, index)
+                key, index = scanstring(buffer, index + 1)
+                index = WHITESPACE.match(buffer, index).end()
+                if buffer[index:index + 1] != ':':
+                    raise json.JSONDecodeError("Expecting ':' delimiter", buffer, index)
+                index = WHITESPACE.match(buffer, index + 1).end()
+            value, end = self._members.scan(buffer, index)
+        except json.JSONDecodeError as error:
+            message, position = error.msg, error.pos
+        else:
+            # Number at the end can continue in the next chunk.
+            if end == len(buffer) and not final:
+                return None
+            self._validate_member(key if self._container == '{' else None, value)
+            return end
+        if final or (position + INCOMPLETE_MARGIN < len(buffer) and not message.startswith('Unterminated string')):
+            raise self._error(message, buffer, position)
+        return None
+
+    def _validate_member(self, key, value):
+        if self._container == '[':
+            key = self._length
+            self._length += 1
+        else:
+            if self._members.duplicate_keys and key in self._keys:
+                raise DuplicateKey(key, {key: value})
+            self._keys[key] = None
+        self._members.validate_member(key, value, Member(key, value), self._special_fields_extractor)
+
+    def _consume(self, buffer, index):
+        newlines = buffer.count('\n', 0, index)
+        if newlines:
+            self._lineno += newlines
+            self._line_start = self._offset + buffer.rindex('\n', 0, index) + 1
+        self._offset += index
+        rest = buffer[index:]
+        self._chunks = [rest] if rest else []
+        self._pending = len(rest)
+
+    def _error(self, message, buffer, index):
+        """
+        Returns error like from ``json.loads`` with position in the whole document.
+        """
+        position = self._offset + index
+        newlines = buffer.count('\n', 0, index)
+        lineno = self._lineno + newlines
+        if newlines:
+            colno = index - buffer.rindex('\n', 0, index)
+        else:
+            colno = position - self._line_start + 1
+        error = json.JSONDecodeError(message, buffer, index)
+        error.pos, error.lineno, error.colno = position, lineno, colno
+        error.args = ('%s: line %d column %d (char %d)' % (message, lineno, colno, position),)
+        return error
@@ -0,0 +1,107 @@
+"""
+Validation of batches of documents by worker processes from asyncio
+
+Documents are sent to worker processes in chunks and validated there by the batch
+function (see ``compile(definition, batch=True)``). Workers get the generated code only
+once when they start and they are reused by all batches until the pool is closed. Only
+a limited number of chunks is in flight at once, so a big (or endless) iterable of
+documents is not turned into a queue of pickled chunks. Batches too small to be worth
+sending anywhere are validated in the calling process.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+
+from .stream import call_in_worker, chunks, init_worker, load_function
+
+
+def _validate_documents(validate_many, task):
+    """
+    Returns failures of ``documents`` with indices counted from ``start``.
+    """
+    start, documents = task
+    return [(index + start, error) for index, error in validate_many(documents)]
+
+
+class ValidatorPool:
+    """
+    Validates batches of documents by ``workers`` processes. Created by
+    ``compile_pool(definition)``. Pool of processes is started by the first batch
+    which is not validated in place and it is stopped by `aclose` (or at the end
+    of ``async with`` block) or by `close` outside of event loop.
+    """
+
+    def __init__(self, code, name, workers, chunk_size, in_flight, inline_size):
+        self._code = code
+        self._name = name
+        self._validate_many = load_function(code, name)
+        self._executor = None
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.in_flight = in_flight
+        self.inline_size = inline_size
+
+    async def validate_many_async(self, documents):
+        """
+        Yields failures of ``documents`` (any iterable) in their order, same as the batch
+        function: pairs of index and the exception (list of errors in ``collect`` mode,
+        ``None`` in ``bool`` mode). Exceptions are created in the workers, so their path is
+        rendered already.
+        """
+        documents = iter(documents)
+        head = list(itertools.islice(documents, self.inline_size + 1))
+        if len(head) <= self.inline_size:
+            for failure in self._validate_many(head):
+                yield failure
+            return
+        executor = self._start()
+        pending = collections.deque()
+        start = 0
+        try:
+            for chunk in chunks(itertools.chain(head, documents), self.chunk_size):
+                task = (start, chunk)
+                pending.append(asyncio.wrap_future(executor.submit(call_in_worker, _validate_documents, task)))
+                start += len(chunk)
+                if len(pending) >= self.in_flight:
+                    for failure in await pending.popleft():
+                        yield failure
+            while pending:
+                for failure in await pending.popleft():
+                    yield failure
+        finally:
+            # Consumer can stop early, chunks not yet validated are not needed.
+            for future in pending:
+                future.cancel()
+
+    def _start(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=init_worker, initargs=(self._code, self._name),
+            )
+        return self._executor
+
+    def close(self):
+        """
+        Stops worker processes. Pool can be used again, new processes are then started.
+        It waits for the processes, so from event loop use `aclose`.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def aclose(self):
+        """
+        Stops worker processes like `close`, but waits for them without blocking
+        the event loop.
+        """
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,174 @@
+"""
+Profile-guided ordering of generated checks
+
+Validation function compiled with ``instrument=profile`` records into the `Profile` how
+often each subschema was validated, which of its keywords failed and which ``anyOf``
+branches matched. Function compiled with ``profile=profile`` then tries the most often
+matching ``anyOf`` branches first and checks the most often failing keywords first, so
+both valid and invalid data of the recorded kind are validated faster. Objects which
+almost always have the same set of keys get a fast path specialized for that shape.
+
+Subschemas are identified by the hash of their content, so the profile can be recorded
+with one compiled function and used by another one compiled from the same schema.
+"""
+
+import hashlib
+import json
+import threading
+
+
+def site_key(definition):
+    """
+    Returns key identifying subschema ``definition`` in the `Profile`.
+    """
+    content = json.dumps(definition, sort_keys=True, default=repr)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+class Profile:
+    """
+    Statistics recorded by instrumented validation function. Example:
+
+    .. code-block:: python
+
+        profile = fastjsonschema.Profile()
+        validate = fastjsonschema.compile(definition, instrument=profile)
+        for data in sample:
+            try:
+                validate(data)
+            except fastjsonschema.JsonSchemaValidationException:
+                pass
+
+        validate = fastjsonschema.compile(definition, profile=profile)
+
+    Profile can be stored as JSON using `as_dict` and loaded by `from_dict`.
+    """
+
+    def __init__(self):
+        # Map of site key to number of validated values.
+        self.visits = {}
+        # Map of site key to map of rule to number of failures.
+        self.failures = {}
+        # Map of site key to map of anyOf branch index to number of matches.
+        self.any_of_hits = {}
+        # Map of site key to map of frozenset of object keys to number of such objects.
+        self.shapes = {}
+
+    def visit(self, site):
+        self.visits[site] = self.visits.get(site, 0) + 1
+
+    def fail(self, site, rule):
+        failures = self.failures.setdefault(site, {})
+        failures[rule] = failures.get(rule, 0) + 1
+
+    def hit(self, site, index):
+        hits = self.any_of_hits.setdefault(site, {})
+        hits[index] = hits.get(index, 0) + 1
+
+    def shape(self, site, keys):
+        shapes = self.shapes.setdefault(site, {})
+        keys = frozenset(keys)
+        shapes[keys] = shapes.get(keys, 0) + 1
+
+    def failure_rate(self, site, rule):
+        """
+        Returns how often ``rule`` failed at the ``site`` from 0 to 1. Unknown is 0.
+        """
+        visits = self.visits.get(site)
+        if not visits:
+            return 0
+        return self.failures.get(site, {}).get(rule, 0) / visits
+
+    def hit_rate(self, site, index):
+        """
+        Returns how often ``anyOf`` branch ``index`` matched at the ``site`` from 0 to 1.
+        Unknown is 0.
+        """
+        hits = self.any_of_hits.get(site)
+        if not hits:
+            return 0
+        return hits.get(index, 0) / sum(hits.values())
+
+    def dominant_shape(self, site, share):
+        """
+        Returns the most common set of keys of objects at the ``site`` if it was at least
+        ``share`` (from 0 to 1) of all objects there, otherwise None.
+        """
+        shapes = self.shapes.get(site)
+        if not shapes:
+            return None
+        keys, count = max(shapes.items(), key=lambda item: (item[1], sorted(item[0])))
+        if count < share * sum(shapes.values()):
+            return None
+        return keys
+
+    def as_dict(self):
+        return {
+            'visits': dict(self.visits),
+            'failures': {site: dict(rules) for site, rules in self.failures.items()},
+            'any_of_hits': {
+                site: {str(index): count for index, count in hits.items()} for site, hits in self.any_of_hits.items()
+            },
+            'shapes': {
+                site: [[sorted(keys), count] for keys, count in shapes.items()] for site, shapes in self.shapes.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        profile.visits = dict(data.get('visits', {}))
+        profile.failures = {site: dict(rules) for site, rules in data.get('failures', {}).items()}
+        profile.any_of_hits = {
+            site: {int(index): count for index, count in hits.items()}
+            for site, hits in data.get('any_of_hits', {}).items()
+        }
+        profile.shapes = {
+            site: {frozenset(keys): count for keys, count in shapes}
+            for site, shapes in data.get('shapes', {}).items()
+        }
+        return profile
+
+
+class AdaptiveValidator:
+    """
+    Validation function which specializes itself to validated data. First ``calls`` calls
+    are validated by instrumented function recording the `Profile`, then the function is
+    compiled again with that profile. Created by ``compile(definition, adaptive=calls)``.
+
+    Validation function in use is available as `function`, calling it directly avoids
+    the small overhead of this wrapper once the specialization is done.
+
+    It can be shared by threads. Instrumented calls change counters of the profile, so
+    they are serialized by a lock until the specialized function is in place, then calls
+    are not locked at all.
+    """
+
+    def __init__(self, compile_function, calls):
+        self.profile = Profile()
+        self._compile_function = compile_function
+        self._remaining_calls = calls
+        self._lock = threading.Lock()
+        self.function = compile_function(instrument=self.profile)
+
+    @property
+    def specialized(self):
+        return not self._remaining_calls
+
+    def __call__(self, *args, **kwargs):
+        if self._remaining_calls:
+            with self._lock:
+                if self._remaining_calls:
+                    return self._instrumented_call(*args, **kwargs)
+        return self.function(*args, **kwargs)
+
+    def _instrumented_call(self, *args, **kwargs):
+        if self._remaining_calls > 1:
+            self._remaining_calls -= 1
+            return self.function(*args, **kwargs)
+        try:
+            return self.function(*args, **kwargs)
+        finally:
+            # Other threads skip the lock only once the specialized function is set.
+            self.function = self._compile_function(profile=self.profile)
+            self._remaining_calls = 0
@@ -0,0 +1,320 @@
+"""
+Parallel validation of streams of JSON documents
+
+Documents, one per line as in NDJSON, are sent to worker processes in chunks of raw
+lines, so both parsing and validation run in parallel. Each worker gets the generated
+code only once when it starts and validates the chunks by its batch function (see
+``compile(definition, batch=True)``). Results are reported in the order of lines and
+only few chunks are in flight at once, so memory does not depend on the size of the
+stream.
+
+Files are not read by the main process at all. They are split into byte ranges ending
+by a new line and each worker reads its range from the memory-mapped file.
+"""
+
+import collections
+import gzip
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import time
+
+from .exceptions import JsonSchemaLimitException
+
+
+Failure = collections.namedtuple('Failure', ('line', 'rule', 'path', 'message'))
+Failure.__doc__ = """
+Invalid document on ``line`` (numbered from 1). Documents which are not valid JSON
+are reported with rule ``json`` and empty ``path``, documents exceeding some limit
+(such as ``max_nodes``) with the name of the limit as rule and empty ``path``.
+"""
+
+# Chunks waiting for the result per worker.
+CHUNKS_IN_FLIGHT = 2
+
+# Batch validation function of the worker process, see `init_worker`.
+_worker_validate_many = None
+
+
+def load_function(code, name):
+    """
+    Returns function ``name`` defined by generated ``code``.
+    """
+    namespace = {'__name__': __name__}
+    exec(code, namespace)  # pylint: disable=exec-used
+    return namespace[name]
+
+
+def init_worker(code, name):
+    """
+    Initializer of worker process, loads function ``name`` defined by generated ``code``
+    once, so it is not sent with every task.
+    """
+    global _worker_validate_many  # pylint: disable=global-statement
+    _worker_validate_many = load_function(code, name)
+
+
+def call_in_worker(function, task):
+    """
+    Returns ``function(validate_many, task)`` called in worker process with the function
+    loaded by `init_worker`.
+    """
+    return function(_worker_validate_many, task)
+
+
+def validate_lines(validate_many, lines):
+    """
+    Returns number of documents and list of `Failure` of documents in ``lines`` (strings
+    or bytes) which are numbered from 1. Empty lines are skipped.
+    """
+    failures = []
+    documents = []
+    numbers = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            documents.append(json.loads(line))
+        except ValueError as error:
+            failures.append(Failure(number, 'json', [], str(error)))
+        else:
+            numbers.append(number)
+    invalid_json = len(failures)
+    for index, error in validate_many(documents):
+        if isinstance(error, JsonSchemaLimitException):
+            failures.append(Failure(numbers[index], error.limit, [], str(error)))
+        else:
+            failures.append(Failure(numbers[index], error.rule, error.path, str(error)))
+    failures.sort(key=lambda failure: failure.line)
+    return len(documents) + invalid_json, failures
+
+
+def chunks(source, chunk_size):
+    """
+    Yields lists of at most ``chunk_size`` lines of ``source``.
+    """
+    source = iter(source)
+    while True:
+        lines = list(itertools.islice(source, chunk_size))
+        if not lines:
+            return
+        yield lines
+
+
+def line_start(buffer, position):
+    """
+    Returns start of the first line of ``buffer`` starting at ``position`` or after it.
+    """
+    if position <= 0:
+        return 0
+    index = buffer.find(b'\n', position - 1)
+    return len(buffer) if index == -1 else index + 1
+
+
+def line_ranges(buffer, range_size, start=0, end=None):
+    """
+    Yields pairs of start and end of parts of ``buffer`` between ``start`` and ``end``
+    (start of a line) with about ``range_size`` bytes. Each part starts by a new line.
+    """
+    if end is None:
+        end = len(buffer)
+    while start < end:
+        range_end = min(line_start(buffer, start + range_size), end)
+        yield start, range_end
+        start = range_end
+
+
+def shard_range(buffer, shard, shards):
+    """
+    Returns start and end of part ``shard`` (from 0) of ``shards`` parts of ``buffer``
+    of about the same size. Parts start by a new line, so they are the same whenever
+    the data are the same, and together they cover all lines exactly once.
+    """
+    size = len(buffer)
+    return line_start(buffer, size * shard // shards), line_start(buffer, size * (shard + 1) // shards)
+
+
+def split_lines(data):
+    lines = data.split(b'\n')
+    if not lines[-1]:
+        # Data end by a new line.
+        lines.pop()
+    return lines
+
+
+def open_mmap(file):
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _validate_chunk(validate_many, lines):
+    documents, failures = validate_lines(validate_many, lines)
+    return len(lines), documents, failures
+
+
+def _validate_range(validate_many, task):
+    path, start, end = task
+    with open(path, 'rb') as file, open_mmap(file) as buffer:
+        lines = split_lines(buffer[start:end])
+    documents, failures = validate_lines(validate_many, lines)
+    return len(lines), documents, failures
+
+
+def ordered_results(code, name, function, tasks, workers):
+    """
+    Yields results of ``function(validate_many, task)`` for all ``tasks`` in their order,
+    where ``validate_many`` is batch function ``name`` defined in ``code``. With one worker
+    it is done in this process.
+    """
+    if workers == 1:
+        validate_many = load_function(code, name)
+        for task in tasks:
+            yield function(validate_many, task)
+        return
+    with multiprocessing.Pool(workers, init_worker, (code, name)) as pool:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(pool.apply_async(call_in_worker, (function, task)))
+            if len(pending) >= CHUNKS_IN_FLIGHT * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def collect_failures(results, stats=None):
+    """
+    Yields `Failure` from ``results`` of chunks with line numbers counted from the start
+    of the first chunk. Number of ``lines``, ``documents`` and ``failures`` is added
+    to ``stats`` at the end.
+    """
+    lines = documents = failures = 0
+    for chunk_lines, chunk_documents, chunk_failures in results:
+        for failure in chunk_failures:
+            yield failure._replace(line=failure.line + lines)
+        lines += chunk_lines
+        documents += chunk_documents
+        failures += len(chunk_failures)
+    if stats is not None:
+        stats.update(lines=lines, documents=documents, failures=failures)
+
+
+def validate_chunks(code, name, source, workers, chunk_size, stats=None):
+    """
+    Yields `Failure` of all invalid documents of iterable ``source`` validated by batch
+    function ``name`` defined in ``code``.
+    """
+    tasks = chunks(source, chunk_size)
+    yield from collect_failures(ordered_results(code, name, _validate_chunk, tasks, workers), stats)
+
+
+def validate_file(code, name, path, workers, chunk_size, range_size, stats=None):
+    """
+    Same as `validate_chunks` for NDJSON file on ``path``. Compressed files (``.gz``)
+    are read as a stream of lines, other files are split into ``range_size`` bytes long
+    ranges read by workers.
+    """
+    if str(path).endswith('.gz'):
+        with gzip.open(path, 'rb') as source:
+            yield from validate_chunks(code, name, source, workers, chunk_size, stats)
+        return
+    path = os.fspath(path)
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size:
+            with open_mmap(file) as buffer:
+                tasks = [(path, start, end) for start, end in line_ranges(buffer, range_size)]
+        else:
+            tasks = []
+    yield from collect_failures(ordered_results(code, name, _validate_range, tasks, workers), stats)
+
+
+def validate_file_shard(code, name, path, shard, shards, workers, range_size, samples):
+    """
+    Validates lines of part ``shard`` of ``shards`` parts of NDJSON file on ``path`` (see
+    `shard_range`) and returns report which can be stored as JSON and merged with reports
+    of other shards by `merge_reports`. Only first ``samples`` failures are kept and the limit
+    is stored as ``sample_limit``.
+    """
+    start_time = time.monotonic()
+    path = os.fspath(path)
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size:
+            with open_mmap(file) as buffer:
+                start, end = shard_range(buffer, shard, shards)
+                tasks = [
+                    (path, range_start, range_end)
+                    for range_start, range_end in line_ranges(buffer, range_size, start, end)
+                ]
+        else:
+            tasks = []
+    stats = {}
+    rules = {}
+    sampled = []
+    for failure in collect_failures(ordered_results(code, name, _validate_range, tasks, workers), stats):
+        rules[failure.rule] = rules.get(failure.rule, 0) + 1
+        if len(sampled) < samples:
+            sampled.append(dict(shard=shard, **failure._asdict()))
+    return {
+        'shards': shards,
+        'shard_lines': {str(shard): stats['lines']},
+        'documents': stats['documents'],
+        'failures': stats['failures'],
+        'rules': rules,
+        'samples': sampled,
+        'sample_limit': samples,
+        'seconds': time.monotonic() - start_time,
+    }
+
+
+def merge_reports(reports, samples=None):
+    """
+    Returns report of shards of all ``reports`` (see `validate_file_shard`), which can be
+    merged again. Lines of samples are relative to their shard, samples get also
+    ``file_line`` once the number of lines of all previous shards is known.
+
+    Only first ``samples`` failures in order of shards are kept, by default the largest
+    ``sample_limit`` of ``reports``, so merged report has as many samples as report
+    of a single shard and merging again does not grow it.
+    """
+    if not reports:
+        raise ValueError('Nothing to merge')
+    shards = reports[0]['shards']
+    if samples is None:
+        samples = max(report.get('sample_limit', len(report['samples'])) for report in reports)
+    merged = {
+        'shards': shards,
+        'shard_lines': {},
+        'documents': 0,
+        'failures': 0,
+        'rules': {},
+        'samples': [],
+        'sample_limit': samples,
+        'seconds': 0,
+    }
+    for report in reports:
+        if report['shards'] != shards:
+            raise ValueError('Reports of different number of shards')
+        if merged['shard_lines'].keys() & report['shard_lines'].keys():
+            raise ValueError('Reports of the same shard')
+        merged['shard_lines'].update(report['shard_lines'])
+        for key in ('documents', 'failures', 'seconds'):
+            merged[key] += report[key]
+        for rule, count in report['rules'].items():
+            merged['rules'][rule] = merged['rules'].get(rule, 0) + count
+        merged['samples'].extend(dict(sample) for sample in report['samples'])
+    merged['shard_lines'] = dict(sorted(merged['shard_lines'].items(), key=lambda item: int(item[0])))
+    merged['samples'].sort(key=lambda sample: (sample['shard'], sample['line']))
+    del merged['samples'][samples:]
+    # Number of lines before each shard whose all previous shards are merged.
+    first_lines = {}
+    lines = 0
+    for shard in range(shards):
+        first_lines[shard] = lines
+        if str(shard) not in merged['shard_lines']:
+            break
+        lines += merged['shard_lines'][str(shard)]
+    for sample in merged['samples']:
+        sample.pop('file_line', None)
+        if sample['shard'] in first_lines:
+            sample['file_line'] = first_lines[sample['shard']] + sample['line']
+    return merged
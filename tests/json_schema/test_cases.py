@@ -0,0 +1,25 @@
+import copy
+
+import pytest
+
+from .utils import template_test
+
+
+# Cases missing in JSON-Schema-Test-Suite on which generated code and closures disagreed.
+CASES = [
+    ({'properties': {'a': {}}, 'additionalProperties': {}}, {'a': 1, 'b': 2}, True),
+    ({'properties': {'a': {}}, 'additionalProperties': {}}, [], True),
+    ({'patternProperties': {'^x': {'type': 'integer'}}, 'additionalProperties': {}}, {'x': 1, 'y': 2}, True),
+    ({'patternProperties': {'^x': {'type': 'integer'}}, 'additionalProperties': {}}, {'x': 'a'}, False),
+    ({'required': ['a'], 'additionalProperties': {}}, {'b': 1}, False),
+]
+
+
+@pytest.mark.parametrize('schema_version', [
+    'http://json-schema.org/draft-04/schema',
+    'http://json-schema.org/draft-06/schema',
+    'http://json-schema.org/draft-07/schema',
+])
+@pytest.mark.parametrize('schema, data, is_valid', CASES)
+def test(schema_version, schema, data, is_valid):
+    template_test(schema_version, copy.deepcopy(schema), data, is_valid)
@@ -1,3 +1,4 @@
+import copy
 import json
 from pathlib import Path
 
@@ -77,6 +78,31 @@ def template_test(schema_version, schema, data, is_valid):
     if isinstance(schema, dict):
         schema.setdefault('$schema', schema_version)
 
+    # Predicate has to be checked first, because validation with exceptions applies defaults to data.
+    is_valid_predicate = compile(schema, handlers={'http': remotes_handler}, mode='bool')
+    assert is_valid_predicate(data) is is_valid
+
+    collect_errors = compile(schema, handlers={'http': remotes_handler}, mode='collect')
+    assert (not collect_errors(copy.deepcopy(data))) is is_valid
+
+    for mode in ('bool', 'collect'):
+        stack_validate = compile(schema, handlers={'http': remotes_handler}, mode=mode, recursion='stack')
+        assert (stack_validate(copy.deepcopy(data)) in (True, [])) is is_valid
+
+    is_valid_optimized = compile(schema, handlers={'http': remotes_handler}, mode='bool', optimize=True)
+    assert is_valid_optimized(data) is is_valid
+
+    is_valid_closures = compile(schema, handlers={'http': remotes_handler}, mode='bool', backend='closures')
+    assert is_valid_closures(data) is is_valid
+
+    validate_closures = compile(schema, handlers={'http': remotes_handler}, backend='closures')
+    try:
+        validate_closures(copy.deepcopy(data))
+    except JsonSchemaValidationException:
+        assert not is_valid
+    else:
+        assert is_valid
+
     validate = compile(schema, handlers={'http': remotes_handler})
     try:
         result = validate(data)
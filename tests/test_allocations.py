@@ -0,0 +1,110 @@
+import sys
+import tracemalloc
+
+import pytest
+
+from precisionlife_fastjsonschema import compile
+
+
+# Iterators and frames of the generated code are allocated for any data, but nothing
+# proportional to the size of the validated data.
+MAX_PEAK = 2000
+
+
+definitions = [
+    {
+        'type': 'object',
+        'properties': {'id': {'type': 'integer'}, 'name': {'type': 'string', 'maxLength': 10}},
+        'required': ['id', 'name'],
+        'patternProperties': {'^x-': {'type': 'number'}},
+        'additionalProperties': False,
+        'dependencies': {'name': ['id']},
+    },
+    {
+        'type': 'object',
+        'additionalProperties': {'type': 'integer', 'minimum': 0},
+        'propertyNames': {'maxLength': 10},
+    },
+    {
+        'type': 'array',
+        'items': [{'type': 'string'}, {'type': 'integer'}],
+        'additionalItems': {'type': 'integer'},
+        'minItems': 2,
+    },
+    {
+        'type': 'array',
+        'items': {'type': 'object', 'properties': {'a': {'enum': [1, 2]}}, 'required': ['a']},
+    },
+    {
+        'type': 'array',
+        'items': {'$ref': '#/definitions/node'},
+        'definitions': {
+            'node': {
+                'type': 'object',
+                'properties': {'id': {'type': 'integer'}, 'children': {'type': 'array', 'items': {'$ref': '#/definitions/node'}}},
+                'required': ['id'],
+            },
+        },
+    },
+    {
+        'type': 'array',
+        'items': {'anyOf': [{'type': 'string'}, {'type': 'object', 'properties': {'a': {'type': 'integer'}}}]},
+    },
+]
+
+tree_definition = definitions[4]['definitions']['node']
+
+
+def document(definition, size):
+    if definition['type'] == 'array':
+        if 'additionalItems' in definition:
+            return ['a'] + list(range(size))
+        if 'definitions' in definition:
+            return [{'id': 1, 'children': [{'id': 2}]}] * size
+        return [{'a': 1}] * size
+    if 'required' in definition:
+        return dict({'id': 1, 'name': 'a'}, **{'x-{}'.format(index): index for index in range(size)})
+    return {'k{}'.format(index): index for index in range(size)}
+
+
+def peak_allocation(validate, data):
+    validate(data)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        validate(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool'])
+@pytest.mark.parametrize('definition', definitions)
+def test_valid_data_does_not_allocate(definition, mode):
+    validate = compile(definition, mode=mode)
+    small = peak_allocation(validate, document(definition, 10))
+    large = peak_allocation(validate, document(definition, 1000))
+    assert large < MAX_PEAK
+    assert large <= small + 200
+
+
+def chain(depth):
+    node = {'id': 0}
+    for _ in range(depth):
+        node = {'id': 0, 'children': [node]}
+    return node
+
+
+def test_paths_of_references_are_not_allocated():
+    # Allocations of each call are freed right after it, so they do not show in the peak
+    # of flat data. Nested calls of referenced schemas keep paths of all parents, so lists
+    # of the whole path created for each call would make the peak quadratic by depth.
+    validate = compile(dict(tree_definition, definitions={'node': tree_definition}))
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 5000))
+    try:
+        small = peak_allocation(validate, chain(200))
+        large = peak_allocation(validate, chain(400))
+    finally:
+        sys.setrecursionlimit(limit)
+    assert large <= 2 * small + 200
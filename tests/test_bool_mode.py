@@ -0,0 +1,89 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+definition = {
+    '$schema': 'http://json-schema.org/draft-07/schema',
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer', 'minimum': 1},
+        'name': {'type': 'string', 'maxLength': 5},
+        'kind': {'anyOf': [{'const': 'a'}, {'$ref': '#/definitions/kind'}]},
+        'tags': {'type': 'array', 'items': {'type': 'string'}, 'contains': {'const': 'x'}},
+        'value': {'oneOf': [{'type': 'integer'}, {'type': 'number', 'minimum': 10}]},
+        'other': {'not': {'type': 'null'}},
+        'cond': {
+            'if': {'type': 'string'},
+            'then': {'minLength': 2},
+            'else': {'type': 'integer'},
+        },
+        'names': {'type': 'object', 'propertyNames': {'maxLength': 2}},
+        'default': {'type': 'integer', 'default': 42},
+    },
+    'required': ['id'],
+    'additionalProperties': False,
+    'definitions': {
+        'kind': {'enum': ['b', 'c']},
+    },
+}
+
+
+@pytest.mark.parametrize('value', [
+    None,
+    [],
+    {},
+    {'id': 1},
+    {'id': 0},
+    {'id': 1, 'name': 'abc'},
+    {'id': 1, 'name': 'abcdef'},
+    {'id': 1, 'kind': 'a'},
+    {'id': 1, 'kind': 'c'},
+    {'id': 1, 'kind': 'd'},
+    {'id': 1, 'tags': ['x', 'y']},
+    {'id': 1, 'tags': ['y']},
+    {'id': 1, 'tags': ['x', 1]},
+    {'id': 1, 'value': 1},
+    {'id': 1, 'value': 10.5},
+    {'id': 1, 'value': 1.5},
+    {'id': 1, 'value': 'a'},
+    {'id': 1, 'other': 1},
+    {'id': 1, 'other': None},
+    {'id': 1, 'cond': 'ab'},
+    {'id': 1, 'cond': 'a'},
+    {'id': 1, 'cond': 1},
+    {'id': 1, 'cond': 1.5},
+    {'id': 1, 'names': {'ab': 1}},
+    {'id': 1, 'names': {'abc': 1}},
+    {'id': 1, 'extra': 1},
+    {'name': 'abc', 'extra': 1},
+])
+def test_bool_mode_same_as_exception_mode(value):
+    validate = compile(definition)
+    is_valid = compile(definition, mode='bool')
+    try:
+        validate(value)
+    except JsonSchemaValidationException:
+        expected = False
+    else:
+        expected = True
+    assert is_valid(value) is expected
+
+
+def test_bool_mode_does_not_apply_defaults():
+    is_valid = compile(definition, mode='bool')
+    value = {'id': 1}
+    assert is_valid(value) is True
+    assert value == {'id': 1}
+
+
+def test_bool_mode_does_not_raise():
+    code = CodeGeneratorDraft07(definition, mode='bool').func_code
+    assert 'raise' not in code
+    assert 'try:' not in code
+
+
+def test_unknown_mode():
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile({'type': 'string'}, mode='unknown')
@@ -0,0 +1,109 @@
+import builtins
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaValidationException, compile
+
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string', 'minLength': 2, 'pattern': '^[a-z]+$'},
+        'tags': {'type': 'array', 'items': {'enum': ['a', 'b']}, 'uniqueItems': True},
+        'size': {'type': 'number', 'minimum': 0, 'exclusiveMaximum': 10, 'multipleOf': 0.5},
+        'kind': {'anyOf': [{'type': 'null'}, {'const': 'x'}]},
+    },
+    'required': ['name'],
+    'additionalProperties': False,
+}
+
+
+def error_of(validate, value):
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate(value)
+    error = exc.value
+    return error.message, error.rule, error.path, error.missing_fields, error.extra_fields
+
+
+@pytest.mark.parametrize('value', [
+    'abc',
+    {},
+    {'name': 'a'},
+    {'name': 'ab1'},
+    {'name': 'ab', 'tags': ['a', 'c']},
+    {'name': 'ab', 'tags': ['a', 'a']},
+    {'name': 'ab', 'size': -1},
+    {'name': 'ab', 'size': 10},
+    {'name': 'ab', 'size': 1.25},
+    {'name': 'ab', 'kind': 'y'},
+    {'name': 'ab', 'other': 1},
+    {'other': 1},
+])
+def test_same_errors_as_generated_code(value):
+    assert error_of(compile(DEFINITION, backend='closures'), value) == error_of(compile(DEFINITION), value)
+
+
+@pytest.mark.parametrize('value, valid', [
+    ({'name': 'ab'}, True),
+    ({'name': 'ab', 'tags': ['a', 'b'], 'size': 9.5, 'kind': None}, True),
+    ({'name': 'ab', 'size': 10}, False),
+    ([], False),
+])
+def test_bool_mode(value, valid):
+    assert compile(DEFINITION, mode='bool', backend='closures')(value) is valid
+
+
+def test_no_exec(monkeypatch):
+    def forbidden(*args, **kwargs):
+        raise AssertionError('exec used')
+    monkeypatch.setattr(builtins, 'exec', forbidden)
+    validate = compile(DEFINITION, backend='closures')
+    assert validate({'name': 'ab'}) == {'name': 'ab'}
+
+
+def test_defaults_are_not_shared():
+    validate = compile({'properties': {'a': {'default': {'b': []}}}, 'items': [{'default': 1}]}, backend='closures')
+    first = validate({})
+    first['a']['b'].append(1)
+    assert validate({}) == {'a': {'b': []}}
+    assert validate([]) == [1]
+
+
+def test_defaults_not_injected_in_bool_mode():
+    data = {}
+    assert compile({'properties': {'a': {'default': 1}}}, mode='bool', backend='closures')(data) is True
+    assert data == {}
+
+
+def test_recursive_reference():
+    validate = compile({
+        'type': 'object',
+        'properties': {'children': {'type': 'array', 'items': {'$ref': '#'}}},
+    }, backend='closures')
+    validate({'children': [{'children': []}]})
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate({'children': [{'children': [1]}]})
+    assert exc.value.path == ['children', 0, 'children', 0]
+
+
+def test_root_path_and_object():
+    validate = compile({'type': 'string'}, backend='closures')
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate(1, root_object={'x': [1]}, root_path=['x', 0])
+    assert str(exc.value) == 'data.x[0] must be string, but is a: int'
+
+
+@pytest.mark.parametrize('options', [
+    {'mode': 'collect'},
+    {'max_depth': 10},
+    {'recursion': 'stack'},
+    {'adaptive': 10},
+])
+def test_unsupported_options(options):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile({'type': 'string'}, backend='closures', **options)
+
+
+def test_unknown_backend():
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile({'type': 'string'}, backend='interpreter')
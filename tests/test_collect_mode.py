@@ -0,0 +1,82 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaValidationException, compile
+
+
+definition = {
+    '$schema': 'http://json-schema.org/draft-07/schema',
+    'type': 'object',
+    'properties': {
+        'a': {'type': 'string', 'maxLength': 3},
+        'b': {'$ref': '#/definitions/positive'},
+        'c': {'anyOf': [{'type': 'string'}, {'$ref': '#/definitions/positive'}]},
+        'd': {'type': 'array', 'items': {'$ref': '#/definitions/positive'}},
+        'e': {'type': 'integer', 'default': 42},
+        'x': {},
+    },
+    'required': ['a', 'x'],
+    'additionalProperties': False,
+    'definitions': {
+        'positive': {'type': 'number', 'minimum': 0},
+    },
+}
+
+
+@pytest.mark.parametrize('value, expected', [
+    ({'a': 'abc', 'x': 1}, []),
+    ({'a': 'abcd', 'x': 1}, [(['a'], 'maxLength')]),
+    ({'a': 1, 'b': -1, 'c': -1, 'd': [1, -1, 'x'], 'x': 1}, [
+        (['a'], 'type'),
+        (['b'], 'minimum'),
+        (['c'], 'type'),
+        (['d', 1], 'minimum'),
+        (['d', 2], 'type'),
+    ]),
+    (None, [([], 'type')]),
+])
+def test_collect_errors(value, expected):
+    validate = compile(definition, mode='collect')
+    errors = validate(value)
+    assert all(isinstance(error, JsonSchemaValidationException) for error in errors)
+    assert [(error.path, error.rule) for error in errors] == expected
+
+
+def test_collect_required_and_additional_fields():
+    validate = compile(definition, mode='collect')
+    errors = validate({'a': 'abcd', 'y': 1})
+    assert [(error.path, error.rule) for error in errors] == [(['a'], 'maxLength'), ([], 'required-additionalProperties')]
+    assert errors[1].missing_fields == ['x']
+    assert errors[1].extra_fields == ['y']
+
+
+def test_collect_applies_defaults():
+    validate = compile(definition, mode='collect')
+    value = {'a': 'abc', 'x': 1}
+    assert validate(value) == []
+    assert value == {'a': 'abc', 'x': 1, 'e': 42}
+
+
+@pytest.mark.parametrize('max_errors, expected_count', [
+    (1, 1),
+    (2, 2),
+    (100, 4),
+])
+def test_collect_max_errors(max_errors, expected_count):
+    validate = compile(definition, mode='collect', max_errors=max_errors)
+    errors = validate({'a': 1, 'b': -1, 'd': [-1], 'x': 1, 'y': 1})
+    assert len(errors) == expected_count
+
+
+def test_collect_special_fields_path():
+    validate = compile(definition, mode='collect')
+    errors = validate({'a': 'abc', 'x': 1, 'd': [{'id': 5}]}, special_fields_extractor=lambda obj: ([], [], ['id'] if 'id' in obj else []))
+    assert [str(error) for error in errors] == ['data.d[0]<id=5> must be number, but is a: dict']
+
+
+@pytest.mark.parametrize('mode, max_errors', [
+    ('exception', 1),
+    ('collect', 0),
+])
+def test_collect_bad_max_errors(mode, max_errors):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile(definition, mode=mode, max_errors=max_errors)
@@ -0,0 +1,125 @@
+import asyncio
+import inspect
+
+import pytest
+
+from precisionlife_fastjsonschema import (
+    JsonSchemaDefinitionException, JsonSchemaLimitException, JsonSchemaValidationException, compile, compile_to_code,
+)
+
+
+definition = {
+    'type': 'array',
+    'items': {'$ref': '#/definitions/node'},
+    'definitions': {
+        'node': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'integer'},
+                'tag': {'type': 'string', 'default': 'x'},
+                'children': {'type': 'array', 'items': {'$ref': '#/definitions/node'}},
+            },
+            'anyOf': [{'required': ['id']}, {'required': ['children']}],
+        },
+    },
+}
+
+
+def run(validate, data):
+    return asyncio.run(validate(data))
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+@pytest.mark.parametrize('recursion', ['calls', 'stack'])
+@pytest.mark.parametrize('data', [
+    [{'id': 1}, {'children': [{'id': 2}]}],
+    [{'id': 1}, {'children': [{'id': 'a'}]}],
+    [{'id': 1}, {'tag': 2}],
+    {'id': 1},
+])
+def test_same_as_sync(mode, recursion, data):
+    validate = compile(definition, mode=mode, recursion=recursion)
+    cooperative = compile(definition, mode=mode, recursion=recursion, cooperative=0)
+    assert inspect.iscoroutinefunction(cooperative)
+    try:
+        expected = validate(data)
+    except JsonSchemaValidationException as error:
+        with pytest.raises(JsonSchemaValidationException) as excinfo:
+            run(cooperative, data)
+        assert (excinfo.value.path, excinfo.value.rule) == (error.path, error.rule)
+    else:
+        result = run(cooperative, data)
+        if mode == 'collect':
+            assert [(error.path, error.rule) for error in result] == [(error.path, error.rule) for error in expected]
+        else:
+            assert result == expected
+
+
+def test_defaults():
+    validate = compile(definition, cooperative=0.01)
+    assert run(validate, [{'id': 1}]) == [{'id': 1, 'tag': 'x'}]
+    validate = compile(definition, cooperative=0.01, defaults='copy')
+    data = [{'id': 1}]
+    assert run(validate, data) == [{'id': 1, 'tag': 'x'}]
+    assert data == [{'id': 1}]
+
+
+async def count_yields(validate, data):
+    yields = 0
+    done = False
+
+    async def other_task():
+        nonlocal yields
+        while not done:
+            yields += 1
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(other_task())
+    await asyncio.sleep(0)
+    yields = 0
+    try:
+        await validate(data)
+    finally:
+        done = True
+        await task
+    return yields
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+def test_yields_to_event_loop(mode):
+    validate = compile(definition, mode=mode, cooperative=0)
+    assert asyncio.run(count_yields(validate, [{'id': 1}] * 10000)) >= 10000 // 256
+    assert asyncio.run(count_yields(validate, [{'id': 1}] * 10)) == 0
+
+
+def test_yields_by_time():
+    validate = compile(definition, cooperative=3600)
+    assert asyncio.run(count_yields(validate, [{'id': 1}] * 10000)) == 0
+
+
+def test_limits():
+    validate = compile(definition, cooperative=0, max_nodes=1000)
+    run(validate, [{'id': 1}] * 100)
+    with pytest.raises(JsonSchemaLimitException) as excinfo:
+        run(validate, [{'id': 1}] * 1000)
+    assert excinfo.value.limit == 'max_nodes'
+
+
+def test_code():
+    code = compile_to_code(definition, cooperative=0.001)
+    assert 'import asyncio' in code
+    assert 'await cooperative_checkpoint(_budget)' in code
+    namespace = {}
+    exec(code, namespace)
+    assert asyncio.run(namespace['validate']([{'id': 1}])) == [{'id': 1, 'tag': 'x'}]
+
+
+@pytest.mark.parametrize('options', [
+    {'cooperative': -1},
+    {'cooperative': True},
+    {'cooperative': 0.01, 'batch': True},
+    {'cooperative': 0.01, 'backend': 'closures'},
+])
+def test_bad_options(options):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile(definition, **options)
@@ -1,6 +1,9 @@
+import copy
+
 import pytest
 
-from precisionlife_fastjsonschema import JsonSchemaValidationException
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaValidationException, compile, compile_to_code
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
 
 
 @pytest.mark.parametrize('value, expected', [
@@ -36,3 +39,67 @@ def test_default_in_array(asserter, value, expected):
             {'type': 'number', 'default': 42},
         ],
     }, value, expected)
+
+
+NESTED_DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'a': {'type': 'object', 'properties': {'x': {'default': [1]}}},
+        'b': {'type': 'integer', 'default': 5},
+        'c': {'type': 'array', 'items': [{'type': 'string', 'default': 'i'}]},
+        'd': {'type': 'object'},
+    },
+    'required': ['b'],
+}
+
+
+@pytest.mark.parametrize('recursion', ['calls', 'stack'])
+def test_copied_defaults(recursion):
+    data = {'a': {}, 'c': [], 'd': {'y': [2]}}
+    original = copy.deepcopy(data)
+    result = compile(NESTED_DEFINITION, defaults='copy', recursion=recursion)(data)
+    assert result == {'a': {'x': [1]}, 'b': 5, 'c': ['i'], 'd': {'y': [2]}}
+    assert data == original
+    assert result['a'] is not data['a']
+    assert result['d'] is data['d']
+
+
+def test_copied_defaults_not_needed():
+    data = {'a': {'x': 1}, 'b': 1, 'c': ['a']}
+    assert compile(NESTED_DEFINITION, defaults='copy')(data) is data
+
+
+def test_copied_defaults_under_root_path():
+    root = {'items': [{'a': {}}]}
+    result = compile(NESTED_DEFINITION, defaults='copy')(root['items'][0], root_object=root, root_path=['items', 0])
+    assert result == {'a': {'x': [1]}, 'b': 5}
+    assert root == {'items': [{'a': {}}]}
+
+
+def test_copied_defaults_in_code():
+    code = compile_to_code(NESTED_DEFINITION, defaults='copy')
+    assert '_defaults.append((build_path(root_path) + ["a", ], "x", [1]))' in code
+    global_state = {}
+    exec(code, global_state)
+    assert global_state['validate']({'a': {}}) == {'a': {'x': [1]}, 'b': 5}
+
+
+def test_defaults_off():
+    data = {'a': {}}
+    with pytest.raises(JsonSchemaValidationException):
+        compile(NESTED_DEFINITION, defaults='off')(data)
+    assert compile(NESTED_DEFINITION, defaults='off')({'b': 1}) == {'b': 1}
+    assert 'data["b"] = 5' in CodeGeneratorDraft07(NESTED_DEFINITION).func_code
+    assert 'data["b"] = 5' not in CodeGeneratorDraft07(NESTED_DEFINITION, defaults='off').func_code
+    assert data == {'a': {}}
+
+
+@pytest.mark.parametrize('options', [
+    {'defaults': 'copy', 'mode': 'collect'},
+    {'defaults': 'copy', 'mode': 'bool'},
+    {'defaults': 'copy', 'backend': 'closures'},
+    {'defaults': 'unknown'},
+])
+def test_invalid_defaults(options):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile(NESTED_DEFINITION, **options)
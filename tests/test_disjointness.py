@@ -0,0 +1,73 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft04 import CodeGeneratorDraft04
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+def event(kind):
+    return {
+        'type': 'object',
+        'properties': {'kind': {'const': kind}, 'value': {'type': 'integer'}},
+        'required': ['kind'],
+    }
+
+
+@pytest.mark.parametrize('branches', [
+    [{'type': 'string'}, {'type': 'integer'}, {'type': 'null'}],
+    [{'type': 'number', 'maximum': 0}, {'type': 'integer', 'exclusiveMinimum': 0}],
+    [{'type': 'number', 'exclusiveMaximum': 5}, {'type': 'number', 'minimum': 5}],
+    [{'enum': [1, 2]}, {'enum': [3]}, {'const': 'x'}],
+    [event('a'), event('b'), {'$ref': '#/definitions/c'}],
+    [{'allOf': [{'$ref': '#/definitions/base'}, {'properties': {'kind': {'enum': ['d', 'e']}}}]}, event('a')],
+    [{'type': 'string'}, False],
+])
+def test_disjoint(branches):
+    definition = {
+        'oneOf': branches,
+        'definitions': {'c': event('c'), 'base': {'type': 'object', 'required': ['kind']}},
+    }
+    code = CodeGeneratorDraft07(definition).func_code
+    assert 'if not data_one_of_count:' in code
+    assert 'data_one_of_count < 2' not in code
+
+
+@pytest.mark.parametrize('branches', [
+    [{'type': 'number'}, {'type': 'integer'}],
+    [{'type': 'number', 'maximum': 5}, {'type': 'number', 'minimum': 5}],
+    [{'maximum': 0}, {'minimum': 1}],
+    [{'enum': [1, 2]}, {'enum': [True]}],
+    [{'type': 'object', 'properties': {'kind': {'const': 'a'}}}, event('b')],
+    [{'properties': {'kind': {'const': 'a'}}, 'required': ['kind']}, event('b')],
+    [{'type': 'string'}, {}],
+])
+def test_not_disjoint(branches):
+    code = CodeGeneratorDraft07({'oneOf': branches}).func_code
+    assert 'data_one_of_count < 2' in code
+
+
+def test_const_is_not_draft04_keyword():
+    code = CodeGeneratorDraft04({'oneOf': [{'const': 1}, {'const': 2}]}).func_code
+    assert 'data_one_of_count < 2' in code
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+@pytest.mark.parametrize('value, valid', [
+    ({'kind': 'a', 'value': 1}, True),
+    ({'kind': 'b'}, True),
+    ({'kind': 'a', 'value': 'x'}, False),
+    ({'kind': 'x'}, False),
+    ({}, False),
+    ('a', False),
+])
+def test_disjoint_validation(mode, value, valid):
+    validate = compile({'oneOf': [event('a'), event('b')]}, mode=mode)
+    if mode == 'bool':
+        assert validate(value) is valid
+    elif mode == 'collect':
+        assert (not validate(value)) is valid
+    elif valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
@@ -0,0 +1,70 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+def order(definition, **kwargs):
+    return CodeGeneratorDraft07(definition, **kwargs).keywords_order(definition)
+
+
+@pytest.mark.parametrize('definition, expected', [
+    (
+        {'pattern': 'a', 'format': 'email', 'maxLength': 3, 'type': 'string'},
+        ['type', 'maxLength', 'pattern', 'format'],
+    ),
+    (
+        {'uniqueItems': True, 'items': {'type': 'string'}, 'maxItems': 3},
+        ['maxItems', 'uniqueItems', 'items'],
+    ),
+    (
+        {'anyOf': [{'minimum': 0}, {'maximum': -5}], 'enum': [1, 2, 3], 'const': 2, 'multipleOf': 2},
+        ['multipleOf', 'enum', 'const', 'anyOf'],
+    ),
+    (
+        {'properties': {'a': {}}, 'const': {}, 'minProperties': 1, 'propertyNames': {'maxLength': 1}},
+        ['minProperties', 'properties', 'const', 'propertyNames'],
+    ),
+])
+def test_order(definition, expected):
+    assert order(definition) == expected
+
+
+def test_order_with_defaults():
+    definition = {'allOf': [{'properties': {'a': {'default': 1}}}], 'maxProperties': 1}
+    assert order(definition) == ['allOf', 'maxProperties']
+    assert order(definition, mode='bool') == ['maxProperties', 'allOf']
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+@pytest.mark.parametrize('value, valid', [
+    (['a', 'b'], True),
+    (['a', 'a'], False),
+    (['a', 'b', 'c', 'd'], False),
+    (['a', 1], False),
+    ([], False),
+])
+def test_validation(mode, value, valid):
+    validate = compile({
+        'type': 'array',
+        'uniqueItems': True,
+        'items': {'type': 'string'},
+        'anyOf': [{'minItems': 1}],
+        'maxItems': 3,
+    }, mode=mode)
+    if mode == 'bool':
+        assert validate(value) is valid
+    elif mode == 'collect':
+        assert (not validate(value)) is valid
+    elif valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
+
+
+def test_first_error_is_from_cheapest_check():
+    validate = compile({'type': 'string', 'pattern': '^a', 'maxLength': 3})
+    with pytest.raises(JsonSchemaValidationException) as error:
+        validate('bbbb')
+    assert error.value.rule == 'maxLength'
@@ -0,0 +1,107 @@
+import pickle
+import time
+
+import pytest
+
+from precisionlife_fastjsonschema import (
+    JsonSchemaDefinitionException, JsonSchemaLimitException, JsonSchemaValidationException, compile,
+)
+
+
+tree_definition = {
+    '$schema': 'http://json-schema.org/draft-07/schema',
+    '$ref': '#/definitions/node',
+    'definitions': {
+        'node': {
+            'type': 'object',
+            'properties': {
+                'value': {'type': 'integer'},
+                'children': {'type': 'array', 'items': {'$ref': '#/definitions/node'}},
+            },
+        },
+    },
+}
+
+
+def make_chain(depth):
+    node = {'value': 0}
+    for _ in range(depth):
+        node = {'value': 0, 'children': [node]}
+    return node
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+def test_max_depth(mode):
+    validate = compile(tree_definition, mode=mode, max_depth=50)
+    validate(make_chain(10))
+    with pytest.raises(JsonSchemaLimitException) as excinfo:
+        validate(make_chain(100))
+    assert excinfo.value.limit == 'max_depth'
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+def test_max_nodes(mode):
+    validate = compile({'type': 'array', 'items': {'type': 'integer'}}, mode=mode, max_nodes=100)
+    validate(list(range(50)))
+    with pytest.raises(JsonSchemaLimitException) as excinfo:
+        validate(list(range(200)))
+    assert excinfo.value.limit == 'max_nodes'
+
+
+def test_max_nodes_is_per_call():
+    validate = compile({'type': 'array', 'items': {'type': 'integer'}}, max_nodes=100)
+    for _ in range(10):
+        validate(list(range(50)))
+
+
+def test_max_nodes_unique_items():
+    validate = compile({'type': 'array', 'uniqueItems': True}, max_nodes=100)
+    validate(list(range(50)))
+    with pytest.raises(JsonSchemaLimitException):
+        validate(list(range(200)))
+
+
+def test_timeout():
+    validate = compile(tree_definition, timeout=0.01)
+    wide = {'value': 0, 'children': [{'value': 0}] * 10}
+    validate(wide)
+
+    slow_items = (time.sleep(0.0001) or {'value': 0} for _ in range(100000))
+
+    class SlowList(list):
+        def __iter__(self):
+            return slow_items
+
+    with pytest.raises(JsonSchemaLimitException) as excinfo:
+        validate({'value': 0, 'children': SlowList()})
+    assert excinfo.value.limit == 'timeout'
+
+
+def test_limit_is_not_validation_error():
+    validate = compile(tree_definition, max_depth=5)
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'value': 'x'})
+    with pytest.raises(JsonSchemaLimitException) as excinfo:
+        validate(make_chain(10))
+    assert not isinstance(excinfo.value, JsonSchemaValidationException)
+
+
+def test_limit_exception_is_picklable():
+    validate = compile(tree_definition, max_nodes=3)
+    with pytest.raises(JsonSchemaLimitException) as excinfo:
+        validate(make_chain(10))
+    copy = pickle.loads(pickle.dumps(excinfo.value))
+    assert (type(copy), str(copy), copy.message, copy.limit) == (
+        JsonSchemaLimitException, str(excinfo.value), excinfo.value.message, 'max_nodes',
+    )
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'max_depth': -1},
+    {'max_nodes': 0},
+    {'timeout': 0},
+    {'max_depth': '5'},
+])
+def test_bad_limits(kwargs):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile({'type': 'string'}, **kwargs)
@@ -0,0 +1,86 @@
+import gzip
+import json
+
+import pytest
+
+from precisionlife_fastjsonschema.__main__ import merge, validate
+
+
+@pytest.fixture
+def schema(tmp_path):
+    path = tmp_path / 'schema.json'
+    path.write_text(json.dumps({'type': 'object', 'required': ['id']}))
+    return str(path)
+
+
+def report(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_validate_ndjson(tmp_path, schema, capsys, workers):
+    path = tmp_path / 'data.ndjson'
+    path.write_text('{"id": 1}\n{}\n[\n{"id": 2}\n')
+    assert validate([schema, str(path), '--workers', workers, '--range-size', '5']) == 1
+    lines = report(capsys)
+    assert [(line['type'], line['line'], line['rule']) for line in lines[:2]] == [
+        ('failure', 2, 'required-additionalProperties'),
+        ('failure', 3, 'json'),
+    ]
+    assert lines[2]['type'] == 'summary'
+    assert (lines[2]['documents'], lines[2]['failures'], lines[2]['bytes']) == (4, 2, 25)
+
+
+def test_validate_json_and_gzip(tmp_path, schema, capsys):
+    valid = tmp_path / 'valid.json'
+    valid.write_text('{\n  "id": 1\n}\n')
+    invalid = tmp_path / 'invalid.ndjson.gz'
+    with gzip.open(invalid, 'wt') as file:
+        file.write('{"id": 1}\n{"x": 1}\n')
+    assert validate([schema, str(valid), str(invalid), '--workers', '1']) == 1
+    lines = report(capsys)
+    assert [(line['type'], line['file'], line.get('line')) for line in lines] == [
+        ('summary', str(valid), None),
+        ('failure', str(invalid), 2),
+        ('summary', str(invalid), None),
+    ]
+
+
+def test_shard_of_compressed_file(tmp_path, schema, capsys):
+    with pytest.raises(SystemExit):
+        validate([schema, str(tmp_path / 'data.ndjson.gz'), '--shard', '0/2'])
+    assert 'compressed files can not be split' in capsys.readouterr().err
+
+
+def test_validate_valid(tmp_path, schema, capsys):
+    path = tmp_path / 'data.json'
+    path.write_text('{"id": 1}')
+    assert validate([schema, str(path)]) == 0
+    assert report(capsys)[0]['failures'] == 0
+
+
+def test_shards_and_merge(tmp_path, schema, capsys):
+    path = tmp_path / 'data.ndjson'
+    path.write_text(''.join('{}\n' if number % 7 == 0 else '{"id": 1}\n' for number in range(1, 101)))
+    outputs = []
+    for shard in range(3):
+        output = str(tmp_path / 'shard{}.json'.format(shard))
+        assert validate([schema, str(path), '--shard', '{}/3'.format(shard), '--output', output, '--workers', '1']) == 1
+        outputs.append(output)
+    assert merge(outputs[::-1]) == 1
+    report = report_of(capsys)
+    assert report['file'] == str(path)
+    assert (report['documents'], report['failures']) == (100, 14)
+    assert report['rules'] == {'required-additionalProperties': 14}
+    assert [sample['file_line'] for sample in report['samples']] == list(range(7, 101, 7))
+    assert merge(outputs + ['--samples', '2']) == 1
+    assert [sample['file_line'] for sample in report_of(capsys)['samples']] == [7, 14]
+
+
+def report_of(capsys):
+    return json.loads(capsys.readouterr().out)
+
+
+def test_bad_shard(tmp_path, schema):
+    with pytest.raises(SystemExit):
+        validate([schema, str(tmp_path / 'data.ndjson'), '--shard', '3/3'])
@@ -0,0 +1,90 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaLimitException, compile, compile_to_code
+
+
+definition = {
+    'type': 'object',
+    'properties': {'id': {'type': 'integer'}, 'tag': {'type': 'string', 'default': 'x'}},
+    'required': ['id'],
+}
+
+documents = [{'id': 1}, {'id': 'a'}, {'id': 2}, {}, 'a']
+
+
+def rule(error):
+    return error.limit if isinstance(error, JsonSchemaLimitException) else error.rule
+
+
+def test_exception_mode():
+    failures = compile(definition, batch=True)(documents)
+    assert [index for index, _ in failures] == [1, 3, 4]
+    assert [error.rule for _, error in failures] == ['type', 'required-additionalProperties', 'type']
+    assert failures[0][1].path == ['id']
+
+
+def test_bool_mode():
+    assert compile(definition, mode='bool', batch=True)(documents) == [(1, None), (3, None), (4, None)]
+
+
+def test_collect_mode():
+    failures = compile(definition, mode='collect', batch=True)([{'id': 1}, {'id': 'a'}])
+    assert [(index, [error.rule for error in errors]) for index, errors in failures] == [(1, ['type'])]
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+def test_stop_on_failure(mode):
+    failures = compile(definition, mode=mode, batch=True)(iter(documents), stop_on_failure=True)
+    assert len(failures) == 1
+
+
+def test_defaults():
+    data = [{'id': 1}, {'id': 2, 'tag': 'y'}]
+    assert compile(definition, batch=True)(data) == []
+    assert data == [{'id': 1, 'tag': 'x'}, {'id': 2, 'tag': 'y'}]
+
+    data = [{'id': 1}]
+    assert compile(definition, batch=True, defaults='copy')(data) == []
+    assert data == [{'id': 1}]
+
+
+def test_root_object_is_document():
+    failures = compile({'type': 'integer'}, batch=True)(['a'])
+    assert failures[0][1].root_object == 'a'
+
+
+def test_limits_are_per_document():
+    validate_many = compile({'type': 'array', 'items': {'type': 'integer'}}, batch=True, max_nodes=5)
+    assert validate_many([[1, 2, 3]] * 10) == []
+    failures = validate_many([list(range(10))])
+    assert [index for index, _ in failures] == [0]
+    assert isinstance(failures[0][1], JsonSchemaLimitException)
+
+
+@pytest.mark.parametrize('mode, expected', [
+    ('exception', [(1, 'max_nodes'), (2, 'type')]),
+    ('bool', [(1, 'max_nodes'), (2, None)]),
+    ('collect', [(1, ['max_nodes']), (2, ['type'])]),
+])
+def test_limit_does_not_stop_batch(mode, expected):
+    validate_many = compile({'type': 'array', 'items': {'type': 'integer'}}, mode=mode, batch=True, max_nodes=5)
+    failures = validate_many([[1], list(range(10)), ['a'], [2]])
+    if mode == 'exception':
+        failures = [(index, rule(error)) for index, error in failures]
+    elif mode == 'bool':
+        failures = [(index, error and rule(error)) for index, error in failures]
+    else:
+        failures = [(index, [rule(error) for error in errors]) for index, errors in failures]
+    assert failures == expected
+
+
+def test_compile_to_code():
+    code = compile_to_code(definition, mode='bool', batch=True)
+    namespace = {}
+    exec(code, namespace)
+    assert namespace['validate_many'](documents) == [(1, None), (3, None), (4, None)]
+
+
+def test_closures_not_supported():
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile(definition, batch=True, backend='closures')
@@ -159,6 +159,18 @@ def test_additional_properties(asserter, value, expected):
     }, value, expected)
 
 
+@pytest.mark.parametrize('value, expected', [
+    ({'a': 1, 'b': 2}, {'a': 1, 'b': 2}),
+    ({'b': [], 'c': None}, {'b': [], 'c': None}),
+])
+def test_empty_additional_properties(asserter, value, expected):
+    asserter({
+        'type': 'object',
+        'properties': {'a': {}},
+        'additionalProperties': {},
+    }, value, expected)
+
+
 @pytest.mark.parametrize('value, expected', [
     ({'id': 1}, {'id': 1}),
     ({'id': 'a'}, JsonSchemaValidationException('must be integer, but is a: str', value='a', _rendered_path='data.id', definition={'type': 'integer'}, rule='type')),
@@ -0,0 +1,113 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile, optimize_schema
+
+
+@pytest.mark.parametrize('definition, expected', [
+    (
+        {'allOf': [{'allOf': [{'type': 'integer'}, {}]}, {'minimum': 0}]},
+        {'type': 'integer', 'minimum': 0},
+    ),
+    (
+        {'minimum': 0, 'allOf': [{'minimum': 5}, {'maximum': 10}, {'maximum': 8}]},
+        {'minimum': 5, 'maximum': 8},
+    ),
+    (
+        {'type': ['number', 'string'], 'allOf': [{'type': 'integer'}]},
+        {'type': 'integer'},
+    ),
+    (
+        {'required': ['a'], 'allOf': [{'required': ['b', 'a']}]},
+        {'required': ['a', 'b']},
+    ),
+    (
+        {'anyOf': [{'type': 'string'}]},
+        {'type': 'string'},
+    ),
+    (
+        {'oneOf': [{'pattern': 'a'}], 'pattern': 'b'},
+        {'pattern': 'b', 'allOf': [{'pattern': 'a'}]},
+    ),
+    (
+        {'allOf': [{'type': 'string'}, {'type': 'integer'}]},
+        {'type': 'string', 'allOf': [{'type': 'integer'}]},
+    ),
+    (
+        {'anyOf': [{'type': 'string'}, {}]},
+        {},
+    ),
+    (
+        {'type': ['string', 'string'], 'minLength': 0, 'required': [], 'additionalProperties': True},
+        {'type': 'string'},
+    ),
+    (
+        {'definitions': {'a': {'$ref': '#/definitions/b'}, 'b': {'$ref': '#/definitions/c'}, 'c': {'type': 'string'}}, '$ref': '#/definitions/a'},
+        {'definitions': {'a': {'$ref': '#/definitions/c'}, 'b': {'$ref': '#/definitions/c'}, 'c': {'type': 'string'}}, '$ref': '#/definitions/c'},
+    ),
+])
+def test_optimize(definition, expected):
+    optimized, report = optimize_schema(definition)
+    assert optimized == expected
+    assert report
+
+
+@pytest.mark.parametrize('definition', [
+    # Additional properties depend on properties in the same subschema.
+    {'properties': {'a': {}}, 'allOf': [{'additionalProperties': False}]},
+    # Exclusive minimum changes the meaning of minimum in draft 04.
+    {'minimum': 5, 'exclusiveMinimum': True, 'allOf': [{'minimum': 4}]},
+    # Default of the item would be injected by the parent.
+    {'allOf': [{'type': 'string', 'default': 'x'}]},
+    # Pointer into allOf has to stay valid.
+    {'allOf': [{'type': 'string'}], 'properties': {'a': {'$ref': '#/allOf/0'}}},
+    {'allOf': [{'$ref': '#/definitions/a'}], 'definitions': {'a': {}}},
+])
+def test_not_optimized(definition):
+    optimized, report = optimize_schema(definition)
+    assert optimized == definition
+    assert report == []
+
+
+def test_ids_are_not_optimized():
+    definition = {'allOf': [{'$id': 'http://example.com/a', 'type': 'string'}]}
+    optimized, report = optimize_schema(definition)
+    assert optimized == definition
+    assert report == ['#: not optimized, schema contains ids']
+
+
+def test_input_is_not_modified():
+    definition = {'allOf': [{'type': 'string'}]}
+    optimize_schema(definition)
+    assert definition == {'allOf': [{'type': 'string'}]}
+
+
+def test_report_pointers():
+    _, report = optimize_schema({'properties': {'a/b': {'anyOf': [{'type': 'string'}]}}})
+    assert report == ['#/properties/a~1b: anyOf with one branch merged']
+
+
+@pytest.mark.parametrize('value, valid', [
+    (5, True),
+    (11, False),
+    (-1, False),
+    ('a', False),
+])
+def test_compile_optimized(value, valid):
+    validate = compile({'allOf': [{'type': 'integer'}, {'anyOf': [{'minimum': 0}]}], 'maximum': 10}, optimize=True)
+    if valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
+
+
+@pytest.mark.parametrize('definition', [
+    {'properties': {'a': {}}, 'additionalProperties': {}},
+    {'required': ['a'], 'additionalProperties': {}},
+    {'patternProperties': {'^x': {'type': 'integer'}}, 'additionalProperties': {}},
+])
+@pytest.mark.parametrize('value', [{'a': 1, 'b': 2}, {'b': 2}, {'x': 'a'}, {'x': 1, 'y': 2}])
+def test_same_validity(definition, value):
+    is_valid = compile(definition, mode='bool')
+    is_valid_optimized = compile(definition, mode='bool', optimize=True)
+    assert is_valid_optimized(value) is is_valid(value)
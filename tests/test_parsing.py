@@ -0,0 +1,308 @@
+import io
+import json
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaValidationException, compile, compile_incremental, compile_json
+from precisionlife_fastjsonschema.parsing import FULL, SKIP, LazyPlan, Unparsed, lazy_plan, skip_value
+
+
+definition = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer'},
+        'tags': {'type': 'array', 'items': {'$ref': '#/definitions/tag'}},
+        'kind': {'default': 'a'},
+    },
+    'patternProperties': {'^x-': {'type': 'string'}},
+    'additionalProperties': {'type': 'number'},
+    'required': ['id'],
+    'definitions': {'tag': {'type': 'string', 'maxLength': 3}},
+}
+
+
+def error_of(function, *args):
+    try:
+        function(*args)
+    except JsonSchemaValidationException as error:
+        return error.rule, error.path, str(error)
+    return None
+
+
+@pytest.mark.parametrize('prefix_size', [0, 10, 1 << 16])
+@pytest.mark.parametrize('body', [
+    '{"id": 1}',
+    ' { "id" : 1 , "tags" : [ "a" ] , "x-a" : "b" , "z" : 1.5 } ',
+    '{"tags": ["a"]}',
+    '{"id": "1"}',
+    '{"id": 1, "tags": ["abcd"]}',
+    '{"id": 1, "x-a": 1}',
+    '{"id": 1, "z": "a"}',
+    '{}',
+    '[]',
+    '"a"',
+])
+def test_same_as_loads(body, prefix_size):
+    validate = compile(definition)
+    validate_json = compile_json(definition, prefix_size=prefix_size)
+    assert error_of(validate_json, body) == error_of(lambda: validate(json.loads(body)))
+    if error_of(validate_json, body) is None:
+        assert validate_json(body) == validate(json.loads(body))
+        assert validate_json(body.encode('utf-16')) == validate(json.loads(body))
+    assert compile_json(definition, mode='bool', prefix_size=prefix_size)(body) is compile(definition, mode='bool')(json.loads(body))
+
+
+@pytest.mark.parametrize('body', [
+    '{"id": "1", "tags": [',
+    '[1, {"id": 1}, 2, ',
+])
+def test_early_rejection(body):
+    validate_json = compile_json({'items': [{'type': 'string'}], 'properties': {'id': {'type': 'integer'}}}, prefix_size=0)
+    with pytest.raises(JsonSchemaValidationException):
+        validate_json(body)
+    with pytest.raises(json.JSONDecodeError):
+        compile_json(definition)(body)
+
+
+def test_items():
+    validate_json = compile_json({'items': [{'type': 'string'}], 'additionalItems': {'type': 'integer'}}, prefix_size=3)
+    assert validate_json('["a", 1, 2, 3]') == ['a', 1, 2, 3]
+    assert error_of(validate_json, '["a", "b", 2]')[:2] == ('type', [1])
+    assert error_of(validate_json, '["a", 1, 2, "c"]')[:2] == ('type', [3])
+
+
+@pytest.mark.parametrize('prefix_size', [0, 1 << 16])
+@pytest.mark.parametrize('body', [
+    '{"id": 1, "x": [1, }',
+    '{"id": 1, "x": 1 "y": 1}',
+    '{"id": 1, "x": 1} 1',
+    '{"id" 1}',
+    '[1, 2,',
+    '',
+])
+def test_malformed(body, prefix_size):
+    with pytest.raises(json.JSONDecodeError) as loads_error:
+        json.loads(body)
+    with pytest.raises(json.JSONDecodeError) as error:
+        compile_json({'properties': {'id': {}}, 'items': {}}, prefix_size=prefix_size)(body)
+    assert error.value.pos == loads_error.value.pos
+
+
+@pytest.mark.parametrize('prefix_size', [0, 5, 1 << 16])
+@pytest.mark.parametrize('body', [
+    '{"id": 1, "id": 2}',
+    '{"id": 1, "a": 1, "b": 2, "id": 2}',
+    '{"id": 1, "tags": [{"a": 1, "a": 2}]}',
+])
+def test_duplicate_keys(body, prefix_size):
+    validate_json = compile_json({'properties': {'id': {}}}, duplicate_keys=True, prefix_size=prefix_size)
+    assert error_of(validate_json, body)[0] == 'duplicateKeys'
+    assert compile_json({'properties': {'id': {}}}, mode='bool', duplicate_keys=True, prefix_size=prefix_size)(body) is False
+    assert compile_json({'properties': {'id': {}}}, prefix_size=prefix_size)(body) == json.loads(body)
+
+
+@pytest.mark.parametrize('options', [
+    {'mode': 'collect'},
+    {'defaults': 'copy'},
+    {'prefix_size': -1},
+])
+def test_bad_options(options):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile_json(definition, **options)
+
+
+records = {
+    'type': 'array',
+    'items': {'type': 'object', 'properties': {'id': {'type': 'integer'}}, 'required': ['id']},
+    'maxItems': 3,
+}
+
+
+def feed(parser, body, size):
+    for index in range(0, len(body), size):
+        parser.feed(body[index:index + size])
+    return parser.close()
+
+
+@pytest.mark.parametrize('size', [1, 4, 1000])
+@pytest.mark.parametrize('schema, body', [
+    (records, '[{"id": 1}, {"id": 2} ]'),
+    (records, ' [ ] '),
+    (records, '[{"id": 1}, {"id": 2.5}]'),
+    (records, '[{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]'),
+    (records, '{"id": 1}'),
+    (records, '123'),
+    (definition, '{"id": 12, "tags": ["a", "b"], "x-a": "b"}'),
+    (definition, '{"tags": ["a"]}'),
+    (definition, '{"id": 1, "tags": ["abcd"]}'),
+    ({'properties': {'a': {}}, 'additionalProperties': False}, '{"a": 1, "b": 2}'),
+    ({'items': [{}, {'type': 'string'}], 'additionalItems': False}, '[1, "a", 2]'),
+    ({'items': [{}, {'type': 'string'}], 'additionalItems': False}, '[1, 2]'),
+])
+def test_incremental_same_as_loads(schema, body, size):
+    validate = compile(schema, defaults='off')
+    validate_incremental = compile_incremental(schema)
+    assert error_of(feed, validate_incremental.parser(), body, size) == error_of(validate, json.loads(body))
+    assert feed(compile_incremental(schema, mode='bool').parser(), body.encode('utf-16'), size) is compile(schema, mode='bool')(json.loads(body))
+
+
+@pytest.mark.parametrize('size', [1, 3, 1000])
+@pytest.mark.parametrize('body', [
+    '[{"id": 1},\n {"id": 2}\n x]',
+    '[{"id": 1}, {"id": 2} {"id": 3}]',
+    '[{"id": 1}, {"id": "ab',
+    '[{"id": 1}]\n\n ]',
+    '{"id": 1, "x" 2}',
+    '[1, tru]',
+    '[1,',
+    '{',
+    '',
+])
+def test_incremental_malformed(body, size):
+    with pytest.raises(json.JSONDecodeError) as loads_error:
+        json.loads(body)
+    with pytest.raises(json.JSONDecodeError) as error:
+        feed(compile_incremental({}).parser(), body, size)
+    assert str(error.value) == str(loads_error.value)
+    assert (error.value.pos, error.value.lineno, error.value.colno) == (loads_error.value.pos, loads_error.value.lineno, loads_error.value.colno)
+
+
+def test_incremental_early_error():
+    parser = compile_incremental(records).parser()
+    parser.feed('[{"id": 1}, {"id": "a"}')
+    # The rest is never fed, the error is found as soon as the member is parsed.
+    with pytest.raises(JsonSchemaValidationException) as error:
+        parser.feed(', {"id": 2}, {"id": ')
+    assert error.value.path == [1, 'id']
+    parser = compile_incremental(records, mode='bool').parser()
+    parser.feed('[{"id": "a"}, ')
+    assert parser.finished
+    assert parser.close() is False
+
+
+def test_incremental_file():
+    validate = compile_incremental(records, mode='bool')
+    assert validate(io.BytesIO(b'[{"id": 1}, {"id": 2}]'), chunk_size=3) is True
+    assert validate(io.StringIO('[{"id": 1}, {}]'), chunk_size=3) is False
+    assert validate([b'[{"id": 1}', b']']) is True
+
+
+def test_incremental_duplicate_keys():
+    parser = compile_incremental({'properties': {'a': {}}}, duplicate_keys=True).parser()
+    with pytest.raises(JsonSchemaValidationException) as error:
+        feed(parser, '{"a": 1, "b": 2, "a": 3}', 5)
+    assert error.value.rule == 'duplicateKeys'
+
+
+@pytest.mark.parametrize('schema', [
+    {'enum': [[]]},
+    {'items': {}, 'uniqueItems': True},
+    {'anyOf': [{'type': 'array'}]},
+    {'$ref': '#/definitions/a', 'definitions': {'a': {}}},
+    {'dependencies': {'a': {'required': ['b']}}},
+])
+def test_incremental_bad_schema(schema):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile_incremental(schema)
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile_incremental({}, mode='collect')
+
+
+def loaded(data):
+    if isinstance(data, Unparsed):
+        return data.load()
+    if isinstance(data, dict):
+        return {key: loaded(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [loaded(value) for value in data]
+    return data
+
+
+@pytest.mark.parametrize('body', [
+    '{"id": 1, "tags": ["a"], "x-a": "b", "z": 1.5, "kind": "b"}',
+    ' { "id" : 1 , "payload" : { "a" : [ "]}", {"b": "\\"\\\\"} ] } , "list": [[], {}] } ',
+    '{"id": 1, "payload": "x", "payload2": 5}',
+    '{"id": "1", "payload": {}}',
+    '{"id": 1, "tags": ["abcd"]}',
+    '{"tags": [], "x-a": 1}',
+    '[{"a": 1}]',
+])
+def test_lazy_same_as_loads(body):
+    schema = dict(definition, additionalProperties=True)
+    validate = compile(schema)
+    validate_json = compile_json(schema, lazy=True)
+    assert error_of(validate_json, body) == error_of(lambda: validate(json.loads(body)))
+    if error_of(validate_json, body) is None:
+        assert loaded(validate_json(body)) == validate(json.loads(body))
+    assert compile_json(schema, mode='bool', lazy=True)(body) is compile(schema, mode='bool')(json.loads(body))
+
+
+def test_lazy_skips():
+    validate_json = compile_json({'properties': {'id': {'type': 'integer'}, 'meta': {'description': 'anything'}}}, lazy=True)
+    data = validate_json('{"id": 1, "meta": {"a": [1, 2]}, "blob": "abc", "n": 2}')
+    assert isinstance(data['meta'], Unparsed) and isinstance(data['blob'], Unparsed)
+    assert (data['id'], data['meta'].load(), data['blob'].text, data['n']) == (1, {'a': [1, 2]}, '"abc"', 2)
+
+
+@pytest.mark.parametrize('schema, plan', [
+    ({}, SKIP),
+    (True, SKIP),
+    ({'title': 'x', 'default': 1}, SKIP),
+    (False, FULL),
+    ({'type': 'string'}, FULL),
+    ({'enum': [{}]}, FULL),
+    ({'type': 'object', 'properties': {'a': {'type': 'integer'}}, 'additionalProperties': False}, FULL),
+    ({'properties': {'a': {'type': 'integer'}}, 'anyOf': [{}]}, FULL),
+    ({'$ref': '#/definitions/a', 'definitions': {'a': {'$ref': '#/definitions/a'}}}, FULL),
+    ({'$ref': '#/definitions/a', 'definitions': {'a': {}}}, SKIP),
+    ({'$ref': 'http://example.com/schema'}, FULL),
+    ({'type': 'array', 'items': {'$id': 'http://example.com/schema', 'type': 'object'}}, FULL),
+])
+def test_lazy_plan(schema, plan):
+    assert lazy_plan(schema) is plan
+
+
+def test_lazy_plan_members():
+    plan = lazy_plan({
+        'type': 'object',
+        'properties': {'a': {'type': 'integer'}, 'b': {'$ref': '#/definitions/b'}},
+        'patternProperties': {'^x': {}, '^y': {'type': 'string'}},
+        'definitions': {'b': {'items': [{'type': 'integer'}, {}]}},
+    })
+    assert isinstance(plan, LazyPlan)
+    assert [plan.member(key) for key in ('a', 'x', 'y', 'z')] == [FULL, SKIP, FULL, SKIP]
+    assert [plan.member('b').item(index) for index in range(3)] == [FULL, SKIP, SKIP]
+
+
+@pytest.mark.parametrize('body, end', [
+    ('"a\\"b" ', 6),
+    ('"a\\\\" ', 5),
+    ('[1, "]", {"a": "}"}] 1', 20),
+    ('{"a": "' + 'x' * 5000 + '", "b": [{}]}, 1', 5020),
+    ('12.5, 1', 4),
+])
+def test_skip_value(body, end):
+    assert skip_value(body, 0, json.JSONDecoder().scan_once) == end
+
+
+@pytest.mark.parametrize('body', [
+    '{"id": 1, "meta": [1, 2}',
+    '{"id": 1, "meta": {"x" 1 ]}',
+    '{"id": 1, "meta": {"a": "' + 'x' * 5000 + '", "b": [[1]}, "c": [1]}}',
+    '{"id": 1, "meta": "abc}',
+    '{"id": 1, "meta": {"a": "' + 'x' * 5000 + '", "b": [}',
+    '{"id": 1, "meta": [1, 2',
+    '{"id": 1, "meta": x}',
+    '{"id": 1 "meta": 1}',
+    '{"id": 1, "meta": 1} 1',
+])
+def test_lazy_malformed(body):
+    with pytest.raises(json.JSONDecodeError):
+        compile_json({'properties': {'id': {}}}, lazy=True)(body)
+
+
+@pytest.mark.parametrize('body', ['{"a": 1, "m": [1,,2]}', '{"m": [tru]}', '{"m": {"x" 1}}'])
+def test_lazy_skipped_not_checked(body):
+    assert isinstance(compile_json({'properties': {'a': {}}}, lazy=True)(body)['m'], Unparsed)
+    with pytest.raises(json.JSONDecodeError):
+        compile_json({'properties': {'a': {}}})(body)
@@ -0,0 +1,113 @@
+import asyncio
+import pickle
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaValidationException, compile, compile_pool
+
+
+definition = {
+    'type': 'object',
+    'properties': {'id': {'type': 'integer'}, 'tag': {'type': 'string', 'default': 'x'}},
+    'required': ['id'],
+}
+
+documents = [{'id': 'a'} if number % 7 == 0 else {'id': number} for number in range(100)]
+
+
+async def collect(pool, documents):
+    return [failure async for failure in pool.validate_many_async(documents)]
+
+
+def summary(failures):
+    return [(index, error.rule, error.path, str(error)) for index, error in failures]
+
+
+@pytest.mark.parametrize('chunk_size, inline_size', [(3, 0), (10, 0), (1000, None)])
+def test_failures_in_order(chunk_size, inline_size):
+    expected = compile(definition, batch=True, defaults='off')(documents)
+    pool = compile_pool(definition, workers=2, chunk_size=chunk_size, inline_size=inline_size)
+    try:
+        failures = asyncio.run(collect(pool, iter(documents)))
+    finally:
+        pool.close()
+    assert summary(failures) == summary(expected)
+    assert [index for index, _ in failures] == list(range(0, 100, 7))
+    assert documents[1] == {'id': 1}
+
+
+@pytest.mark.parametrize('mode, expected', [
+    ('bool', [(index, None) for index in range(0, 100, 7)]),
+    ('collect', [(index, ['type']) for index in range(0, 100, 7)]),
+])
+def test_modes(mode, expected):
+    async def run():
+        async with compile_pool(definition, mode=mode, workers=2, chunk_size=10, inline_size=0) as pool:
+            return await collect(pool, documents)
+    failures = asyncio.run(run())
+    if mode == 'collect':
+        failures = [(index, [error.rule for error in errors]) for index, errors in failures]
+    assert failures == expected
+
+
+def test_inline():
+    async def run():
+        async with compile_pool(definition, workers=2, inline_size=100) as pool:
+            failures = await collect(pool, documents)
+            assert pool._executor is None
+            return failures
+    assert len(asyncio.run(run())) == 15
+
+
+def test_workers_reused():
+    async def run():
+        async with compile_pool(definition, workers=2, chunk_size=10, in_flight=1, inline_size=0) as pool:
+            first = await collect(pool, documents)
+            executor = pool._executor
+            second = await collect(pool, documents[:20])
+            assert pool._executor is executor
+            return first, second
+    first, second = asyncio.run(run())
+    assert [index for index, _ in second] == [index for index, _ in first if index < 20]
+
+
+def test_aclose():
+    async def run():
+        pool = compile_pool(definition, workers=2, chunk_size=10, inline_size=0)
+        first = await collect(pool, documents)
+        executor = pool._executor
+        await pool.aclose()
+        assert pool._executor is None
+        second = await collect(pool, documents)
+        assert pool._executor not in (None, executor)
+        await pool.aclose()
+        return first, second
+    first, second = asyncio.run(run())
+    assert summary(first) == summary(second)
+
+
+def test_stop_early():
+    async def run():
+        async with compile_pool(definition, workers=2, chunk_size=5, inline_size=0) as pool:
+            async for index, _ in pool.validate_many_async(documents):
+                return index
+    assert asyncio.run(run()) == 0
+
+
+def test_pickled_error():
+    validate = compile(definition)
+    with pytest.raises(JsonSchemaValidationException) as excinfo:
+        validate({'id': 'a'})
+    copy = pickle.loads(pickle.dumps(excinfo.value))
+    assert (str(copy), copy.rule, copy.path, copy.root_object) == (str(excinfo.value), 'type', ['id'], None)
+
+
+@pytest.mark.parametrize('options', [
+    {'workers': 0},
+    {'chunk_size': 0},
+    {'in_flight': 0},
+    {'inline_size': -1},
+])
+def test_bad_options(options):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile_pool(definition, **options)
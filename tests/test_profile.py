@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, Profile, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+definition = {
+    'type': 'object',
+    'properties': {
+        'value': {
+            'anyOf': [
+                {'type': 'integer'},
+                {'type': 'boolean'},
+                {'type': 'null'},
+                {'type': 'string', 'minLength': 1, 'maxLength': 3},
+            ],
+        },
+    },
+}
+
+
+def record(mode='exception'):
+    profile = Profile()
+    validate = compile(definition, mode=mode, instrument=profile)
+    for value in ['a', 'ab', 'abc', 'abcd', 'abcde', 1]:
+        try:
+            validate({'value': value})
+        except JsonSchemaValidationException:
+            pass
+    return profile
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+def test_record(mode):
+    profile = record(mode)
+    hits = list(profile.any_of_hits.values())
+    assert hits == [{3: 3, 0: 1}]
+    failures = [rules for rules in profile.failures.values() if 'maxLength' in rules]
+    assert failures == [{'maxLength': 2}]
+
+
+def test_reorder():
+    profile = record()
+    code = CodeGeneratorDraft07(definition, profile=profile).func_code
+    assert code.index('must be string') < code.index('must be integer')
+    assert code.index('> 3') < code.index('< 1')
+
+
+def test_default_order():
+    code = CodeGeneratorDraft07(definition).func_code
+    assert code.index('must be integer') < code.index('must be string')
+    assert code.index('< 1') < code.index('> 3')
+
+
+def test_branches_with_defaults_are_not_reordered():
+    with_defaults = {'anyOf': [{'type': 'integer'}, {'properties': {'a': {'default': 1}}}]}
+    profile = Profile()
+    validate = compile(with_defaults, instrument=profile)
+    for _ in range(3):
+        validate({})
+    code = CodeGeneratorDraft07(with_defaults, profile=profile).func_code
+    assert code.index('must be integer') < code.index('"a" in')
+
+
+def test_serialization():
+    profile = record()
+    loaded = Profile.from_dict(json.loads(json.dumps(profile.as_dict())))
+    assert loaded.as_dict() == profile.as_dict()
+    assert CodeGeneratorDraft07(definition, profile=loaded).func_code == CodeGeneratorDraft07(definition, profile=profile).func_code
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+@pytest.mark.parametrize('value, valid', [
+    ({'value': 'ab'}, True),
+    ({'value': 5}, True),
+    ({'value': None}, True),
+    ({'value': ''}, False),
+    ({'value': 'abcd'}, False),
+    ({'value': 1.5}, False),
+])
+def test_validation(mode, value, valid):
+    validate = compile(definition, mode=mode, profile=record())
+    if mode == 'bool':
+        assert validate(value) is valid
+    elif mode == 'collect':
+        assert (not validate(value)) is valid
+    elif valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
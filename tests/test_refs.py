@@ -0,0 +1,60 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile, compile_to_code
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+definition = {
+    '$schema': 'http://json-schema.org/draft-07/schema',
+    'type': 'object',
+    'properties': {
+        'id': {'$ref': '#/definitions/id'},
+        'parent': {'$ref': '#/definitions/node'},
+        'blob': {'$ref': '#/definitions/blob'},
+    },
+    'definitions': {
+        'id': {'type': 'string', 'maxLength': 4},
+        'node': {'type': 'object', 'properties': {'id': {'$ref': '#/definitions/id'}, 'parent': {'$ref': '#/definitions/node'}}},
+        'blob': {'type': 'string', 'contentMediaType': 'application/json'},
+    },
+}
+
+
+def test_small_ref_is_inlined():
+    code = CodeGeneratorDraft07(definition).func_code
+    assert 'def _validate___definitions_id(' not in code
+    assert 'def _validate___definitions_node(' in code
+    assert 'def _validate___definitions_blob(' in code
+
+
+@pytest.mark.parametrize('value, path', [
+    ({'id': 'abcde'}, ['id']),
+    ({'parent': {'parent': {'id': 5}}}, ['parent', 'parent', 'id']),
+])
+def test_inlined_ref_errors(value, path):
+    validate = compile(definition)
+    with pytest.raises(JsonSchemaValidationException) as excinfo:
+        validate(value)
+    assert excinfo.value.path == path
+    assert excinfo.value.definition == {'type': 'string', 'maxLength': 4}
+
+
+def test_inlined_content_is_not_leaked():
+    validate = compile(definition)
+    value = {'blob': '{"a": 1}'}
+    assert validate(value) == {'blob': '{"a": 1}'}
+
+
+def test_internal_functions_are_positional():
+    code = CodeGeneratorDraft07(definition).func_code
+    assert 'def _validate___definitions_node(data, root_object, root_path, special_fields_extractor):' in code
+    assert '_validate___definitions_node(data__parent, root_object, (root_path, "parent"), special_fields_extractor)' in code
+
+
+def test_entry_function_keeps_keyword_api():
+    code = compile_to_code(definition)
+    assert 'def validate(data, *, root_object=None, root_path=[], special_fields_extractor=None):' in code
+    validate = compile(definition)
+    with pytest.raises(JsonSchemaValidationException) as excinfo:
+        validate({'id': 'abcde'}, root_path=['x'])
+    assert excinfo.value.path == ['x', 'id']
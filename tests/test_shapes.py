@@ -0,0 +1,104 @@
+import concurrent.futures
+
+import pytest
+
+from precisionlife_fastjsonschema import AdaptiveValidator, JsonSchemaDefinitionException, JsonSchemaValidationException, Profile, compile, compile_to_code
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+definition = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer'},
+        'name': {'type': 'string'},
+        'tags': {'type': 'array', 'default': []},
+    },
+    'additionalProperties': False,
+}
+
+
+def record(values):
+    profile = Profile()
+    validate = compile(definition, instrument=profile)
+    for value in values:
+        validate(dict(value))
+    return profile
+
+
+def test_specialized_code():
+    profile = record([{'id': 1, 'name': 'a'}] * 9 + [{'id': 1}])
+    code = CodeGeneratorDraft07(definition, profile=profile).func_code
+    assert 'if data.keys() == SHAPE_' in code
+    assert 'data["tags"] = []' in code
+    assert 'if "id" in data:' in code
+
+
+def test_no_dominant_shape():
+    profile = record([{'id': 1, 'name': 'a'}] * 5 + [{'id': 1}] * 5)
+    code = CodeGeneratorDraft07(definition, profile=profile).func_code
+    assert 'SHAPE_' not in code
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+@pytest.mark.parametrize('value, valid', [
+    ({'id': 1, 'name': 'a'}, True),
+    ({'id': 1}, True),
+    ({'id': 1, 'name': 'a', 'tags': []}, True),
+    ({'id': 'x', 'name': 'a'}, False),
+    ({'id': 1, 'name': 1}, False),
+    ({'id': 1, 'name': 'a', 'other': 1}, False),
+    ([], False),
+])
+def test_validation(mode, value, valid):
+    profile = record([{'id': 1, 'name': 'a'}])
+    validate = compile(definition, mode=mode, profile=profile)
+    if mode == 'bool':
+        assert validate(value) is valid
+    elif mode == 'collect':
+        assert (not validate(value)) is valid
+    elif valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
+
+
+def test_defaults():
+    validate = compile(definition, profile=record([{'id': 1, 'name': 'a'}]))
+    assert validate({'id': 1, 'name': 'a'}) == {'id': 1, 'name': 'a', 'tags': []}
+    assert validate({'id': 1}) == {'id': 1, 'tags': []}
+
+
+def test_compile_to_code():
+    code = compile_to_code(definition, profile=record([{'id': 1, 'name': 'a'}]))
+    state = {}
+    exec(code.split('if __name__')[0], state)
+    assert state['validate']({'id': 1, 'name': 'a'}) == {'id': 1, 'name': 'a', 'tags': []}
+
+
+def test_adaptive():
+    validate = compile(definition, adaptive=3)
+    assert isinstance(validate, AdaptiveValidator)
+    for _ in range(3):
+        assert not validate.specialized
+        assert validate({'id': 1, 'name': 'a'}) == {'id': 1, 'name': 'a', 'tags': []}
+    assert validate.specialized
+    assert validate({'id': 2, 'name': 'b'}) == {'id': 2, 'name': 'b', 'tags': []}
+    assert any('SHAPE_' in name for name in validate.function.__globals__)
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'id': 1, 'name': 'a', 'other': 1})
+
+
+def test_adaptive_threads():
+    validate = compile(definition, adaptive=100)
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(validate, [{'id': 1, 'name': 'a'}] * 400))
+    assert results == [{'id': 1, 'name': 'a', 'tags': []}] * 400
+    assert validate.specialized
+    assert max(validate.profile.visits.values()) == 100
+
+
+@pytest.mark.parametrize('options', [{'adaptive': 0}, {'adaptive': True}, {'adaptive': 10, 'profile': Profile()}])
+def test_adaptive_errors(options):
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile(definition, **options)
@@ -0,0 +1,106 @@
+import functools
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile, compile_to_code
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+definition = {
+    'type': 'object',
+    'properties': {
+        'group{}'.format(group): {
+            'type': 'object',
+            'properties': {
+                'field{}'.format(field): {'type': 'string', 'maxLength': 5, 'pattern': '^[a-z]*$'}
+                for field in range(20)
+            },
+            'required': ['field0'],
+        }
+        for group in range(20)
+    },
+}
+
+
+def max_function_lines(code):
+    lengths = [0]
+    for line in code.split('\n'):
+        if line.startswith('def '):
+            lengths.append(0)
+        lengths[-1] += 1
+    return max(lengths)
+
+
+def test_split():
+    generator = CodeGeneratorDraft07(definition)
+    stats = generator.stats
+    assert stats['splits']
+    assert stats['functions'] == 2 + len(stats['splits'])
+    assert stats['lines'] == len(generator.func_code.split('\n'))
+    assert all(
+        split['lines'] >= generator.FUNCTION_MAX_LINES or split['locals'] >= generator.FUNCTION_MAX_LOCALS
+        for split in stats['splits']
+    )
+    assert max_function_lines(generator.func_code) < 2 * generator.FUNCTION_MAX_LINES
+
+
+def test_small_schema_is_not_split():
+    assert CodeGeneratorDraft07({'properties': {'a': {'type': 'string'}}}).stats['splits'] == []
+
+
+class SmallFunctionsGenerator(CodeGeneratorDraft07):
+    FUNCTION_MAX_LINES = 10
+    SPLIT_MIN_SIZE = 1
+
+
+@functools.lru_cache()
+def compile_small(mode='exception', recursion='calls'):
+    generator = SmallFunctionsGenerator(definition, mode=mode, recursion=recursion)
+    global_state = generator.global_state
+    exec(generator.func_code, global_state)
+    return global_state['validate']
+
+
+def test_locals_budget():
+    class FewLocalsGenerator(CodeGeneratorDraft07):
+        FUNCTION_MAX_LOCALS = 5
+
+    assert FewLocalsGenerator(definition).stats['splits']
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+@pytest.mark.parametrize('recursion', ['calls', 'stack'])
+@pytest.mark.parametrize('value, valid', [
+    ({}, True),
+    ({'group3': {'field0': 'abc', 'field19': 'x'}}, True),
+    ({'group3': {'field1': 'abc'}}, False),
+    ({'group19': {'field0': 'abcdef'}}, False),
+    ({'group19': {'field0': 'a', 'field19': 'A'}}, False),
+    ({'group1': []}, False),
+])
+def test_validation(mode, recursion, value, valid):
+    validate = compile_small(mode, recursion)
+    if mode == 'bool':
+        assert validate(value) is valid
+    elif mode == 'collect':
+        assert (not validate(value)) is valid
+    elif valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
+
+
+def test_error_path():
+    with pytest.raises(JsonSchemaValidationException) as error:
+        compile_small()({'group19': {'field0': 'a', 'field19': 'A'}})
+    assert error.value.path == ['group19', 'field19']
+
+
+def test_compile_stats():
+    stats = {}
+    compile(definition, stats=stats)
+    assert stats['splits']
+    code_stats = {}
+    compile_to_code(definition, stats=code_stats)
+    assert code_stats == stats
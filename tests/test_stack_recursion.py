@@ -0,0 +1,88 @@
+import sys
+
+import pytest
+
+from precisionlife_fastjsonschema import (
+    JsonSchemaDefinitionException, JsonSchemaLimitException, JsonSchemaValidationException, compile,
+)
+
+
+tree_definition = {
+    '$schema': 'http://json-schema.org/draft-07/schema',
+    '$ref': '#/definitions/node',
+    'definitions': {
+        'node': {
+            'type': 'object',
+            'properties': {
+                'value': {'type': 'integer'},
+                'label': {'anyOf': [{'type': 'string'}, {'$ref': '#/definitions/node'}]},
+                'children': {'type': 'array', 'items': {'$ref': '#/definitions/node'}},
+            },
+            'required': ['value'],
+        },
+    },
+}
+
+DEEP = sys.getrecursionlimit() * 3
+
+
+def make_chain(depth, leaf=None):
+    node = leaf or {'value': 0}
+    for _ in range(depth):
+        node = {'value': 0, 'children': [node]}
+    return node
+
+
+def test_stack_deep_valid():
+    validate = compile(tree_definition, recursion='stack')
+    data = make_chain(DEEP)
+    assert validate(data) is data
+
+
+def test_calls_deep_overflows():
+    validate = compile(tree_definition)
+    with pytest.raises(RecursionError):
+        validate(make_chain(DEEP))
+
+
+def test_stack_deep_invalid():
+    validate = compile(tree_definition, recursion='stack')
+    with pytest.raises(JsonSchemaValidationException) as excinfo:
+        validate(make_chain(DEEP, leaf={'value': 'x'}))
+    assert excinfo.value.path[-1] == 'value'
+    assert len(excinfo.value.path) == DEEP * 2 + 1
+
+
+def test_stack_bool():
+    is_valid = compile(tree_definition, mode='bool', recursion='stack')
+    assert is_valid(make_chain(DEEP)) is True
+    assert is_valid(make_chain(DEEP, leaf={'value': 'x'})) is False
+
+
+def test_stack_collect_in_data_order():
+    validate = compile(tree_definition, mode='collect', recursion='stack')
+    data = {'value': 0, 'children': [
+        {'value': 'a', 'children': [{'value': 'b'}]},
+        {'value': 'c'},
+    ]}
+    errors = validate(data)
+    assert [error.value for error in errors] == ['a', 'b', 'c']
+
+
+def test_stack_branch():
+    validate = compile(tree_definition, recursion='stack')
+    validate({'value': 0, 'label': {'value': 1, 'label': 'x'}})
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'value': 0, 'label': {'value': 1, 'label': 5}})
+
+
+def test_stack_max_depth():
+    validate = compile(tree_definition, recursion='stack', max_depth=100)
+    validate(make_chain(10))
+    with pytest.raises(JsonSchemaLimitException):
+        validate(make_chain(100))
+
+
+def test_unknown_recursion():
+    with pytest.raises(JsonSchemaDefinitionException):
+        compile(tree_definition, recursion='unknown')
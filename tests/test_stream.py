@@ -0,0 +1,145 @@
+import gzip
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, merge_reports, validate_shard, validate_stream
+
+
+definition = {
+    'type': 'object',
+    'properties': {'id': {'type': 'integer'}, 'tag': {'type': 'string', 'default': 'x'}},
+    'required': ['id'],
+}
+
+lines = [
+    '{"id": 1}\n',
+    '{"id": "a"}\n',
+    '\n',
+    '{"id": 2}\n',
+    '{"id": \n',
+    '{}\n',
+]
+
+
+def summary(failures):
+    return [(failure.line, failure.rule, failure.path) for failure in failures]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+def test_failures_in_order(workers, chunk_size):
+    failures = list(validate_stream(lines, definition, workers=workers, chunk_size=chunk_size))
+    assert summary(failures) == [
+        (2, 'type', ['id']),
+        (5, 'json', []),
+        (6, 'required-additionalProperties', []),
+    ]
+    assert failures[0].message == 'data.id must be integer, but is a: str'
+
+
+def test_limits():
+    source = ['[1]', '[1, 2, 3, 4, 5, 6]', '["a"]']
+    failures = list(validate_stream(source, {'items': {'type': 'integer'}}, workers=1, max_nodes=5))
+    assert summary(failures) == [(2, 'max_nodes', []), (3, 'type', [0])]
+
+
+def test_bytes():
+    source = [line.encode('utf-8') for line in lines] + [b'\xff\n']
+    failures = list(validate_stream(source, definition, workers=2, chunk_size=2))
+    assert [failure.line for failure in failures] == [2, 5, 6, 7]
+
+
+def test_many_chunks():
+    source = ('{{"id": {}}}\n'.format('"a"' if number % 100 == 0 else number) for number in range(1, 2001))
+    failures = validate_stream(source, definition, workers=3, chunk_size=7)
+    assert [failure.line for failure in failures] == list(range(100, 2001, 100))
+
+
+@pytest.mark.parametrize('options', [
+    {'workers': 0},
+    {'workers': 1.5},
+    {'chunk_size': 0},
+    {'range_size': 0},
+])
+def test_bad_options(options):
+    with pytest.raises(JsonSchemaDefinitionException):
+        validate_stream(lines, definition, **options)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('range_size', [1, 10, 1 << 24])
+def test_file(tmp_path, workers, range_size):
+    path = tmp_path / 'data.ndjson'
+    path.write_text(''.join(lines))
+    stats = {}
+    failures = list(validate_stream(str(path), definition, workers=workers, range_size=range_size, stats=stats))
+    assert [failure.line for failure in failures] == [2, 5, 6]
+    assert stats == {'lines': 6, 'documents': 5, 'failures': 3}
+
+
+def test_file_without_last_new_line(tmp_path):
+    path = tmp_path / 'data.ndjson'
+    path.write_text('{"id": 1}\n{}')
+    assert [failure.line for failure in validate_stream(path, definition, workers=1, range_size=3)] == [2]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'data.ndjson'
+    path.write_text('')
+    stats = {}
+    assert list(validate_stream(path, definition, workers=1, stats=stats)) == []
+    assert stats == {'lines': 0, 'documents': 0, 'failures': 0}
+
+
+def test_gzip_file(tmp_path):
+    path = tmp_path / 'data.ndjson.gz'
+    with gzip.open(path, 'wt') as file:
+        file.write(''.join(lines))
+    assert [failure.line for failure in validate_stream(path, definition, workers=2, chunk_size=2)] == [2, 5, 6]
+
+
+@pytest.mark.parametrize('shards', [1, 2, 3, 7, 40])
+def test_shards_cover_all_lines(tmp_path, shards):
+    path = tmp_path / 'data.ndjson'
+    path.write_text(''.join('{"id": "%d"}\n' % number if number % 5 == 0 else '{"id": %d}\n' % number for number in range(1, 31)))
+    reports = [validate_shard(path, definition, shard, shards, workers=1, range_size=16) for shard in range(shards)]
+    assert sum(sum(report['shard_lines'].values()) for report in reports) == 30
+    report = merge_reports(reports[::-1])
+    assert (report['documents'], report['failures'], report['rules']) == (30, 6, {'type': 6})
+    assert [sample['file_line'] for sample in report['samples']] == [5, 10, 15, 20, 25, 30]
+    if shards > 1:
+        assert merge_reports([merge_reports(reports[:1]), merge_reports(reports[1:])])['samples'] == report['samples']
+
+
+def test_partial_merge(tmp_path):
+    path = tmp_path / 'data.ndjson'
+    path.write_text('{}\n' * 20)
+    reports = [validate_shard(path, definition, shard, 4, workers=1, samples=2) for shard in range(4)]
+    report = merge_reports([reports[0], reports[2]], samples=4)
+    assert [('file_line' in sample, sample['shard']) for sample in report['samples']] == [
+        (True, 0), (True, 0), (False, 2), (False, 2),
+    ]
+    with pytest.raises(ValueError):
+        merge_reports([reports[0], report])
+
+
+def test_merge_keeps_sample_limit(tmp_path):
+    path = tmp_path / 'data.ndjson'
+    path.write_text('{}\n' * 20)
+    reports = [validate_shard(path, definition, shard, 4, workers=1, samples=3) for shard in range(4)]
+    report = merge_reports(reports[::-1])
+    assert (report['failures'], report['sample_limit']) == (20, 3)
+    assert [sample['file_line'] for sample in report['samples']] == [1, 2, 3]
+    assert merge_reports([merge_reports(reports[:2]), merge_reports(reports[2:])])['samples'] == report['samples']
+    assert len(merge_reports(reports, samples=10)['samples']) == 10
+
+
+@pytest.mark.parametrize('shard, shards', [(2, 2), (-1, 2), (0, 0)])
+def test_bad_shard(tmp_path, shard, shards):
+    with pytest.raises(JsonSchemaDefinitionException):
+        validate_shard(tmp_path / 'data.ndjson', definition, shard, shards)
+
+
+def test_compressed_shard(tmp_path):
+    with pytest.raises(ValueError):
+        validate_shard(tmp_path / 'data.ndjson.gz', definition, 0, 2)
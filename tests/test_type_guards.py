@@ -0,0 +1,63 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+definition = {
+    'type': 'object',
+    'minProperties': 1,
+    'properties': {
+        'a': {'type': 'string', 'maxLength': 3},
+        'b': {'type': 'array', 'minItems': 1, 'items': {'type': 'integer', 'minimum': 0}},
+        'c': {'maxLength': 3},
+    },
+}
+
+
+def test_proven_guards_are_not_generated():
+    code = CodeGeneratorDraft07(definition).func_code
+    assert 'data_is_dict' not in code
+    assert 'data__b_is_list' not in code
+    assert 'isinstance(data__a, str)' not in code
+    assert 'isinstance(data__b_item, (int, float))' not in code
+    assert 'isinstance(data__c, str)' in code
+
+
+def test_collect_mode_keeps_guards():
+    code = CodeGeneratorDraft07(definition, mode='collect').func_code
+    assert 'data_is_dict' in code
+    assert 'isinstance(data__a, str)' in code
+
+
+def test_type_is_not_proven_after_any_of_branch():
+    code = CodeGeneratorDraft07({
+        'anyOf': [{'type': 'string'}, {'type': 'number'}],
+        'maxLength': 3,
+    }).func_code
+    assert 'isinstance(data, str)' in code
+
+
+@pytest.mark.parametrize('value, valid', [
+    ({'a': 'abc'}, True),
+    ({'a': 'abcd'}, False),
+    ({'a': 5}, False),
+    ({'b': [1, 2]}, True),
+    ({'b': []}, False),
+    ({'b': [-1]}, False),
+    ({'b': 'x'}, False),
+    ({'c': 5}, True),
+    ({'c': 'abcd'}, False),
+    ({}, False),
+    ([], False),
+])
+def test_validation(value, valid):
+    is_valid = compile(definition, mode='bool')
+    assert is_valid(value) is valid
+    assert (not compile(definition, mode='collect')(value)) is valid
+    validate = compile(definition)
+    if valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
@@ -0,0 +1,110 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaLimitException, JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+definition = {
+    'type': 'object',
+    'properties': dict(
+        {'name{}'.format(index): {'type': 'string'} for index in range(50)},
+        count={'type': 'integer', 'default': 0},
+        nested={'properties': {'value': {'type': 'integer'}}},
+    ),
+    'patternProperties': {'^x-': {'type': 'string'}},
+    'additionalProperties': False,
+}
+
+
+def test_dispatch_code():
+    code = CodeGeneratorDraft07(definition).func_code
+    assert 'if "name1" in data:' not in code
+    assert 'for data_key, data_val in data.items():' in code
+    assert '_validate_properties = {' in code
+
+
+def test_narrow_objects_are_not_dispatched():
+    code = CodeGeneratorDraft07({'properties': {'a': {'type': 'string'}}}).func_code
+    assert 'if "a" in data:' in code
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+@pytest.mark.parametrize('value, valid', [
+    ({}, True),
+    ({'name3': 'a', 'count': 5}, True),
+    ({'name3': 'a', 'x-extra': 'b'}, True),
+    ({'nested': {'value': 1}}, True),
+    ({'name3': 1}, False),
+    ({'count': 'a'}, False),
+    ({'x-extra': 1}, False),
+    ({'nested': {'value': 'a'}}, False),
+    ({'other': 1}, False),
+    ([], False),
+])
+def test_validation(mode, value, valid):
+    validate = compile(definition, mode=mode)
+    if mode == 'bool':
+        assert validate(value) is valid
+    elif mode == 'collect':
+        assert (not validate(value)) is valid
+    elif valid:
+        validate(value)
+    else:
+        with pytest.raises(JsonSchemaValidationException):
+            validate(value)
+
+
+def test_defaults():
+    assert compile(definition)({'name1': 'a'}) == {'name1': 'a', 'count': 0}
+
+
+def test_error_path():
+    with pytest.raises(JsonSchemaValidationException) as error:
+        compile(definition)({'nested': {'value': 'a'}})
+    assert error.value.path == ['nested', 'value']
+
+
+def test_collect_all_errors():
+    errors = compile(definition, mode='collect')({'name1': 1, 'name2': 2, 'other': 1})
+    assert sorted(error.rule for error in errors) == ['required-additionalProperties', 'type', 'type']
+
+
+def test_additional_properties_in_dispatch_loop():
+    code = CodeGeneratorDraft07(definition).func_code
+    assert 'data_key not in {' not in code
+    assert 'for data_key in data:' not in code
+    assert code.count("REGEX_PATTERNS['^x-'].search(data_key)") == 1
+
+
+@pytest.mark.parametrize('mode', ['exception', 'collect'])
+def test_missing_and_extra_properties(mode):
+    validate = compile(dict(definition, required=['name1', 'name2']), mode=mode)
+    if mode == 'collect':
+        [error] = validate({'name2': 'a', 'other': 1, 'x-a': 'b', 'another': 2})
+    else:
+        with pytest.raises(JsonSchemaValidationException) as excinfo:
+            validate({'name2': 'a', 'other': 1, 'x-a': 'b', 'another': 2})
+        error = excinfo.value
+    assert (error.rule, error.missing_fields, error.extra_fields) == ('required-additionalProperties', ['name1'], ['other', 'another'])
+
+
+@pytest.mark.parametrize('mode', ['exception', 'bool', 'collect'])
+def test_additional_properties_schema(mode):
+    validate = compile(dict(definition, additionalProperties={'type': 'integer'}), mode=mode)
+    assert not (validate({'other': 1, 'x-a': 'b'}) is False)
+    if mode == 'bool':
+        assert validate({'other': 'a'}) is False
+        assert validate({'x-a': 1}) is False
+    elif mode == 'collect':
+        assert [error.path for error in validate({'other': 'a', 'name1': 'b'})] == [['other']]
+    else:
+        with pytest.raises(JsonSchemaValidationException) as excinfo:
+            validate({'other': 'a'})
+        assert excinfo.value.path == ['other']
+
+
+def test_max_nodes_counts_keys():
+    validate = compile(dict(definition, additionalProperties=True), max_nodes=100)
+    validate({'a{}'.format(index): index for index in range(50)})
+    with pytest.raises(JsonSchemaLimitException):
+        validate({'a{}'.format(index): index for index in range(200)})